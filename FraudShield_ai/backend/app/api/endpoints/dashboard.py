@@ -2,40 +2,168 @@
 # This file defines the API endpoint for fetching the aggregated dashboard feed.
 
 
-import json
-from pathlib import Path
-from fastapi import APIRouter, HTTPException, status
+from datetime import datetime, timezone
+from typing import Optional
+
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+
+from app.api.schemas import Feed, FeedItem, CampaignList
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.services.feed_cache import feed_cache, etag_matches, FeedLoadError
+from app.services.feed_hub import feed_hub, HubFullError
+from app.services.feed_index import InvalidCursorError
 
 
 # Create a new router for this endpoint
 router = APIRouter()
 
 
-# Define the path to the aggregated data feed file.
-# This path is relative to the `backend/` directory, from where the server is run.
-DATA_FILE_PATH = Path("app/data/aggregated_feed.json")
+@router.get("/feed", response_model=Feed)
+async def get_dashboard_feed(
+   request: Request,
+   source: Optional[str] = Query(None, description="Only items from this source, e.g. 'SEBI'."),
+   risk_level: Optional[str] = Query(None, description="Only items with this risk level, e.g. 'High'."),
+   since: Optional[datetime] = Query(None, description="Only items published at or after this time (ISO 8601)."),
+   until: Optional[datetime] = Query(None, description="Only items published at or before this time (ISO 8601)."),
+   q: Optional[str] = Query(None, description="Words that must all appear in the title or content."),
+   campaign_id: Optional[int] = Query(None, description="Only items of this campaign of near-duplicate posts."),
+   cursor: Optional[str] = Query(None, description="The `next_cursor` of the previous page."),
+   limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (default 50).")
+):
+   """
+   Returns the consolidated data from the aggregated feed.
+   The feed is written by the `run_aggregation_job.py` script.
+
+
+   Without query parameters, the whole feed is returned as a list. The feed is served from memory
+   (see `FeedCache`) and re-read only when it changes. Responses carry an ETag; a poll with
+   a matching If-None-Match gets an empty 304.
+
+
+   With any filter or pagination parameter, one page of matching items is returned, newest first,
+   as {"items": [...], "next_cursor": ...}. Pages are served from precomputed indexes (see `FeedIndex`),
+   and built from items encoded once per feed version.
+   """
+   if any(value is not None for value in (source, risk_level, since, until, q, campaign_id, cursor, limit)):
+       try:
+           index = await _load_feed(feed_cache.get_index)
+           return FastJSONResponse(index.query_json(
+               source=source,
+               risk_level=risk_level,
+               since=_epoch(since),
+               until=_epoch(until),
+               search=q,
+               campaign_id=campaign_id,
+               cursor=cursor,
+               limit=limit or 50
+           ))
+       except InvalidCursorError as e:
+           raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+   snapshot = await _load_feed(feed_cache.get)
+
+   # no-cache lets browsers keep the feed but makes them revalidate it on every poll.
+   headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+   if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+       return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+   return FastJSONResponse(snapshot.body, headers=headers)
 
 
-@router.get("/feed")
-async def get_dashboard_feed():
+@router.get("/feed/campaigns", response_model=CampaignList)
+async def get_feed_campaigns(
+   min_items: int = Query(2, ge=1, description="Only campaigns with at least this many items in the feed."),
+   limit: int = Query(50, ge=1, le=500, description="Number of campaigns.")
+):
    """
-   Reads and returns the consolidated data from the aggregated_feed.json file.
-   This file is generated by the `run_aggregation_job.py` script.
+   Returns the largest campaigns of near-duplicate posts in the feed, with their item counts and
+   newest item. The ingestion job assigns each item a `campaign_id`; `/feed?campaign_id=...`
+   lists a campaign's items.
    """
-   if not DATA_FILE_PATH.is_file():
-       # If the file doesn't exist, return an informative error.
+   index = await _load_feed(feed_cache.get_index)
+   return FastJSONResponse({"campaigns": index.campaigns(min_items, limit)})
+
+
+@router.get("/feed/latest", response_model=list[FeedItem])
+async def get_latest_feed_items(n: int = Query(50, ge=1, le=1000, description="Number of items.")):
+   """
+   Returns the `n` most recently ingested items, oldest first. Only the newest segments of
+   the feed log are read, and sent as stored, so this stays cheap for clients that don't need
+   the whole feed.
+   """
+   return FastJSONResponse(await _load_feed(lambda: feed_cache.tail_json(n)))
+
+
+@router.get("/feed/stream")
+async def stream_feed(
+   request: Request,
+   risk_level: Optional[list[str]] = Query(None, description="Only items with one of these risk levels."),
+   source: Optional[list[str]] = Query(None, description="Only items from one of these sources.")
+):
+   """
+   Streams newly ingested (and scored) feed items as Server-Sent Events, so the dashboard
+   doesn't have to poll and diff the whole feed. Filters repeat, e.g.
+   `?risk_level=High&risk_level=Critical`.
+
+
+   Each event is `event: item` with the item as JSON and its sequence number as the event ID.
+   A browser EventSource that reconnects sends it back as Last-Event-ID and first receives
+   the items it missed. A client that stops reading gets an `event: dropped` and is disconnected.
+   """
+   # Checked here for a proper 503; the slot itself is only taken once the stream runs, inside
+   # the generator's try/finally, so a client gone before the first frame cannot leak it.
+   if feed_hub.full:
        raise HTTPException(
-           status_code=status.HTTP_404_NOT_FOUND,
-           detail="Dashboard data not found. Please run the data aggregation job first."
+           status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+           detail=f"The live feed is serving its maximum of {feed_hub.max_subscribers} clients."
        )
+   last_event_id = request.headers.get("last-event-id", "")
+
+   async def events():
+       try:
+           subscription = feed_hub.subscribe(risk_level, source)
+       except HubFullError:
+           # Filled up since the check above; the status is already sent.
+           yield b"event: dropped\ndata: {\"reason\": \"server full\"}\n\n"
+           return
+       try:
+           if last_event_id.isdigit():
+               for frame in await feed_hub.replay(subscription, int(last_event_id) + 1):
+                   yield frame
+           async for frame in subscription.frames(settings.FEED_STREAM_HEARTBEAT):
+               yield frame
+       finally:
+           feed_hub.unsubscribe(subscription)
+
+   # X-Accel-Buffering stops nginx from holding events back in its buffer.
+   headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+   return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
 
 
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+   if value is None:
+       return None
+   if value.tzinfo is None:
+       value = value.replace(tzinfo=timezone.utc)
+   return value.timestamp()
+
+
+async def _load_feed(getter):
+   """
+   Awaits `getter` and maps a missing or unreadable feed file to an HTTP error.
+   """
    try:
-       # Open and load the JSON data from the file
-       with open(DATA_FILE_PATH, "r") as f:
-           data = json.load(f)
-       return data
-   except Exception as e:
+       return await getter()
+   except FileNotFoundError:
+       # If the file doesn't exist, return an informative error.
+       raise HTTPException(
+           status_code=status.HTTP_404_NOT_FOUND,
+           detail="Dashboard data not found. Please run the data aggregation job first."
+       )
+   except FeedLoadError as e:
        # If there's an error reading or parsing the file, return a server error.
        raise HTTPException(
            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
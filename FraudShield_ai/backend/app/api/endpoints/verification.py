@@ -2,45 +2,332 @@
 # This file defines the API endpoint for the main verification logic.
 
 
-from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, status
-from typing import Optional
+import asyncio
+import logging
+import math
+
+
+from fastapi import APIRouter, Request, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
 
 
 from app.services.verification_orchestrator import verification_orchestrator
-from app.core.security import get_api_key
+from app.services.upload_spooler import upload_spooler, UploadTooLargeError, InvalidUploadError
+from app.services.result_cache import result_cache
+from app.services.job_queue import media_job_queue, JobQueueFullError, InvalidCallbackError, check_callback_url
+from app.api.schemas import VerificationResult, BatchVerificationResponse
+from app.core.config import settings
+from app.core.metrics import stage_timer
+from app.core.rate_limit import rate_limiter
+from app.core.responses import FastJSONResponse, dumps
+from app.core.security import rate_limited, Admission
+
 
+logger = logging.getLogger(__name__)
 
 # Create a new router for this endpoint
 router = APIRouter()
 
 
-@router.post("/verify")
+# The /verify body is parsed by the upload spooler rather than by FastAPI, so the
+# form fields are described here for the API docs.
+VERIFY_FORM_SCHEMA = {
+   "requestBody": {
+       "content": {
+           "multipart/form-data": {
+               "schema": {
+                   "type": "object",
+                   "properties": {
+                       "text": {"type": "string"},
+                       "file": {"type": "string", "format": "binary"}
+                   }
+               }
+           }
+       }
+   }
+}
+
+
+# Form fields of /jobs, on top of those of /verify.
+JOB_FORM_SCHEMA = {
+   "requestBody": {
+       "content": {
+           "multipart/form-data": {
+               "schema": {
+                   "type": "object",
+                   "properties": {
+                       **VERIFY_FORM_SCHEMA["requestBody"]["content"]["multipart/form-data"]["schema"]["properties"],
+                       "priority": {"type": "integer", "default": 0, "minimum": 0, "maximum": settings.JOB_MAX_PRIORITY},
+                       "callback_url": {"type": "string", "format": "uri"}
+                   }
+               }
+           }
+       }
+   }
+}
+
+
+class BatchVerificationRequest(BaseModel):
+   texts: list[str]
+
+
+@router.post("/verify", response_model=VerificationResult, openapi_extra=VERIFY_FORM_SCHEMA)
 async def verify_content(
-   text: Optional[str] = Form(None),
-   file: Optional[UploadFile] = File(None),
-   # api_key: str = Depends(get_api_key) # Uncomment to enable B2B API key security
+   request: Request,
+   stream: bool = Query(False, description="Stream each stage's result as NDJSON as soon as it finishes."),
+   admission: Admission = Depends(rate_limited())
 ):
    """
    Main verification endpoint.
    Accepts either text or a file (video/audio) for analysis.
    This endpoint simulates the full verification pipeline.
+
+
+   With `?stream=true` the response is NDJSON: one {"event": ..., "data": ...} line per stage
+   as it finishes (text flags and cross-verification typically within milliseconds, the
+   deepfake verdict seconds later), ending with the "result" event that carries the final
+   risk score. See `VerificationOrchestrator.stream_full_verification` for the events.
+   If the pipeline fails mid-stream, the last line is an "error" event.
+
+
+   Uploads are streamed to a temporary file in fixed-size chunks and hashed on the way,
+   so even multi-hundred-MB videos never sit in memory.
+
+
+   Requests count against the client's text limits, and against its media limits instead
+   once the body turns out to hold a file; a client over its limits gets a 429 with Retry-After.
    """
-   if not text and not file:
+   fields, upload = await _spool_form(request, admission)
+
+   text = fields.get("text")
+   if not text and not upload:
        raise HTTPException(
            status_code=status.HTTP_400_BAD_REQUEST,
            detail="Please provide either 'text' or a 'file' for analysis."
        )
 
+   if stream:
+       return StreamingResponse(
+           _verification_events(text, upload),
+           media_type="application/x-ndjson",
+           # X-Accel-Buffering stops nginx from holding events back in its buffer.
+           headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+       )
+
+   try:
+       # Delegate the complex logic to the verification orchestrator service.
+       # The async pipeline runs model-bound stages in a thread pool, so other requests
+       # keep being served while this one waits on inference. The spooled file's path is
+       # passed down directly, and its hash lets re-uploads hit the result cache.
+       result = await verification_orchestrator.run_full_verification(
+           text_content=text,
+           file_path=upload.path if upload else None,
+           file_hash=upload.sha256 if upload else None
+       )
+   finally:
+       if upload:
+           upload.cleanup()
+
+
+   return FastJSONResponse(result)
+
+
+async def _spool_form(request: Request, admission: Admission) -> tuple:
+   """
+   Spools the form of /verify or /jobs (see `UploadSpooler`) and charges the request as
+   "media" if it holds a file, mapping failures to HTTP errors.
+   """
+   try:
+       with stage_timer("upload"):
+           fields, upload = await upload_spooler.spool(request)
+   except UploadTooLargeError as e:
+       raise HTTPException(
+           status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+           detail=str(e)
+       )
+   except InvalidUploadError as e:
+       raise HTTPException(
+           status_code=status.HTTP_400_BAD_REQUEST,
+           detail=str(e)
+       )
+
+   if upload:
+       try:
+           admission.charge("media")
+       except HTTPException:
+           upload.cleanup()
+           raise
+   return fields, upload
+
+
+async def _verification_events(text: str, upload):
+   """
+   NDJSON lines of a streamed /verify. The spooled upload is deleted once the stream ends,
+   including when the client disconnects early.
+   """
+   try:
+       async for event, data in verification_orchestrator.stream_full_verification(
+           text_content=text,
+           file_path=upload.path if upload else None,
+           file_hash=upload.sha256 if upload else None
+       ):
+           yield dumps({"event": event, "data": data}) + b"\n"
+   except Exception:
+       # The 200 status is already sent, so the failure is reported in the stream itself.
+       logger.exception("Streamed verification failed.")
+       yield dumps({"event": "error", "data": {"detail": "Verification failed."}}) + b"\n"
+   finally:
+       if upload:
+           upload.cleanup()
+
+
+@router.post("/verify/batch", response_model=BatchVerificationResponse)
+async def verify_batch(
+   request: BatchVerificationRequest,
+   admission: Admission = Depends(rate_limited("text"))
+):
+   """
+   Batch verification endpoint for high-volume text screening.
+   Accepts a JSON body of the form {"texts": ["...", "..."]} and returns
+   {"results": [...]} with one verification result per text, in the same order.
+   A batch costs one text token per BATCH_TEXTS_PER_TOKEN texts.
+   """
+   if not request.texts:
+       raise HTTPException(
+           status_code=status.HTTP_400_BAD_REQUEST,
+           detail="Please provide at least one text in 'texts'."
+       )
+
+   if len(request.texts) > settings.MAX_BATCH_SIZE:
+       raise HTTPException(
+           status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+           detail=f"Batch too large. A single request may contain at most {settings.MAX_BATCH_SIZE} texts."
+       )
+
+   # Admission took one token; the rest of the batch's cost is charged now that its size is known.
+   admission.charge_tokens(math.ceil(len(request.texts) / settings.BATCH_TEXTS_PER_TOKEN) - 1)
 
-   # In a real application, you would save the uploaded file temporarily to process it.
-   # For this mock, we'll just use the filename.
-   file_path = file.filename if file else None
-  
-   # Delegate the complex logic to the verification orchestrator service
-   result = verification_orchestrator.run_full_verification(
-       text_content=text,
-       file_path=file_path
+   results = await verification_orchestrator.run_batch_verification(request.texts)
+
+   return FastJSONResponse({"results": results})
+
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED, openapi_extra=JOB_FORM_SCHEMA)
+async def submit_verification_job(
+   request: Request,
+   admission: Admission = Depends(rate_limited())
+):
+   """
+   Queues a verification and returns its job ID right away, for uploads that take too
+   long to verify while the client waits on the connection.
+   Takes the same form as /verify, plus an optional integer `priority` from 0 to
+   JOB_MAX_PRIORITY (higher runs first) and `callback_url`, which is POSTed the finished job;
+   it must be a public host (or one of JOB_CALLBACK_ALLOWED_HOSTS). Otherwise poll
+   GET /jobs/{job_id}.
+   Rate limited like /verify.
+   """
+   fields, upload = await _spool_form(request, admission)
+
+   try:
+       text = fields.get("text")
+       if not text and not upload:
+           raise HTTPException(
+               status_code=status.HTTP_400_BAD_REQUEST,
+               detail="Please provide either 'text' or a 'file' for analysis."
+           )
+       try:
+           priority = int(fields.get("priority") or 0)
+       except ValueError:
+           priority = -1
+       if not 0 <= priority <= media_job_queue.max_priority:
+           raise HTTPException(
+               status_code=status.HTTP_400_BAD_REQUEST,
+               detail=f"'priority' must be an integer between 0 and {media_job_queue.max_priority}."
+           )
+       callback_url = fields.get("callback_url") or None
+       if callback_url:
+           try:
+               await asyncio.to_thread(check_callback_url, callback_url, media_job_queue.callback_hosts)
+           except InvalidCallbackError as e:
+               raise HTTPException(
+                   status_code=status.HTTP_400_BAD_REQUEST,
+                   detail=str(e)
+               )
+
+       # From here on the queue owns the spooled file.
+       job = await asyncio.to_thread(media_job_queue.submit, text, upload, priority, callback_url, admission.client)
+   except JobQueueFullError as e:
+       if upload:
+           upload.cleanup()
+       raise HTTPException(
+           status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+           detail=str(e)
+       )
+   except HTTPException:
+       if upload:
+           upload.cleanup()
+       raise
+
+   status_url = str(request.url_for("get_verification_job", job_id=job["id"]))
+   return JSONResponse(
+       {"job_id": job["id"], "status": job["status"], "status_url": status_url},
+       status_code=status.HTTP_202_ACCEPTED,
+       headers={"Location": status_url}
    )
 
 
-   return result
+@router.get("/jobs/{job_id}")
+async def get_verification_job(
+   job_id: str,
+   admission: Admission = Depends(rate_limited("text"))
+):
+   """
+   Returns a job's status: queued, running, succeeded (with its `result`), failed (with
+   its `error`) or cancelled. Only the client that submitted the job can read it; for
+   anyone else it is unknown.
+   """
+   job = await asyncio.to_thread(media_job_queue.get, job_id, admission.client)
+   if job is None:
+       raise HTTPException(
+           status_code=status.HTTP_404_NOT_FOUND,
+           detail="Unknown job. Finished jobs are kept for a limited time."
+       )
+   return job
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_verification_job(
+   job_id: str,
+   admission: Admission = Depends(rate_limited("text"))
+):
+   """
+   Cancels a job that has not started running yet. Only the client that submitted the
+   job can cancel it.
+   """
+   if not await asyncio.to_thread(media_job_queue.cancel, job_id, admission.client):
+       job = await asyncio.to_thread(media_job_queue.get, job_id, admission.client)
+       if job is None:
+           raise HTTPException(
+               status_code=status.HTTP_404_NOT_FOUND,
+               detail="Unknown job. Finished jobs are kept for a limited time."
+           )
+       raise HTTPException(
+           status_code=status.HTTP_409_CONFLICT,
+           detail=f"The job is {job['status']} and can no longer be cancelled."
+       )
+   return await asyncio.to_thread(media_job_queue.get, job_id, admission.client)
+
+
+@router.get("/stats")
+async def get_verification_stats():
+   """
+   Returns operational statistics for the verification pipeline,
+   including result cache hit/miss counters, NLP batch sizes, queued jobs and rate-limited clients.
+   """
+   return {
+       "result_cache": result_cache.stats(),
+       "nlp_batching": verification_orchestrator.nlp_batcher.stats(),
+       "job_queue": media_job_queue.stats(),
+       "rate_limiter": rate_limiter.stats()
+   }
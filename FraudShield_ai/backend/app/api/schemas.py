@@ -0,0 +1,124 @@
+# --- schemas.py ---
+# Pydantic models of the API's responses: the verification result built by the orchestrator
+# and the dashboard feed items written by the ingestion job. They give the API docs a real
+# schema and clients a contract. The routes that return them serialize with
+# FastJSONResponse (see app/core/responses.py), so the models are not used to re-validate
+# every response; extra fields are allowed, as the services add new ones over time.
+
+
+from typing import Optional, Union
+
+
+from pydantic import BaseModel, ConfigDict
+
+
+class TranscriptSegment(BaseModel):
+   start: float
+   end: float
+   text: str
+   flags: list[str] = []
+
+
+class SpeechAnalysis(BaseModel):
+   model_config = ConfigDict(extra="allow")
+
+   audio_seconds: float
+   speech_seconds: float
+   windows: int
+   windows_skipped: int
+   error: Optional[str] = None
+
+
+class DeepfakeAnalysis(BaseModel):
+   model_config = ConfigDict(extra="allow")
+
+   # None when the analysis was inconclusive (see `details`).
+   is_deepfake: Optional[bool]
+   confidence: Optional[float]
+   details: str
+   frame_analysis: Optional[dict] = None
+   transcribed_text: Optional[str] = None
+   flagged_segments: Optional[list[TranscriptSegment]] = None
+   speech_analysis: Optional[SpeechAnalysis] = None
+
+
+class Entities(BaseModel):
+   model_config = ConfigDict(extra="allow")
+
+   organizations: list[str] = []
+   percentages: list[str] = []
+
+
+class TextAnalysis(BaseModel):
+   model_config = ConfigDict(extra="allow")
+
+   sentiment: str
+   flags: list[str]
+   entities: Entities
+   summary: str
+
+
+class CrossVerification(BaseModel):
+   model_config = ConfigDict(extra="allow")
+
+   is_verified: bool
+   flags: list[str]
+   summary: str
+   resolved_entities: dict = {}
+
+
+class VerificationResult(BaseModel):
+   """
+   A consolidated verification result, as returned by /verify and cached by the result cache.
+   """
+   model_config = ConfigDict(extra="allow")
+
+   risk_score: int
+   risk_level: str
+   summary: str
+   deepfake_analysis: Optional[DeepfakeAnalysis] = None
+   text_analysis: Optional[TextAnalysis] = None
+   cross_verification: Optional[CrossVerification] = None
+
+
+class BatchVerificationResponse(BaseModel):
+   results: list[VerificationResult]
+
+
+class FeedItem(BaseModel):
+   """
+   One item of the dashboard feed. `risk_score` and `reason` come from scoring, `campaign_id`
+   and `campaign_size` from clustering near-duplicates (see data_ingestion/).
+   """
+   model_config = ConfigDict(extra="allow")
+
+   source: str
+   title: str
+   timestamp: Optional[str] = None
+   link: Optional[str] = None
+   content: Optional[str] = None
+   risk_level: Optional[str] = None
+   risk_score: Optional[int] = None
+   reason: Optional[str] = None
+   campaign_id: Optional[int] = None
+   campaign_size: Optional[int] = None
+
+
+class FeedPage(BaseModel):
+   items: list[FeedItem]
+   next_cursor: Optional[str] = None
+
+
+# /feed returns the whole feed as a list, or one page when filtered or paginated.
+Feed = Union[list[FeedItem], FeedPage]
+
+
+class Campaign(BaseModel):
+   campaign_id: int
+   items: int
+   campaign_size: int
+   latest: FeedItem
+
+
+class CampaignList(BaseModel):
+   campaigns: list[Campaign]
@@ -18,12 +18,169 @@ class Settings:
    # B2B API Security
    # Expects a comma-separated string of keys in the .env file.
    # e.g., ALLOWED_API_KEYS=key1,key2,key3
-   ALLOWED_API_KEYS: list[str] = os.getenv("ALLOWED_API_KEYS", "").split(',')
+   # Without any key, the API is open and clients are told apart by IP address.
+   ALLOWED_API_KEYS: list[str] = [key for key in os.getenv("ALLOWED_API_KEYS", "").split(',') if key]
+
+   # Admission control per API key (or per IP address when no keys are configured).
+   # Text and media requests draw from separate token buckets: a client may send *_RATE requests
+   # per second on average, in bursts of up to *_BURST, with at most *_MAX_CONCURRENT in flight.
+   # Requests over a limit are rejected with 429 and a Retry-After header. API_KEY_LIMITS
+   # overrides the limits of individual keys as JSON, e.g.
+   # {"partner-key": {"media": {"rate": 2, "burst": 20, "max_concurrent": 8}}}.
+   # A /verify/batch call costs one text token per BATCH_TEXTS_PER_TOKEN texts (at most TEXT_BURST).
+   RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+   TEXT_RATE: float = float(os.getenv("TEXT_RATE", "20"))
+   TEXT_BURST: int = int(os.getenv("TEXT_BURST", "40"))
+   TEXT_MAX_CONCURRENT: int = int(os.getenv("TEXT_MAX_CONCURRENT", "16"))
+   BATCH_TEXTS_PER_TOKEN: int = int(os.getenv("BATCH_TEXTS_PER_TOKEN", "25"))
+   MEDIA_RATE: float = float(os.getenv("MEDIA_RATE", "0.2"))
+   MEDIA_BURST: int = int(os.getenv("MEDIA_BURST", "5"))
+   MEDIA_MAX_CONCURRENT: int = int(os.getenv("MEDIA_MAX_CONCURRENT", "2"))
+   API_KEY_LIMITS: str = os.getenv("API_KEY_LIMITS", "")
 
 
    # News API Key for data ingestion
    NEWS_API_KEY: str = os.getenv("NEWS_API_KEY")
 
 
+   # Verification Pipeline
+   # Upper bound on threads used to run the pipeline stages off the event loop.
+   # Text stages (NLP, cross-verification) and media inference get separate pools so
+   # cheap text requests never queue behind multi-second deepfake inference.
+   VERIFICATION_MAX_WORKERS: int = int(os.getenv("VERIFICATION_MAX_WORKERS", "4"))
+   MEDIA_MAX_WORKERS: int = int(os.getenv("MEDIA_MAX_WORKERS", "2"))
+   # Uploads to /verify are streamed to temporary files in UPLOAD_CHUNK_SIZE chunks
+   # (in UPLOAD_SPOOL_DIR, or the system temp dir if empty). Files larger than
+   # MAX_UPLOAD_BYTES are rejected, and so are forms with more than MAX_FORM_FIELDS text
+   # fields or whose text fields (part headers included) add up to more than MAX_FORM_FIELD_BYTES.
+   MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(1024 * 1024 * 1024)))
+   MAX_FORM_FIELD_BYTES: int = int(os.getenv("MAX_FORM_FIELD_BYTES", str(1024 * 1024)))
+   MAX_FORM_FIELDS: int = int(os.getenv("MAX_FORM_FIELDS", "20"))
+   UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+   UPLOAD_SPOOL_DIR: str = os.getenv("UPLOAD_SPOOL_DIR", "")
+   # Maximum number of texts accepted by a single /verify/batch call.
+   MAX_BATCH_SIZE: int = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+   # Micro-batching of NLP inference across concurrent /verify requests: a batch is run once it
+   # holds NLP_BATCH_MAX_SIZE texts or its first text has waited NLP_BATCH_MAX_DELAY_MS, with at
+   # most NLP_BATCH_MAX_IN_FLIGHT batches running at a time.
+   NLP_BATCH_MAX_SIZE: int = int(os.getenv("NLP_BATCH_MAX_SIZE", "32"))
+   NLP_BATCH_MAX_DELAY_MS: float = float(os.getenv("NLP_BATCH_MAX_DELAY_MS", "10"))
+   NLP_BATCH_MAX_IN_FLIGHT: int = int(os.getenv("NLP_BATCH_MAX_IN_FLIGHT", "2"))
+
+
+   # Asynchronous verification jobs (/verification/jobs)
+   # Jobs are queued in the SQLite file at JOB_QUEUE_DB_PATH and their uploads kept in
+   # JOB_STORAGE_DIR until they have run, so both survive restarts. JOB_WORKERS jobs run at a
+   # time per server process; at most JOB_MAX_PENDING may be unfinished. A job interrupted by a
+   # crash is picked up again once its JOB_LEASE_SECONDS lease runs out, up to JOB_MAX_ATTEMPTS
+   # runs, as is one that hit a transient error (a timeout, a lost connection); other errors
+   # fail the job at once. Finished jobs are kept for JOB_RESULT_TTL seconds.
+   JOB_QUEUE_DB_PATH: str = os.getenv("JOB_QUEUE_DB_PATH", "app/data/media_jobs.db")
+   JOB_STORAGE_DIR: str = os.getenv("JOB_STORAGE_DIR", "app/data/job_media")
+   JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+   JOB_MAX_PENDING: int = int(os.getenv("JOB_MAX_PENDING", "1000"))
+   JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+   JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+   JOB_RESULT_TTL: float = float(os.getenv("JOB_RESULT_TTL", str(7 * 86400)))
+   # Clients may give a job a priority from 0 to JOB_MAX_PRIORITY (higher runs first).
+   JOB_MAX_PRIORITY: int = int(os.getenv("JOB_MAX_PRIORITY", "9"))
+   # Job callbacks are POSTed by the server, so callback URLs may not point at loopback,
+   # link-local, private or otherwise non-public addresses. With JOB_CALLBACK_ALLOWED_HOSTS
+   # (comma-separated host names) set, only those hosts are accepted, whatever they resolve to.
+   JOB_CALLBACK_ALLOWED_HOSTS: list = [
+       host.strip().lower() for host in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+   ]
+
+
+   # Suspicious-language lexicon
+   # JSON file mapping each flag category to its phrases. It is re-read when it changes
+   # on disk, checked at most once every LEXICON_RELOAD_INTERVAL seconds.
+   SCAM_LEXICON_PATH: str = os.getenv("SCAM_LEXICON_PATH", "app/data/scam_lexicon.json")
+   LEXICON_RELOAD_INTERVAL: float = float(os.getenv("LEXICON_RELOAD_INTERVAL", "5"))
+
+
+   # Verification result cache
+   # In-memory LRU size and entry lifetime. Set RESULT_CACHE_DB_PATH (e.g. ./result_cache.db)
+   # to add a SQLite tier that survives restarts; leave it empty to keep the cache in memory only.
+   RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+   RESULT_CACHE_TTL: float = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+   RESULT_CACHE_DB_PATH: str = os.getenv("RESULT_CACHE_DB_PATH", "")
+
+
+   # Dashboard feed
+   # Append-only feed log written by `data_ingestion/run_aggregation_job.py`; until it has been
+   # published, the JSON file at DASHBOARD_FEED_PATH is served instead. The feed is served from
+   # memory and re-read when it changes, checked at most once every FEED_RELOAD_INTERVAL seconds.
+   FEED_LOG_DIR: str = os.getenv("FEED_LOG_DIR", "app/data/feed_log")
+   DASHBOARD_FEED_PATH: str = os.getenv("DASHBOARD_FEED_PATH", "app/data/aggregated_feed.json")
+   FEED_RELOAD_INTERVAL: float = float(os.getenv("FEED_RELOAD_INTERVAL", "1"))
+   # Live stream of new feed items (/dashboard/feed/stream). The feed log is checked for new
+   # items every FEED_STREAM_POLL_INTERVAL seconds. A client more than FEED_STREAM_QUEUE_SIZE
+   # items behind is dropped, and up to FEED_STREAM_REPLAY_MAX missed items are replayed when
+   # it reconnects. Idle streams get a keep-alive every FEED_STREAM_HEARTBEAT seconds.
+   FEED_STREAM_POLL_INTERVAL: float = float(os.getenv("FEED_STREAM_POLL_INTERVAL", "1"))
+   FEED_STREAM_QUEUE_SIZE: int = int(os.getenv("FEED_STREAM_QUEUE_SIZE", "256"))
+   FEED_STREAM_MAX_SUBSCRIBERS: int = int(os.getenv("FEED_STREAM_MAX_SUBSCRIBERS", "10000"))
+   FEED_STREAM_REPLAY_MAX: int = int(os.getenv("FEED_STREAM_REPLAY_MAX", "1000"))
+   FEED_STREAM_HEARTBEAT: float = float(os.getenv("FEED_STREAM_HEARTBEAT", "15"))
+
+
+   # Official records used for cross-verification
+   # The SQLite store is built by `data_ingestion/build_official_records.py`. If it does not
+   # exist yet, an in-memory store is seeded from OFFICIAL_COMPANIES_PATH instead. A rebuilt
+   # store is picked up without a restart, checked at most every OFFICIAL_RECORDS_RELOAD_INTERVAL seconds.
+   OFFICIAL_RECORDS_DB_PATH: str = os.getenv("OFFICIAL_RECORDS_DB_PATH", "app/data/official_records.db")
+   OFFICIAL_RECORDS_RELOAD_INTERVAL: float = float(os.getenv("OFFICIAL_RECORDS_RELOAD_INTERVAL", "10"))
+   OFFICIAL_COMPANIES_PATH: str = os.getenv("OFFICIAL_COMPANIES_PATH", "app/data/official_companies.json")
+   # Prebuilt fuzzy name-resolution index, and the minimum similarity (0-1) for a mention
+   # to be resolved to a company when no exact, alias or ticker match exists.
+   COMPANY_INDEX_PATH: str = os.getenv("COMPANY_INDEX_PATH", "app/data/company_name_index.pkl")
+   ENTITY_MATCH_THRESHOLD: float = float(os.getenv("ENTITY_MATCH_THRESHOLD", "0.8"))
+
+
+   # Deepfake detection
+   # TorchScript model scoring RGB face crops; without it, the service uses its mock verdict.
+   # Frames are sampled by DEEPFAKE_SAMPLING_MODE: "keyframe", "every_nth" or "scene_change".
+   DEEPFAKE_MODEL_PATH: str = os.getenv("DEEPFAKE_MODEL_PATH", "")
+   DEEPFAKE_SAMPLING_MODE: str = os.getenv("DEEPFAKE_SAMPLING_MODE", "every_nth")
+   DEEPFAKE_EVERY_NTH: int = int(os.getenv("DEEPFAKE_EVERY_NTH", "15"))
+   DEEPFAKE_MAX_FRAMES: int = int(os.getenv("DEEPFAKE_MAX_FRAMES", "300"))
+   DEEPFAKE_BATCH_SIZE: int = int(os.getenv("DEEPFAKE_BATCH_SIZE", "16"))
+   DEEPFAKE_EARLY_EXIT_CONFIDENCE: float = float(os.getenv("DEEPFAKE_EARLY_EXIT_CONFIDENCE", "0.9"))
+   DEEPFAKE_TORCH_THREADS: int = int(os.getenv("DEEPFAKE_TORCH_THREADS", "2"))
+
+
+   # Speech-to-text
+   # faster-whisper model (a size such as "base.en", or a path) run on CPU with int8 weights;
+   # without it, the service uses its mock transcript. Audio is transcribed in windows of
+   # STT_CHUNK_SECONDS overlapping by STT_OVERLAP_SECONDS, STT_WORKERS at a time. Windows with
+   # too little audio above STT_VAD_THRESHOLD_DB (dBFS) are skipped as silence.
+   STT_MODEL: str = os.getenv("STT_MODEL", "")
+   STT_CHUNK_SECONDS: float = float(os.getenv("STT_CHUNK_SECONDS", "30"))
+   STT_OVERLAP_SECONDS: float = float(os.getenv("STT_OVERLAP_SECONDS", "2"))
+   STT_WORKERS: int = int(os.getenv("STT_WORKERS", "2"))
+   STT_VAD_THRESHOLD_DB: float = float(os.getenv("STT_VAD_THRESHOLD_DB", "-40"))
+   STT_THREADS_PER_WORKER: int = int(os.getenv("STT_THREADS_PER_WORKER", "1"))
+
+
+   # Model loading
+   # "warmup": load every model in the background at startup; /health/ready reports 503 until done.
+   # "lazy": load each model on first use; the server is ready immediately.
+   # "preload": like "warmup", but models that can be shared are also loaded when app.main is
+   #            imported, so workers forked afterwards (gunicorn --preload) share their memory.
+   MODEL_LOADING: str = os.getenv("MODEL_LOADING", "warmup")
+
+
+   # Logging and metrics
+   # LOG_LEVEL is DEBUG, INFO, WARNING or ERROR; per-request progress lines are DEBUG. The same
+   # message is logged at most LOG_RATE_LIMIT_BURST times per LOG_RATE_LIMIT_WINDOW seconds.
+   # The ingestion job writes its metrics to INGESTION_METRICS_PATH after each run, and /metrics
+   # serves them alongside the server's own; leave it empty to skip.
+   LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+   LOG_RATE_LIMIT_BURST: int = int(os.getenv("LOG_RATE_LIMIT_BURST", "10"))
+   LOG_RATE_LIMIT_WINDOW: float = float(os.getenv("LOG_RATE_LIMIT_WINDOW", "60"))
+   INGESTION_METRICS_PATH: str = os.getenv("INGESTION_METRICS_PATH", "app/data/ingestion_metrics.prom")
+
+
 # Create a single, importable instance of the settings
 settings = Settings()
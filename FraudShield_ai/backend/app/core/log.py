@@ -0,0 +1,77 @@
+# --- log.py ---
+# Logging setup for the API server and the ingestion job.
+# Modules log through the standard `logging` module at a level (per-request progress is
+# DEBUG, so it is skipped by a level check before any formatting when disabled), and every
+# message is rate-limited so a failing dependency cannot flood the output.
+
+
+import logging
+import threading
+import time
+
+
+from app.core.config import settings
+
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Libraries that log every HTTP request at INFO.
+QUIET_LOGGERS = ("httpx", "httpcore", "urllib3")
+
+
+class RateLimitFilter(logging.Filter):
+   """
+   Lets through at most `burst` records with the same message template every `window`
+   seconds. The first record after a quiet window says how many were suppressed.
+
+
+   Records are grouped by their unformatted message (`logger.info("Loaded %s", path)`
+   counts as one message whatever the path), so the state stays small.
+
+
+   Args:
+       burst (int): Records per message per window.
+       window (float): Length of the window in seconds.
+   """
+
+   def __init__(self, burst: int = 10, window: float = 60.0):
+       super().__init__()
+       self.burst = burst
+       self.window = window
+       self._state = {}  # (logger, level, template) -> [window start, records passed, records suppressed]
+       self._lock = threading.Lock()
+
+
+   def filter(self, record: logging.LogRecord) -> bool:
+       key = (record.name, record.levelno, record.msg)
+       now = time.monotonic()
+       with self._lock:
+           state = self._state.get(key)
+           if state is None or now - state[0] >= self.window:
+               suppressed = state[2] if state else 0
+               self._state[key] = [now, 1, 0]
+               if suppressed:
+                   record.msg = f"{record.msg} [{suppressed} similar messages suppressed]"
+               return True
+           if state[1] < self.burst:
+               state[1] += 1
+               return True
+           state[2] += 1
+           return False
+
+
+def configure_logging(level: str = None):
+   """
+   Sends log records to stderr at `level` (LOG_LEVEL by default), rate-limited.
+   Calling it again only changes the level.
+   """
+   root = logging.getLogger()
+   root.setLevel((level or settings.LOG_LEVEL).upper())
+   if not any(getattr(handler, "marketguard", False) for handler in root.handlers):
+       handler = logging.StreamHandler()
+       handler.marketguard = True
+       handler.setFormatter(logging.Formatter(LOG_FORMAT))
+       handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT_BURST, settings.LOG_RATE_LIMIT_WINDOW))
+       root.addHandler(handler)
+   for name in QUIET_LOGGERS:
+       logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
@@ -0,0 +1,306 @@
+# --- metrics.py ---
+# Counters and latency histograms for the API and the ingestion job, exposed at /metrics
+# in the Prometheus text format. Recording a value is a dictionary lookup and a few
+# additions under a lock, cheap enough for every request and every pipeline stage.
+
+
+import bisect
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+# Upper bounds (seconds) of the latency buckets: from sub-millisecond cache hits and NLP
+# calls up to minutes of media inference.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+INF_BUCKET = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+   return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+   pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+   if extra:
+       pairs.append(extra)
+   return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+   if value == float("inf"):
+       return "+Inf"
+   return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+   """
+   A monotonically increasing count, one series per combination of label values.
+   """
+
+   kind = "counter"
+
+   def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+       self.name = name
+       self.documentation = documentation
+       self.labelnames = tuple(labelnames)
+       self._values = {}
+       self._lock = threading.Lock()
+
+
+   def inc(self, *labels, amount: float = 1):
+       with self._lock:
+           self._values[labels] = self._values.get(labels, 0) + amount
+
+
+   def value(self, *labels) -> float:
+       return self._values.get(labels, 0)
+
+
+   def samples(self) -> list:
+       with self._lock:
+           values = dict(self._values)
+       return [f"{self.name}_total{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in sorted(values.items())]
+
+
+class Histogram:
+   """
+   A distribution of observed values (usually seconds) over fixed buckets, one series per
+   combination of label values. Percentiles are computed by Prometheus from the buckets.
+   """
+
+   kind = "histogram"
+
+   def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+       self.name = name
+       self.documentation = documentation
+       self.labelnames = tuple(labelnames)
+       self.buckets = tuple(sorted(buckets))
+       self._series = {}  # label values -> [bucket counts..., sum, count]
+       self._lock = threading.Lock()
+
+
+   def observe(self, value: float, *labels):
+       index = bisect.bisect_left(self.buckets, value)
+       with self._lock:
+           series = self._series.get(labels)
+           if series is None:
+               series = self._series[labels] = [0] * (len(self.buckets) + 2)
+           # Counts per bucket; made cumulative when rendered.
+           if index < len(self.buckets):
+               series[index] += 1
+           series[-2] += value
+           series[-1] += 1
+
+
+   def time(self, *labels) -> "_Timer":
+       """
+       Observes the duration of the `with` block, also when it raises.
+       """
+       return _Timer(self, labels)
+
+
+   def count(self, *labels) -> int:
+       series = self._series.get(labels)
+       return series[-1] if series else 0
+
+
+   def samples(self) -> list:
+       with self._lock:
+           series_by_labels = {labels: list(series) for labels, series in self._series.items()}
+       lines = []
+       for labels, series in sorted(series_by_labels.items()):
+           cumulative = 0
+           for bound, bucket_count in zip(self.buckets, series):
+               cumulative += bucket_count
+               le = f'le="{_number(bound)}"'
+               lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+           lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, INF_BUCKET)} {series[-1]}")
+           lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-2])}")
+           lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+       return lines
+
+
+class _Timer:
+   # A plain class rather than @contextmanager: it is entered on every pipeline stage,
+   # and skipping the generator machinery makes it several times cheaper.
+   __slots__ = ("histogram", "labels", "start")
+
+   def __init__(self, histogram: Histogram, labels: tuple):
+       self.histogram = histogram
+       self.labels = labels
+
+
+   def __enter__(self):
+       self.start = time.perf_counter()
+       return self
+
+
+   def __exit__(self, *exc_info):
+       self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+       return False
+
+
+class CallbackMetric:
+   """
+   A counter or gauge read from a service's own statistics when metrics are rendered,
+   so the service keeps counting the way it already does.
+   `read` returns a number, or a dict mapping label-value tuples to numbers.
+   """
+
+   def __init__(self, name: str, documentation: str, kind: str, read, labelnames: tuple = ()):
+       self.name = name
+       self.documentation = documentation
+       self.kind = kind
+       self.read = read
+       self.labelnames = tuple(labelnames)
+
+
+   def samples(self) -> list:
+       values = self.read()
+       if not isinstance(values, dict):
+           values = {(): values}
+       suffix = "_total" if self.kind == "counter" else ""
+       return [f"{self.name}{suffix}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in sorted(values.items())]
+
+
+class MetricsRegistry:
+   """
+   The metrics of this process, rendered together for /metrics.
+   """
+
+   def __init__(self):
+       self._metrics = {}
+
+
+   def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+       return self._register(Counter(name, documentation, labelnames))
+
+
+   def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+       return self._register(Histogram(name, documentation, labelnames, buckets))
+
+
+   def callback(self, name: str, documentation: str, kind: str, read, labelnames: tuple = ()) -> CallbackMetric:
+       return self._register(CallbackMetric(name, documentation, kind, read, labelnames))
+
+
+   def render(self) -> str:
+       """
+       Returns every metric in the Prometheus text exposition format (version 0.0.4).
+       """
+       lines = []
+       for metric in self._metrics.values():
+           try:
+               samples = metric.samples()
+           except Exception as e:
+               # One failing statistics source must not take the whole scrape down.
+               logger.warning("Error reading metric %s: %s", metric.name, e)
+               continue
+           lines.append(f"# HELP {metric.name} {metric.documentation}")
+           lines.append(f"# TYPE {metric.name} {metric.kind}")
+           lines.extend(samples)
+       return "\n".join(lines) + "\n"
+
+
+   def write_textfile(self, path: str):
+       """
+       Writes the metrics to a file, atomically, for processes that are not scraped
+       themselves (the ingestion job); the API server includes the file in /metrics.
+       """
+       tmp_path = f"{path}.tmp"
+       with open(tmp_path, "w", encoding="utf-8") as f:
+           f.write(self.render())
+       os.replace(tmp_path, path)
+
+
+   def _register(self, metric):
+       if metric.name in self._metrics:
+           raise ValueError(f"Metric '{metric.name}' is already registered.")
+       self._metrics[metric.name] = metric
+       return metric
+
+
+# Create a single registry for the process
+metrics = MetricsRegistry()
+
+
+# --- Metrics shared across modules ---
+# Time spent in each stage of a verification: upload, deepfake_inference, stt, nlp,
+# cross_verification and risk_scoring.
+STAGE_SECONDS = metrics.histogram(
+   "marketguard_stage_duration_seconds",
+   "Time spent in each verification pipeline stage.",
+   ("stage",)
+)
+
+
+def stage_timer(stage: str):
+   """
+   Times a pipeline stage: `with stage_timer("nlp"): ...`.
+   """
+   return STAGE_SECONDS.time(stage)
+
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+   "marketguard_http_request_duration_seconds",
+   "Time from receiving a request to sending its response headers, by route.",
+   ("method", "route", "status")
+)
+
+
+def route_template(scope: dict) -> str:
+   """
+   The path template of the route that handled the request, with its router prefixes.
+   Routes of included routers only know their own part of the path, so the prefix is taken
+   from the request path, in front of the part the route matched.
+   """
+   route = scope.get("route")
+   if route is None:
+       return "unmatched"
+   try:
+       local_path = route.url_path_for(route.name, **scope.get("path_params", {}))
+   except Exception:
+       return route.path
+   return scope["path"].removesuffix(local_path) + route.path if scope["path"].endswith(local_path) else route.path
+
+
+class MetricsMiddleware:
+   """
+   ASGI middleware recording the latency of every HTTP request by route template (e.g.
+   /api/verification/jobs/{job_id}), so URL parameters don't create new series. Latency is
+   measured up to the response headers, which keeps long-lived streams (SSE) meaningful.
+   """
+
+   def __init__(self, app):
+       self.app = app
+
+
+   async def __call__(self, scope, receive, send):
+       if scope["type"] != "http":
+           await self.app(scope, receive, send)
+           return
+       start = time.perf_counter()
+       observed = False
+
+       def observe(status_code: int):
+           nonlocal observed
+           observed = True
+           HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route_template(scope), str(status_code))
+
+       async def send_and_observe(message):
+           if message["type"] == "http.response.start" and not observed:
+               observe(message["status"])
+           await send(message)
+
+       try:
+           await self.app(scope, receive, send_and_observe)
+       except Exception:
+           # Unhandled errors are turned into a 500 by the server error middleware outside this one.
+           if not observed:
+               observe(500)
+           raise
@@ -0,0 +1,256 @@
+# --- rate_limit.py ---
+# Per-client admission control for the verification endpoints. Each API key gets a token
+# bucket and a concurrency cap per kind of request (text or media), so one client sending
+# a flood of uploads is turned away with a 429 instead of queueing everyone else's
+# requests behind its own in the media pipeline.
+
+
+import json
+import logging
+import math
+import time
+
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Rejected requests, by kind and by the limit they hit ("rate" or "concurrency").
+REJECTED_REQUESTS = metrics.counter(
+   "marketguard_rate_limited_requests",
+   "Requests rejected with 429 by the per-client admission control.",
+   ("kind", "reason")
+)
+
+
+class RateLimitExceeded(Exception):
+   """
+   Raised when a client is over one of its limits.
+   `retry_after` is the number of seconds after which the request would be admitted.
+   """
+
+   def __init__(self, message: str, reason: str, retry_after: float):
+       super().__init__(message)
+       self.reason = reason
+       self.retry_after = retry_after
+
+
+class Limit:
+   """
+   The limits of one kind of request: `rate` requests per second on average, bursts of up to
+   `burst` requests, and at most `max_concurrent` requests in flight.
+   """
+
+   __slots__ = ("rate", "burst", "max_concurrent")
+
+   def __init__(self, rate: float, burst: int, max_concurrent: int):
+       if rate <= 0 or burst < 1 or max_concurrent < 1:
+           raise ValueError("rate must be positive, burst and max_concurrent at least 1.")
+       self.rate = float(rate)
+       self.burst = float(burst)
+       self.max_concurrent = max_concurrent
+
+
+class TokenBucket:
+   """
+   The state of one client for one kind of request: its tokens, refilled lazily on each
+   request from the time elapsed since the last one, and its requests in flight.
+   """
+
+   __slots__ = ("limit", "tokens", "updated", "active")
+
+   def __init__(self, limit: Limit, now: float):
+       self.limit = limit
+       self.tokens = limit.burst
+       self.updated = now
+       self.active = 0
+
+
+   def take(self, now: float, cost: float = 1) -> float:
+       """
+       Takes `cost` tokens if there are enough.
+
+
+       Returns:
+           float: 0 if the tokens were taken, otherwise the seconds until there will be enough.
+       """
+       tokens = min(self.limit.burst, self.tokens + (now - self.updated) * self.limit.rate)
+       self.updated = now
+       if tokens >= cost:
+           self.tokens = tokens - cost
+           return 0.0
+       self.tokens = tokens
+       return (cost - tokens) / self.limit.rate
+
+
+   def idle(self, now: float) -> bool:
+       """
+       True if the bucket is refilled and unused, i.e. no different from a new one.
+       """
+       return self.active == 0 and self.tokens + (now - self.updated) * self.limit.rate >= self.limit.burst
+
+
+class RateLimiter:
+   """
+   In-memory token-bucket rate limiter with concurrency caps, keyed by client.
+
+
+   Admitting a request is two dictionary lookups and a little arithmetic. It is meant to be
+   called from the event loop only, so it takes no locks; each server process keeps its own
+   buckets, which makes the effective limits per process.
+
+
+   Args:
+       limits (dict): Default `Limit` per request kind.
+       overrides (dict): Client -> {kind: Limit} for clients with their own limits.
+       max_clients (int): Tracked clients above which idle ones are forgotten. Idle clients have
+                          full buckets, so forgetting them changes nothing.
+   """
+
+   def __init__(self, limits: dict, overrides: dict = None, max_clients: int = 100_000, clock=time.monotonic):
+       self.limits = limits
+       self.overrides = overrides or {}
+       self.max_clients = max_clients
+       self.enabled = True
+       self._clock = clock
+       self._clients = {}
+       self._prune_at = max_clients
+
+
+   def acquire(self, client: str, kind: str, cost: float = 1):
+       """
+       Admits one request of `kind` for `client`; every admitted request must be released.
+
+
+       Raises:
+           RateLimitExceeded: If the client has `max_concurrent` requests of this kind in flight,
+                              or not enough tokens left.
+       """
+       if not self.enabled:
+           return
+       now = self._clock()
+       buckets = self._clients.get(client)
+       if buckets is None:
+           buckets = self._add_client(client, now)
+       bucket = buckets[kind]
+       if bucket.active >= bucket.limit.max_concurrent:
+           REJECTED_REQUESTS.inc(kind, "concurrency")
+           raise RateLimitExceeded(
+               f"Too many concurrent {kind} requests (at most {bucket.limit.max_concurrent}).",
+               "concurrency",
+               1.0
+           )
+       wait = bucket.take(now, cost)
+       if wait:
+           REJECTED_REQUESTS.inc(kind, "rate")
+           raise RateLimitExceeded(f"Rate limit exceeded for {kind} requests.", "rate", wait)
+       bucket.active += 1
+
+
+   def consume(self, client: str, kind: str, cost: float):
+       """
+       Takes `cost` more tokens for a request already admitted by `acquire`, e.g. once its
+       body shows how much work it is. The cost is capped at the bucket's burst, so any
+       request can eventually be afforded.
+
+
+       Raises:
+           RateLimitExceeded: If the client does not have enough tokens left.
+       """
+       if not self.enabled or cost <= 0:
+           return
+       now = self._clock()
+       buckets = self._clients.get(client)
+       if buckets is None:
+           buckets = self._add_client(client, now)
+       bucket = buckets[kind]
+       wait = bucket.take(now, min(cost, bucket.limit.burst))
+       if wait:
+           REJECTED_REQUESTS.inc(kind, "rate")
+           raise RateLimitExceeded(f"Rate limit exceeded for {kind} requests.", "rate", wait)
+
+
+   def release(self, client: str, kind: str):
+       """
+       Marks a request admitted by `acquire` as finished.
+       """
+       buckets = self._clients.get(client)
+       if buckets is not None and buckets[kind].active > 0:
+           buckets[kind].active -= 1
+
+
+   @property
+   def client_count(self) -> int:
+       # Safe to read from other threads (e.g. /metrics), unlike the per-client details in stats().
+       return len(self._clients)
+
+
+   def stats(self) -> dict:
+       return {
+           "enabled": self.enabled,
+           "clients": len(self._clients),
+           "active": {kind: sum(buckets[kind].active for buckets in self._clients.values()) for kind in self.limits}
+       }
+
+
+   def _add_client(self, client: str, now: float) -> dict:
+       if len(self._clients) >= self._prune_at:
+           self._prune(now)
+       limits = {**self.limits, **self.overrides.get(client, {})}
+       buckets = {kind: TokenBucket(limit, now) for kind, limit in limits.items()}
+       self._clients[client] = buckets
+       return buckets
+
+
+   def _prune(self, now: float):
+       """
+       Forgets idle clients. The next pass is scheduled once the table has grown by half
+       again, so the scan is amortized over the clients added in between.
+       """
+       self._clients = {
+           client: buckets for client, buckets in self._clients.items()
+           if not all(bucket.idle(now) for bucket in buckets.values())
+       }
+       self._prune_at = max(self.max_clients, len(self._clients) * 3 // 2)
+       logger.debug("Rate limiter tracks %d clients after pruning idle ones.", len(self._clients))
+
+
+def retry_after_header(seconds: float) -> str:
+   """
+   Retry-After takes whole seconds; rounding up means a client that waits that long is admitted.
+   """
+   return str(max(1, math.ceil(seconds)))
+
+
+def load_overrides(value: str) -> dict:
+   """
+   Parses API_KEY_LIMITS: {"<key>": {"<kind>": {"rate": ..., "burst": ..., "max_concurrent": ...}}}.
+   Fields left out keep the default of that kind.
+   """
+   if not value:
+       return {}
+   overrides = {}
+   for client, kinds in json.loads(value).items():
+       overrides[client] = {}
+       for kind, fields in kinds.items():
+           if kind not in DEFAULT_LIMITS:
+               raise ValueError(f"Unknown request kind '{kind}' in API_KEY_LIMITS.")
+           default = DEFAULT_LIMITS[kind]
+           overrides[client][kind] = Limit(
+               fields.get("rate", default.rate),
+               fields.get("burst", default.burst),
+               fields.get("max_concurrent", default.max_concurrent)
+           )
+   return overrides
+
+
+DEFAULT_LIMITS = {
+   "text": Limit(settings.TEXT_RATE, settings.TEXT_BURST, settings.TEXT_MAX_CONCURRENT),
+   "media": Limit(settings.MEDIA_RATE, settings.MEDIA_BURST, settings.MEDIA_MAX_CONCURRENT)
+}
+
+# Create a single instance of the limiter for the API
+rate_limiter = RateLimiter(DEFAULT_LIMITS, load_overrides(settings.API_KEY_LIMITS))
+rate_limiter.enabled = settings.RATE_LIMIT_ENABLED
@@ -0,0 +1,48 @@
+# --- responses.py ---
+# Fast JSON responses for the routes that return large or frequent payloads.
+# Returning a plain dict makes FastAPI walk it through `jsonable_encoder` (a pure-Python
+# copy of the whole structure) before json.dumps; these routes instead serialize their
+# payload in one native call, and hand bodies that are already JSON bytes through as-is.
+
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+# orjson is the fastest encoder; without it Pydantic's own (Rust) serializer is used.
+try:
+   import orjson
+except ImportError:
+   orjson = None
+
+
+def _fallback(value):
+   # NumPy scalars and arrays, e.g. from model outputs.
+   if hasattr(value, "tolist"):
+       return value.tolist()
+   raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+   """
+   Serializes `content` to compact UTF-8 JSON, like JSONResponse does, in a single native call.
+   """
+   if orjson is not None:
+       return orjson.dumps(content, default=_fallback, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+   return to_json(content, fallback=_fallback)
+
+
+class FastJSONResponse(JSONResponse):
+   """
+   JSONResponse that serializes with `dumps`. Bytes are taken to be serialized JSON already
+   (e.g. a cached feed) and sent without being decoded or re-encoded.
+
+
+   Routes return it directly, which also skips `jsonable_encoder` and response model
+   validation; their `response_model` only documents the payload.
+   """
+
+   def render(self, content) -> bytes:
+       if isinstance(content, (bytes, bytearray, memoryview)):
+           return bytes(content)
+       return dumps(content)
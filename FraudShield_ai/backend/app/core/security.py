@@ -1,54 +1,158 @@
 # --- security.py ---
-# This file handles the security aspects of the API, such as API key validation.
+# This file handles the security aspects of the API, such as API key validation
+# and per-client admission control (see rate_limit.py).
 
 
-from fastapi import Security, HTTPException, status
+from typing import Optional
+
+
+from fastapi import Security, HTTPException, Request, status
 from fastapi.security import APIKeyHeader
 
 
 from app.core.config import settings
+from app.core.rate_limit import rate_limiter, retry_after_header, RateLimitExceeded
 
 
 # Define the name of the header where the API key is expected.
 # The client should send the key in the format: "Authorization: Bearer <YOUR_API_KEY>"
-api_key_header = APIKeyHeader(name="Authorization")
+# A missing header is reported by `get_api_key` itself, since the API may run without keys.
+api_key_header = APIKeyHeader(name="Authorization", auto_error=False)
+
+# The allowed keys as a set, so checking a key is one hash lookup however many clients there are.
+allowed_api_keys = frozenset(settings.ALLOWED_API_KEYS)
 
 
-def get_api_key(authorization: str = Security(api_key_header)) -> str:
+def get_api_key(authorization: Optional[str] = Security(api_key_header)) -> str:
    """
    Dependency function to validate the API key from the Authorization header.
-  
+
    This function is used in API endpoints to protect them. It checks:
    1. If the Authorization header is present.
    2. If the header format is "Bearer <key>".
    3. If the provided <key> is in the list of allowed keys.
-  
+
    Raises:
        HTTPException: If any of the checks fail.
-      
+
    Returns:
        str: The validated API key if successful.
    """
+   if not authorization:
+       raise HTTPException(
+           status_code=status.HTTP_401_UNAUTHORIZED,
+           detail="Invalid or missing API Key"
+       )
+
    # Check if the header format is correct
    if not authorization.startswith("Bearer "):
        raise HTTPException(
            status_code=status.HTTP_401_UNAUTHORIZED,
            detail="Invalid authorization scheme. Must be 'Bearer'."
        )
-  
+
    # Extract the key from the "Bearer <key>" string
-   api_key = authorization.split(" ")[1]
+   api_key = authorization[len("Bearer "):].strip()
 
 
-   # Check if the provided key is in our list of allowed keys
-   if api_key not in settings.ALLOWED_API_KEYS:
+   # Check if the provided key is in our set of allowed keys
+   if api_key not in allowed_api_keys:
        raise HTTPException(
            status_code=status.HTTP_401_UNAUTHORIZED,
            detail="Invalid or missing API Key"
        )
-  
+
    return api_key
 
 
+class Admission:
+   """
+   A request admitted by `rate_limited`: the client, and the kind of request it is charged as.
+   """
+
+   def __init__(self, client: str, kind: str):
+       self.client = client
+       self.kind = kind
+
+
+   def charge(self, kind: str):
+       """
+       Charges the request as `kind` instead, e.g. as "media" once the body turns out to hold a file.
+
+
+       Raises:
+           HTTPException: 429 if the client is over its limits for `kind`; the request keeps
+                          its current charge, which is released as usual.
+       """
+       if kind == self.kind:
+           return
+       _acquire(self.client, kind)
+       rate_limiter.release(self.client, self.kind)
+       self.kind = kind
+
+
+   def charge_tokens(self, cost: float):
+       """
+       Charges `cost` more tokens of the request's kind, for requests whose size is only known
+       from their body (e.g. a batch of texts).
+
+
+       Raises:
+           HTTPException: 429 if the client does not have enough tokens left.
+       """
+       try:
+           rate_limiter.consume(self.client, self.kind, cost)
+       except RateLimitExceeded as e:
+           raise _too_many_requests(e)
+
+
+def _too_many_requests(e: RateLimitExceeded) -> HTTPException:
+   return HTTPException(
+       status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+       detail=str(e),
+       headers={"Retry-After": retry_after_header(e.retry_after)}
+   )
+
+
+def _acquire(client: str, kind: str):
+   try:
+       rate_limiter.acquire(client, kind)
+   except RateLimitExceeded as e:
+       raise _too_many_requests(e)
+
+
+def rate_limited(kind: str = "text"):
+   """
+   Builds a dependency that identifies the client and admits the request against its limits.
+
+
+   The client is its API key when ALLOWED_API_KEYS is set (a missing or unknown key gets 401),
+   and its IP address otherwise. The request counts against the client's concurrency cap until
+   the response has been sent.
+
+
+   Whether a form holds a file is only known once its body has been parsed, so form endpoints
+   are admitted as "text" and call `Admission.charge("media")` when an upload arrives.
+
+
+   Args:
+       kind (str): "text" or "media", the kind the request is first charged as.
+
+
+   Returns:
+       An async generator dependency that yields the `Admission`.
+   """
+   async def admit(request: Request, authorization: Optional[str] = Security(api_key_header)):
+       if allowed_api_keys:
+           client = get_api_key(authorization)
+       else:
+           client = "ip:" + (request.client.host if request.client else "unknown")
 
+       _acquire(client, kind)
+       admission = Admission(client, kind)
+       try:
+           yield admission
+       finally:
+           rate_limiter.release(client, admission.kind)
 
+   return admit
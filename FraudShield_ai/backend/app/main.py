@@ -2,20 +2,72 @@
 # This is the main entry point for our application.
 # To run this server, navigate to the `backend/` directory in the terminal
 # and run the command: uvicorn app.main:app --reload
+#
+# With several workers, set MODEL_LOADING=preload and let gunicorn import the app before forking,
+# so the workers share the preloaded model weights:
+#   gunicorn app.main:app -k uvicorn.workers.UvicornWorker --workers 4 --preload
+
+
+import asyncio
+from contextlib import asynccontextmanager
 
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+
+from app.core.config import settings
+from app.core.log import configure_logging
+
+
+# Before the services are imported, since they log while initializing.
+configure_logging()
 
 
 from app.api.router import api_router
+from app.core.metrics import metrics, MetricsMiddleware
+from app.core.rate_limit import rate_limiter
+from app.services.model_registry import model_registry
+from app.services.feed_hub import feed_hub
+from app.services.job_queue import media_job_queue
+from app.services.result_cache import result_cache
+from app.services.verification_orchestrator import verification_orchestrator
+
+
+# --- Model Preloading ---
+# Loads the models that can be shared across processes while the app is imported,
+# i.e. in the gunicorn master before it forks the workers.
+if settings.MODEL_LOADING == "preload":
+   model_registry.warm_up(fork_safe_only=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+   # Warm up in the background so the server answers liveness checks right away;
+   # /health/ready reports 503 until every model is loaded.
+   if settings.MODEL_LOADING == "lazy":
+       model_registry.skip_warm_up()
+       warm_up = None
+   else:
+       warm_up = asyncio.create_task(asyncio.to_thread(model_registry.warm_up))
+   # Watches the feed log and pushes new items to /dashboard/feed/stream clients.
+   feed_hub.start()
+   # Runs queued /verification/jobs, including the ones left over from before a restart.
+   media_job_queue.start()
+   yield
+   await media_job_queue.stop()
+   await feed_hub.stop()
+   if warm_up is not None and not warm_up.done():
+       await warm_up
 
 
 # Create the main FastAPI application instance
 app = FastAPI(
    title="MarketGuard AI API",
    description="API for detecting deepfakes and analyzing financial announcements.",
-   version="1.0.0"
+   version="1.0.0",
+   lifespan=lifespan
 )
 
 
@@ -31,6 +83,11 @@ app.add_middleware(
 )
 
 
+# --- Request Metrics ---
+# Latency of every request by route, for /metrics.
+app.add_middleware(MetricsMiddleware)
+
+
 # --- API Router ---
 # Include the main router from `app/api/router.py`.
 # This router contains all the specific endpoints (e.g., /verify, /dashboard_feed).
@@ -44,7 +101,54 @@ def read_root():
    return {"status": "MarketGuard AI server is running"}
 
 
+# --- Liveness and Readiness ---
+# Liveness only says the process is serving requests. Readiness says the models are loaded,
+# so a load balancer should only route traffic to the instance once it returns 200.
+@app.get("/health/live", tags=["Health Check"])
+def liveness():
+   return {"status": "alive"}
 
 
+@app.get("/health/ready", tags=["Health Check"])
+def readiness():
+   status = model_registry.status()
+   return JSONResponse(status, status_code=200 if status["ready"] else 503)
 
 
+# --- Metrics ---
+# Prometheus scrape endpoint: request and pipeline stage latencies, plus the counters the
+# services already keep, and the metrics of the last ingestion job run.
+metrics.callback(
+   "marketguard_result_cache_lookups", "Result cache lookups by outcome.", "counter",
+   lambda: {(outcome,): result_cache.stats()[outcome] for outcome in ("hits", "disk_hits", "misses")},
+   ("outcome",)
+)
+metrics.callback("marketguard_result_cache_entries", "Results held in memory.", "gauge", lambda: result_cache.stats()["entries"])
+metrics.callback(
+   "marketguard_nlp_batches", "NLP batches run for /verify requests.", "counter",
+   lambda: verification_orchestrator.nlp_batcher.batches
+)
+metrics.callback(
+   "marketguard_nlp_batched_texts", "Texts analyzed in NLP batches.", "counter",
+   lambda: verification_orchestrator.nlp_batcher.items
+)
+metrics.callback("marketguard_feed_stream_subscribers", "Connected live feed clients.", "gauge", lambda: feed_hub.subscribers)
+metrics.callback("marketguard_feed_stream_dropped", "Live feed clients dropped for reading too slowly.", "counter", lambda: feed_hub.dropped)
+metrics.callback(
+   "marketguard_jobs", "Verification jobs in the queue by status.", "gauge",
+   lambda: {(status,): count for status, count in media_job_queue.stats()["counts"].items()},
+   ("status",)
+)
+metrics.callback("marketguard_rate_limiter_clients", "Clients tracked by the rate limiter.", "gauge", lambda: rate_limiter.client_count)
+
+
+@app.get("/metrics", tags=["Health Check"], response_class=PlainTextResponse)
+def get_metrics():
+   body = metrics.render()
+   if settings.INGESTION_METRICS_PATH:
+       try:
+           with open(settings.INGESTION_METRICS_PATH, "r", encoding="utf-8") as f:
+               body += f.read()
+       except FileNotFoundError:
+           pass
+   return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -3,27 +3,80 @@
 # against a database of trusted, official information.
 
 
+import logging
+from pathlib import Path
+
+
+from app.core.config import settings
+from app.services.official_records import OfficialRecordsStore
+from app.services.entity_resolver import entity_resolver
+from app.services.model_registry import model_registry
+
+
+logger = logging.getLogger(__name__)
+
+
 class CrossVerifier:
-   def __init__(self):
-       # In a real implementation, this would connect to a database
-       # populated by your data ingestion scripts (from SEBI, BSE, etc.).
-       # For the hackathon, we use a simple hardcoded dictionary as a mock database.
-       self.mock_official_data = {
-           "Innovate Corp": {
-               "latest_growth_claim": "25%",
-               "official_filings": ["Q3 Report Filed", "AGM Announcement"]
-           },
-           "FutureTech Ltd": {
-               "latest_growth_claim": "15%",
-               "official_filings": ["Dividend Declaration"]
-           }
-       }
-       print("Cross Verifier Initialized (using mock database).")
+   def __init__(self, store: OfficialRecordsStore = None):
+       # Official records live in an indexed SQLite store populated by the data ingestion
+       # scripts (see data_ingestion/build_official_records.py). Until that store has been
+       # built, we fall back to an in-memory store seeded with the sample companies.
+       # The store is opened through the model registry on first use or during warm-up. It holds
+       # a SQLite connection, so it is opened in each worker process rather than before forking.
+       self._store = store
+       if store is None:
+           model_registry.register("official_records", self._open_store, fork_safe=False)
+           # The name index is checked against the store's version, so it is loaded after the store.
+           model_registry.register("company_name_index", self._load_name_index, fork_safe=False)
+
+
+   @property
+   def store(self) -> OfficialRecordsStore:
+       store = self._store if self._store is not None else model_registry.get("official_records")
+       # Picks up a rebuilt records database (checked at most once per reload interval).
+       store.reload_if_changed()
+       return store
+
+
+   @property
+   def data_version(self) -> str:
+       """
+       Fingerprint of the reference data. It changes whenever the official records change,
+       which invalidates cached verification results computed against the old records.
+       """
+       return self.store.version
+
+
+   def update_official_data(self, companies: list[dict]):
+       """
+       Replaces the reference data used for verification.
+       See `OfficialRecordsStore.replace_all` for the record format.
+       """
+       self.store.replace_all(companies)
+
+
+   def _open_store(self) -> OfficialRecordsStore:
+       if Path(settings.OFFICIAL_RECORDS_DB_PATH).is_file():
+           store = OfficialRecordsStore(settings.OFFICIAL_RECORDS_DB_PATH, settings.OFFICIAL_RECORDS_RELOAD_INTERVAL)
+       else:
+           store = OfficialRecordsStore.from_companies_file(Path(settings.OFFICIAL_COMPANIES_PATH))
+       logger.info("Cross Verifier Initialized (%d companies from %s).", store.count(), store.db_path)
+       return store
+
+
+   def _load_name_index(self):
+       # Warm-up only: the resolver keeps the index itself and rebuilds it when the records change.
+       entity_resolver.get_index(self.store)
 
 
    def verify_claims(self, entities: dict) -> dict:
        """
-       Verifies extracted entities against the mock database of official data.
+       Verifies extracted entities against the official records store.
+
+
+       All organizations mentioned in the request are resolved with one indexed query,
+       by exact name, normalized name, alias or ticker. Mentions that still don't match
+       (typos such as "Inovate Corp") go through the fuzzy name index.
 
 
        Args:
@@ -34,18 +87,32 @@ class CrossVerifier:
        Returns:
            dict: A result dictionary indicating if claims are verified and detailing any flags.
        """
-       print("Running MOCK cross-verification...")
-      
+       logger.debug("Running cross-verification against official records...")
+
        flags = []
        is_verified = True
 
+       organizations = entities.get("organizations", [])
+       records = self.store.lookup_many(organizations)
+       resolved_entities = {org: {"company_id": record["id"], "name": record["name"], "score": 1.0} for org, record in records.items()}
+
+       unresolved = [org for org in organizations if org not in records]
+       if unresolved:
+           matches = entity_resolver.resolve_many(unresolved, self.store)
+           matched_records = self.store.get_many([company_id for company_id, _ in matches.values()])
+           for org, (company_id, score) in matches.items():
+               if company_id in matched_records:
+                   records[org] = matched_records[company_id]
+                   resolved_entities[org] = {"company_id": company_id, "name": records[org]["name"], "score": round(score, 3)}
+
 
        # Check each organization found in the text
-       for org in entities.get("organizations", []):
-           if org in self.mock_official_data:
+       for org in organizations:
+           record = records.get(org)
+           if record:
                # Check if any percentage claims in the text contradict official data
+               official_claim = record["latest_growth_claim"]
                for percentage in entities.get("percentages", []):
-                   official_claim = self.mock_official_data[org]["latest_growth_claim"]
                    if percentage != official_claim:
                        flags.append(f"Claim Mismatch: '{org}' claim of {percentage} not found. Official record shows {official_claim}.")
                        is_verified = False
@@ -54,7 +121,7 @@ class CrossVerifier:
                is_verified = False
 
 
-       if not flags and entities.get("organizations"):
+       if not flags and organizations:
            summary = "All identified claims align with official records."
        elif flags:
            summary = "Discrepancies found between claims and official records."
@@ -68,7 +135,8 @@ class CrossVerifier:
        return {
            "is_verified": is_verified,
            "flags": flags,
-           "summary": summary
+           "summary": summary,
+           "resolved_entities": resolved_entities
        }
 
 
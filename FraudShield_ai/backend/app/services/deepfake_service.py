@@ -2,62 +2,237 @@
 # This service handles the logic for deepfake detection and speech-to-text transcription.
 
 
-# You would import your deep learning and audio libraries here, e.g.:
-# import cv2
-# from some_deepfake_model_library import MesoNet
-# import speech_recognition as sr
+import logging
+import random
+import time
+
+
+from app.core.config import settings
+from app.core.metrics import stage_timer
+from app.services.model_registry import model_registry
+from app.services.video_pipeline import FramePipeline, SamplingConfig, pipeline_available
+from app.services.speech_pipeline import SpeechPipeline, SpeechConfig, pipeline_available as speech_pipeline_available
+
+
+logger = logging.getLogger(__name__)
+
+# Transcript returned for every file while no speech-to-text model is configured.
+MOCK_TRANSCRIPT = "This is a special announcement from 'Innovate Corp'. We are projecting a 500% growth next quarter. This is a risk-free opportunity for our investors."
 
 
 class DeepfakeService:
    def __init__(self):
-       # In a real implementation, you would load your pre-trained models here.
-       # self.deepfake_model = self.load_deepfake_model('path/to/your/model.pth')
-       # self.stt_recognizer = sr.Recognizer()
-       print("Deepfake Service Initialized (using mock logic).")
+       # Frames are decoded, sampled and cropped by the video pipeline (see video_pipeline.py).
+       self.frame_pipeline = FramePipeline(SamplingConfig(
+           mode=settings.DEEPFAKE_SAMPLING_MODE,
+           every_nth=settings.DEEPFAKE_EVERY_NTH,
+           max_frames=settings.DEEPFAKE_MAX_FRAMES,
+           batch_size=settings.DEEPFAKE_BATCH_SIZE,
+           early_exit_confidence=settings.DEEPFAKE_EARLY_EXIT_CONFIDENCE
+       ))
+       # Audio is transcribed in overlapping windows, silence skipped (see speech_pipeline.py).
+       self.speech_pipeline = SpeechPipeline(SpeechConfig(
+           chunk_seconds=settings.STT_CHUNK_SECONDS,
+           overlap_seconds=settings.STT_OVERLAP_SECONDS,
+           workers=settings.STT_WORKERS,
+           vad_threshold_db=settings.STT_VAD_THRESHOLD_DB
+       ))
+       # The models are loaded through the registry on first use or during warm-up, not at import.
+       model_registry.register("deepfake_model", self._load_configured_model)
+       model_registry.register("stt_model", self._load_configured_stt_model)
+
+
+   @property
+   def deepfake_model(self):
+       """
+       The loaded detection model, or None when running on mock logic.
+       """
+       return model_registry.get("deepfake_model")
+
+
+   def _load_configured_model(self):
+       model = self.load_deepfake_model(settings.DEEPFAKE_MODEL_PATH) if settings.DEEPFAKE_MODEL_PATH else None
+       if model is None:
+           logger.info("Deepfake Service Initialized (using mock logic).")
+       else:
+           logger.info("Deepfake Service Initialized (model: %s).", settings.DEEPFAKE_MODEL_PATH)
+       return model
+
+
+   @property
+   def stt_model(self):
+       """
+       The loaded speech-to-text model, or None when running on the mock transcript.
+       """
+       return model_registry.get("stt_model")
+
+
+   def _load_configured_stt_model(self):
+       model = self.load_stt_model(settings.STT_MODEL) if settings.STT_MODEL else None
+       if model is None:
+           logger.info("Speech-to-text Initialized (using mock transcript).")
+       else:
+           logger.info("Speech-to-text Initialized (model: %s).", settings.STT_MODEL)
+       return model
+
+
+   def load_stt_model(self, model_name: str):
+       """
+       Loads a faster-whisper model for CPU inference with int8 weights. It runs in native code
+       that releases the GIL, with one inference worker per speech pipeline worker.
+
+
+       Returns:
+           callable: Maps 16 kHz mono float32 samples to [(start, end, text)] segments,
+                     or None if the model could not be loaded.
+       """
+       if not speech_pipeline_available():
+           logger.warning("PyAV is not installed. Falling back to the mock transcript.")
+           return None
+       try:
+           from faster_whisper import WhisperModel
+       except ImportError:
+           logger.warning("faster-whisper is not installed. Falling back to the mock transcript.")
+           return None
+
+       model = WhisperModel(
+           model_name,
+           device="cpu",
+           compute_type="int8",
+           cpu_threads=settings.STT_THREADS_PER_WORKER,
+           num_workers=settings.STT_WORKERS
+       )
+
+       def transcribe(samples):
+           # Windows are independent and already stripped of silence.
+           segments, _ = model.transcribe(samples, beam_size=1, condition_on_previous_text=False)
+           return [(segment.start, segment.end, segment.text) for segment in segments]
+
+       return transcribe
 
 
    def load_deepfake_model(self, model_path):
        """
        Loads the pre-trained deepfake detection model from a file.
+
+
+       The model must be TorchScript, take a float batch shaped (N, 3, H, W) scaled to [0, 1],
+       and return one logit per image. It is pinned to the CPU.
+
+
+       Returns:
+           callable: Maps a uint8 (N, H, W, 3) RGB batch to N fake probabilities,
+                     or None if the model could not be loaded.
        """
-       # Placeholder for actual model loading logic
-       pass
+       if not pipeline_available():
+           logger.warning("OpenCV is not installed. Falling back to mock deepfake detection.")
+           return None
+       try:
+           import torch
+       except ImportError:
+           logger.warning("PyTorch is not installed. Falling back to mock deepfake detection.")
+           return None
+
+       torch.set_num_threads(settings.DEEPFAKE_TORCH_THREADS)
+       model = torch.jit.load(model_path, map_location="cpu").eval()
 
+       def predict(batch):
+           with torch.inference_mode():
+               images = torch.from_numpy(batch).permute(0, 3, 1, 2).float().div_(255)
+               return torch.sigmoid(model(images)).reshape(-1).numpy()
 
-   def run_inference(self, file_path: str) -> dict:
+       return predict
+
+
+   def run_inference(self, file_path: str, transcribe: bool = True) -> dict:
        """
        Runs deepfake detection and speech-to-text on the given file.
-      
-       This is a MOCK function for the hackathon. It returns random/hardcoded results.
-       In a real implementation, this function would:
-       1.  Deepfake Analysis: Use OpenCV to extract frames, detect faces, and pass them through a pre-trained model.
-       2.  Speech-to-Text: Extract the audio stream from the video, use a library like SpeechRecognition or a Hugging Face model
-           (e.g., Whisper) to transcribe the audio into text.
+
+
+       1.  Deepfake Analysis: The frame pipeline decodes a sample of the video's frames (keyframes,
+           every Nth frame, or one per scene change), crops faces, and scores them with the model
+           in batches, stopping early once the verdict is clear. Without a model this step is mocked.
+       2.  Speech-to-Text: The whole transcript of `transcribe_segments`. Callers that want to
+           analyze the transcript while it is produced pass transcribe=False and iterate over
+           `transcribe_segments` themselves.
        """
-       print(f"Running MOCK deepfake and STT analysis on {file_path}...")
-      
-       # Simulate model processing delay
-       import time
-       time.sleep(2)
-      
-       import random
-      
-       # --- 1. Mock Deepfake Analysis ---
-       is_deepfake = random.choice([True, False])
-       confidence = random.uniform(0.75, 0.98) if is_deepfake else random.uniform(0.05, 0.20)
-      
-       # --- 2. Mock Speech-to-Text (STT) Analysis ---
-       # This simulates extracting the speech from the video/audio file.
-       # The transcribed text can then be sent to the NLP service for content verification.
-       transcribed_text = "This is a special announcement from 'Innovate Corp'. We are projecting a 500% growth next quarter. This is a risk-free opportunity for our investors."
+       logger.debug("Running deepfake and STT analysis on %s...", file_path)
 
+       # --- 1. Deepfake Analysis ---
+       with stage_timer("deepfake_inference"):
+           model = self.deepfake_model
+           if model is not None:
+               frame_analysis = self.frame_pipeline.analyze(file_path, model)
+               is_deepfake = frame_analysis.pop("is_deepfake")
+               confidence = frame_analysis.pop("confidence")
+           else:
+               frame_analysis = None
+               is_deepfake, confidence = self._mock_deepfake_analysis()
 
-       return {
+       if is_deepfake is None:
+           # The frame pipeline scored no face, so there is no verdict either way.
+           error = frame_analysis.get("error")
+           if error:
+               details = f"Inconclusive: the file could not be analyzed ({error})."
+           else:
+               details = "Inconclusive: no faces were found in the sampled frames."
+       elif is_deepfake:
+           details = "Suspicious artifacts detected in facial regions."
+       else:
+           details = "No major inconsistencies found."
+       result = {
            "is_deepfake": is_deepfake,
-           "confidence": round(confidence, 2),
-           "details": "Suspicious artifacts detected in facial regions." if is_deepfake else "No major inconsistencies found.",
-           "transcribed_text": transcribed_text
+           "confidence": round(confidence, 2) if confidence is not None else None,
+           "details": details
        }
+       if frame_analysis is not None:
+           result["frame_analysis"] = frame_analysis
+
+       # --- 2. Speech-to-Text (STT) ---
+       # The transcribed text can then be sent to the NLP service for content verification.
+       if transcribe:
+           speech_analysis = {}
+           with stage_timer("stt"):
+               segments = list(self.transcribe_segments(file_path, speech_analysis))
+           result["transcribed_text"] = " ".join(segment["text"] for segment in segments)
+           if speech_analysis:
+               result["speech_analysis"] = speech_analysis
+       return result
+
+
+   def transcribe_segments(self, file_path: str, stats: dict = None):
+       """
+       Yields the file's transcript as {"start", "end", "text"} segments, in order, while the
+       speech pipeline works through the audio. Without a model, the mock transcript is the
+       only segment.
+
+
+       Args:
+           stats (dict, optional): Filled in with the pipeline's statistics, and `error` if the
+                                   audio could not be decoded (the transcript then ends early).
+       """
+       model = self.stt_model
+       if model is None:
+           yield {"start": 0.0, "end": 0.0, "text": MOCK_TRANSCRIPT}
+           return
+       stats = stats if stats is not None else {}
+       try:
+           yield from self.speech_pipeline.segments(file_path, model, stats)
+       except Exception as e:
+           # No audio track, or an unreadable file: the rest of the verification goes on without it.
+           logger.warning("Could not transcribe %s: %s", file_path, e)
+           stats["error"] = str(e)
+
+
+   def _mock_deepfake_analysis(self) -> tuple:
+       """
+       Stand-in verdict used when no model is configured. It simulates the model's
+       processing delay and returns a random result.
+       """
+       time.sleep(2)
+       is_deepfake = random.choice([True, False])
+       confidence = random.uniform(0.75, 0.98) if is_deepfake else random.uniform(0.05, 0.20)
+       return is_deepfake, confidence
 
 
 # Create a single instance of the service to be used by the API
@@ -0,0 +1,204 @@
+# --- entity_resolver.py ---
+# This module resolves company mentions extracted from text ("INNOVATE CORP.",
+# "Innovate Corporation", "$INNOV") to canonical company IDs in the official records.
+# The index is built offline by `data_ingestion/build_official_records.py` and loaded
+# lazily the first time a mention needs resolving.
+
+
+import heapq
+import logging
+import pickle
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+from app.core.config import settings
+from app.services.official_records import OfficialRecordsStore, normalize_company_name
+
+
+logger = logging.getLogger(__name__)
+
+
+# Legal-form tokens carry no identity ("Ltd", "Corp"), so they are ignored for fuzzy matching.
+_LEGAL_TOKENS = {"corp", "inc", "ltd", "co", "pvt", "plc", "llc"}
+
+INDEX_FORMAT_VERSION = 1
+
+
+def core_name(normalized_name: str) -> str:
+   """
+   Drops legal-form tokens from an already normalized name ("innovate corp" -> "innovate").
+   """
+   tokens = [token for token in normalized_name.split() if token not in _LEGAL_TOKENS]
+   return " ".join(tokens) or normalized_name
+
+
+def trigrams(text: str) -> set:
+   padded = f"  {text} "
+   return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CompanyNameIndex:
+   """
+   Precomputed name-resolution index over the official company universe.
+
+
+   - `exact`: normalized name / alias / ticker -> company ID, for O(1) hits.
+   - `postings`: trigram -> indices of candidate names, for fuzzy matches. Trigrams shared
+     by too many names (e.g. " in") are skipped at query time; they say little about identity.
+   Fuzzy candidates are ranked by shared trigrams and scored with the Dice coefficient.
+   """
+
+   def __init__(self, entries: list[tuple], source_version: str = ""):
+       """
+       Args:
+           entries (list): (company_id, normalized_key, kind) tuples, where kind is one of
+                           "normalized", "alias" or "ticker".
+           source_version (str): Version of the records store the entries came from.
+       """
+       self.source_version = source_version
+       self.exact = {}
+       self.names = []
+       self.name_companies = []
+       self.postings = {}
+
+       seen_names = set()
+       for company_id, key, kind in entries:
+           self.exact.setdefault(key, company_id)
+           if kind == "ticker":
+               continue
+           name = core_name(key)
+           self.exact.setdefault(name, company_id)
+           if (name, company_id) in seen_names:
+               continue
+           seen_names.add((name, company_id))
+           name_index = len(self.names)
+           self.names.append(name)
+           self.name_companies.append(company_id)
+           for gram in trigrams(name):
+               self.postings.setdefault(gram, []).append(name_index)
+
+
+   @classmethod
+   def from_store(cls, store: OfficialRecordsStore) -> "CompanyNameIndex":
+       return cls(store.lookup_entries(), store.version)
+
+
+   @classmethod
+   def load(cls, path: Path) -> "CompanyNameIndex":
+       with open(path, "rb") as f:
+           payload = pickle.load(f)
+       if payload.get("format") != INDEX_FORMAT_VERSION:
+           raise ValueError(f"Unsupported company index format in {path}")
+       return payload["index"]
+
+
+   def save(self, path: Path):
+       with open(path, "wb") as f:
+           pickle.dump({"format": INDEX_FORMAT_VERSION, "index": self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+   def resolve(self, mention: str, max_posting: int = 500, scan_budget: int = 1000, candidates: int = 8) -> Optional[tuple]:
+       """
+       Resolves a mention to its best matching company.
+
+
+       Candidate generation walks the mention's trigram postings from rarest to most common
+       and stops after `scan_budget` entries, so lookup cost stays bounded as the universe grows.
+
+
+       Returns:
+           tuple: (company_id, score) with score in [0, 1], or None if nothing shares
+                  enough trigrams with the mention.
+       """
+       normalized = normalize_company_name(mention.lstrip("$"))
+       if not normalized:
+           return None
+       for key in (normalized, core_name(normalized)):
+           if key in self.exact:
+               return self.exact[key], 1.0
+
+       query = core_name(normalized)
+       query_grams = trigrams(query)
+       postings = [self.postings.get(gram) for gram in query_grams]
+       postings = sorted((posting for posting in postings if posting and len(posting) <= max_posting), key=len)
+
+       counts = {}
+       for posting in postings:
+           if scan_budget <= 0:
+               break
+           scan_budget -= len(posting)
+           for name_index in posting:
+               counts[name_index] = counts.get(name_index, 0) + 1
+       if not counts:
+           return None
+
+       best = None
+       for name_index in heapq.nlargest(candidates, counts, key=counts.__getitem__):
+           name_grams = trigrams(self.names[name_index])
+           score = 2 * len(query_grams & name_grams) / (len(query_grams) + len(name_grams))
+           if best is None or score > best[1]:
+               best = (self.name_companies[name_index], score)
+       return best
+
+
+class EntityResolver:
+   """
+   Lazily loads the company name index and resolves mentions against it.
+   """
+
+   def __init__(self, index_path: str, threshold: float):
+       self.index_path = Path(index_path)
+       self.threshold = threshold
+       self._index = None
+       self._lock = threading.Lock()
+
+
+   def get_index(self, store: OfficialRecordsStore) -> CompanyNameIndex:
+       """
+       Returns the index for the given store, loading the prebuilt file on first use.
+       The index is rebuilt in memory if no file exists or it was built from other records.
+       """
+       index = self._index
+       if index is not None and index.source_version == store.version:
+           return index
+       with self._lock:
+           if self._index is None or self._index.source_version != store.version:
+               self._index = self._load_or_build(store)
+           return self._index
+
+
+   def resolve_many(self, mentions: list[str], store: OfficialRecordsStore) -> dict:
+       """
+       Resolves each mention whose best match scores at least the configured threshold.
+
+
+       Returns:
+           dict: mention -> (company_id, score).
+       """
+       index = self.get_index(store)
+       resolved = {}
+       for mention in mentions:
+           match = index.resolve(mention)
+           if match and match[1] >= self.threshold:
+               resolved[mention] = match
+       return resolved
+
+
+   def _load_or_build(self, store: OfficialRecordsStore) -> CompanyNameIndex:
+       if self.index_path.is_file():
+           try:
+               index = CompanyNameIndex.load(self.index_path)
+               if index.source_version == store.version:
+                   logger.info("Loaded company name index (%d names) from %s.", len(index.names), self.index_path)
+                   return index
+           except (OSError, ValueError, pickle.UnpicklingError) as e:
+               logger.warning("Error loading company name index from %s: %s", self.index_path, e)
+       index = CompanyNameIndex.from_store(store)
+       logger.info("Built company name index (%d names) from the official records store.", len(index.names))
+       return index
+
+
+# Create a single instance of the resolver
+entity_resolver = EntityResolver(settings.COMPANY_INDEX_PATH, settings.ENTITY_MATCH_THRESHOLD)
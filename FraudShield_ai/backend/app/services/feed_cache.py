@@ -0,0 +1,216 @@
+# --- feed_cache.py ---
+# This service keeps the aggregated dashboard feed in memory.
+# The feed is only re-read when it changes on disk, and the JSON response body and
+# its ETag are computed once per version, so a dashboard poll costs a stat() at most.
+
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.responses import dumps
+from app.services.feed_index import FeedIndex
+from app.services.feed_log import FeedLog, lines_to_json_array
+
+
+logger = logging.getLogger(__name__)
+
+# Reading and indexing the feed, the expensive part of dashboard reads; requests served
+# from the cached snapshot are only timed per route, at the HTTP layer.
+FEED_READ_SECONDS = metrics.histogram(
+   "marketguard_feed_read_duration_seconds",
+   "Time taken to reload, index or tail the dashboard feed.",
+   ("operation",)
+)
+
+
+class FeedLoadError(Exception):
+   """
+   Raised when the feed file exists but cannot be read or parsed.
+   """
+
+
+class FeedSnapshot:
+   """
+   One loaded version of the feed: the parsed items, the serialized response body and its ETag.
+   """
+
+   def __init__(self, data, body: bytes, signature: tuple):
+       self.data = data
+       self.body = body
+       self.signature = signature
+       self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+       self.loaded_at = time.time()
+       self._index = None
+       self._index_lock = threading.Lock()
+
+
+   def index(self) -> FeedIndex:
+       """
+       Returns the query indexes for this version, building them on first use (blocking).
+       """
+       if self._index is None:
+           with self._index_lock:
+               if self._index is None:
+                   items = self.data if isinstance(self.data, list) else []
+                   with FEED_READ_SECONDS.time("index"):
+                       self._index = FeedIndex(items, version=self.etag.strip('"'))
+       return self._index
+
+
+class FeedCache:
+   """
+   In-memory cache of the feed with change detection.
+
+
+   The feed is read from the append-only feed log in `log_dir` (see `FeedLog`) once it has been
+   published there, and from the JSON file at `path` otherwise. The log's manifest, or the file,
+   is stat()ed at most once per `check_interval` seconds and the feed reloaded only if its inode,
+   mtime or size changed. Writers should replace it atomically (write a temp file, then
+   os.replace), which always gives it a new inode. In-process writers can call `notify()`
+   to have the next read check right away.
+   """
+
+   def __init__(self, path: Path, check_interval: float = 1.0, log_dir: Path = None):
+       self.path = Path(path)
+       self.log = FeedLog(log_dir) if log_dir else None
+       self.check_interval = check_interval
+       self._snapshot = None
+       self._checked_at = 0.0
+       self._lock = threading.Lock()
+       self.reloads = 0
+
+
+   async def get(self) -> FeedSnapshot:
+       """
+       Returns the current snapshot. Only a due change check leaves the event loop,
+       since it may have to read and parse the file.
+
+
+       Raises:
+           FileNotFoundError: If the feed file does not exist.
+           FeedLoadError: If it has never been loaded successfully and cannot be parsed now.
+       """
+       if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+           return self._snapshot
+       return await asyncio.to_thread(self.refresh)
+
+
+   async def get_index(self) -> FeedIndex:
+       """
+       Returns the query indexes for the current snapshot. Building them scans every item,
+       so that happens off the event loop, once per feed version.
+       """
+       snapshot = await self.get()
+       if snapshot._index is not None:
+           return snapshot._index
+       return await asyncio.to_thread(snapshot.index)
+
+
+   async def tail(self, count: int) -> list:
+       """
+       Returns the `count` most recently appended items, oldest first. With a feed log
+       only its newest segments are read, whatever the size of the whole feed.
+       """
+       if self.log is not None and self.log.manifest_path.exists():
+           with FEED_READ_SECONDS.time("tail"):
+               return await asyncio.to_thread(self.log.tail, count)
+       snapshot = await self.get()
+       items = snapshot.data if isinstance(snapshot.data, list) else []
+       return items[-count:] if count else []
+
+
+   async def tail_json(self, count: int) -> bytes:
+       """
+       Same as `tail`, serialized as the JSON response body. Items in the feed log are
+       already stored encoded, so they are sent without being decoded.
+       """
+       if self.log is not None and self.log.manifest_path.exists():
+           with FEED_READ_SECONDS.time("tail"):
+               return await asyncio.to_thread(self.log.tail_json, count)
+       return dumps(await self.tail(count))
+
+
+   def refresh(self) -> FeedSnapshot:
+       """
+       Checks the feed for changes and reloads it if needed (blocking).
+       If a changed feed cannot be parsed, the previous snapshot keeps being served.
+       """
+       with self._lock:
+           if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+               return self._snapshot
+           use_log = self.log is not None and self.log.manifest_path.exists()
+           try:
+               stat = os.stat(self.log.manifest_path if use_log else self.path)
+           except FileNotFoundError:
+               self._snapshot = None
+               raise
+           self._checked_at = time.monotonic()
+           signature = (use_log, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+           if self._snapshot is not None and self._snapshot.signature == signature:
+               return self._snapshot
+
+           try:
+               with FEED_READ_SECONDS.time("reload"):
+                   snapshot = self._load_log(signature) if use_log else self._load(signature)
+           except (OSError, ValueError) as e:
+               if self._snapshot is None:
+                   raise FeedLoadError(str(e)) from e
+               logger.warning("Error reloading feed from %s, serving the previous version: %s", self._source(use_log), e)
+               return self._snapshot
+
+           self._snapshot = snapshot
+           self.reloads += 1
+           logger.info("Loaded dashboard feed from %s (%d bytes).", self._source(use_log), len(snapshot.body))
+           return snapshot
+
+
+   def notify(self):
+       """
+       Marks the cached feed as possibly stale so the next read checks the file.
+       """
+       self._checked_at = 0.0
+
+
+   def _load(self, signature: tuple) -> FeedSnapshot:
+       with open(self.path, "rb") as f:
+           data = json.loads(f.read())
+       # Same encoding as FastAPI's default JSONResponse.
+       body = json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+       return FeedSnapshot(data, body, signature)
+
+
+   def _load_log(self, signature: tuple) -> FeedSnapshot:
+       # Segments hold the items in the response encoding already, so the body is built
+       # by joining their lines; it is parsed once for the indexes.
+       body = lines_to_json_array(self.log.read_bytes())
+       return FeedSnapshot(json.loads(body), body, signature)
+
+
+   def _source(self, use_log: bool) -> Path:
+       return self.log.directory if use_log else self.path
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+   """
+   Implements the weak comparison used for If-None-Match: "*" matches any
+   ETag, and W/ prefixes are ignored.
+   """
+   if not if_none_match:
+       return False
+   if if_none_match.strip() == "*":
+       return True
+   candidates = [tag.strip() for tag in if_none_match.split(",")]
+   return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+# Create a single instance of the cache for the dashboard feed
+feed_cache = FeedCache(settings.DASHBOARD_FEED_PATH, settings.FEED_RELOAD_INTERVAL, settings.FEED_LOG_DIR)
@@ -0,0 +1,287 @@
+# --- feed_hub.py ---
+# Live push of new feed items to dashboard clients.
+# A background task watches the feed log written by the aggregation job and reads only the
+# items appended since its last check; the hub fans each one out to the subscribers whose
+# filters it matches. Items are encoded as Server-Sent Events frames once, not per client.
+
+
+import asyncio
+import logging
+import os
+
+
+from app.core.config import settings
+from app.services.feed_log import FeedLog, encode_item
+
+
+logger = logging.getLogger(__name__)
+
+
+class HubFullError(Exception):
+   """
+   Raised when the hub already has its maximum number of subscribers.
+   """
+
+
+def sse_frame(seq: int, item: dict) -> bytes:
+   """
+   Encodes one item as an SSE event. Its ID is the item's sequence number in the feed log,
+   which the browser sends back as Last-Event-ID when it reconnects.
+   """
+   return b"id: %d\nevent: item\ndata: " % seq + encode_item(item) + b"\n\n"
+
+
+def filter_key(risk_levels: list = None, sources: list = None) -> tuple:
+   """
+   Normalized (risk levels, sources) filter; an empty set matches everything.
+   """
+   return (
+       frozenset(value.casefold() for value in risk_levels or []),
+       frozenset(value.casefold() for value in sources or [])
+   )
+
+
+def matches(key: tuple, item: dict) -> bool:
+   risk_levels, sources = key
+   if risk_levels and str(item.get("risk_level", "")).casefold() not in risk_levels:
+       return False
+   if sources and str(item.get("source", "")).casefold() not in sources:
+       return False
+   return True
+
+
+class Subscription:
+   """
+   One connected client: its filter and a bounded queue of pending (seq, frame) entries.
+   """
+
+   def __init__(self, key: tuple, queue_size: int):
+       self.key = key
+       self.queue = asyncio.Queue(maxsize=queue_size)
+       self.last_seq = -1
+       self.dropped = False
+
+
+   async def frames(self, heartbeat: float):
+       """
+       Yields the SSE frames to send, in order, with a comment line every `heartbeat` seconds
+       of silence so proxies keep the connection open. Ends after the client was dropped.
+       """
+       while True:
+           try:
+               # Queued frames are taken without arming a timer; only an idle wait needs one.
+               entry = self.queue.get_nowait()
+           except asyncio.QueueEmpty:
+               try:
+                   entry = await asyncio.wait_for(self.queue.get(), heartbeat)
+               except asyncio.TimeoutError:
+                   yield b": keep-alive\n\n"
+                   continue
+           if entry is None:
+               yield b"event: dropped\ndata: {\"reason\": \"slow consumer\"}\n\n"
+               return
+           seq, frame = entry
+           # Items replayed on reconnect may also arrive live; send each one once.
+           if seq > self.last_seq:
+               self.last_seq = seq
+               yield frame
+
+
+class FeedHub:
+   """
+   Fan-out of newly ingested feed items to live subscribers.
+
+
+   Subscribers are grouped by filter, so each new item is matched once per distinct filter
+   rather than once per client. Every subscriber has a bounded queue; one that falls more than
+   `queue_size` items behind is dropped (its stream ends with a "dropped" event) instead of
+   making the hub buffer without limit. Clients reconnect with Last-Event-ID and the missed
+   items, up to `replay_max`, are replayed from the log.
+
+
+   Args:
+       log (FeedLog): The feed log the aggregation job appends to.
+       queue_size (int): Items a subscriber may have pending before it is dropped.
+       poll_interval (float): Seconds between checks of the log for new items.
+       max_subscribers (int): Subscriptions beyond this are refused.
+       replay_max (int): Most items replayed to a reconnecting client.
+   """
+
+   def __init__(self, log: FeedLog, queue_size: int = 256, poll_interval: float = 1.0,
+                max_subscribers: int = 10000, replay_max: int = 1000):
+       self.log = log
+       self.queue_size = queue_size
+       self.poll_interval = poll_interval
+       self.max_subscribers = max_subscribers
+       self.replay_max = replay_max
+       self._groups = {}  # filter key -> set of Subscription
+       self._seq = None
+       self._position = None
+       self._signature = None
+       self._task = None
+       self.subscribers = 0
+       self.published = 0
+       self.dropped = 0
+
+
+   @property
+   def full(self) -> bool:
+       return self.subscribers >= self.max_subscribers
+
+
+   def subscribe(self, risk_levels: list = None, sources: list = None) -> Subscription:
+       """
+       Registers a client for new items matching the filters.
+
+
+       Raises:
+           HubFullError: If `max_subscribers` clients are already connected.
+       """
+       if self.full:
+           raise HubFullError(f"The live feed is serving its maximum of {self.max_subscribers} clients.")
+       key = filter_key(risk_levels, sources)
+       subscription = Subscription(key, self.queue_size)
+       self._groups.setdefault(key, set()).add(subscription)
+       self.subscribers += 1
+       return subscription
+
+
+   def unsubscribe(self, subscription: Subscription):
+       group = self._groups.get(subscription.key)
+       if group and subscription in group:
+           group.discard(subscription)
+           self.subscribers -= 1
+           if not group:
+               del self._groups[subscription.key]
+
+
+   async def replay(self, subscription: Subscription, from_seq: int) -> list:
+       """
+       Returns the frames of the logged items from `from_seq` on that match the subscription,
+       at most the newest `replay_max` of them, and marks them as sent.
+
+
+       A `from_seq` past the end of the log (a Last-Event-ID from before the log was rebuilt,
+       or a made-up one) is treated as a full resync: the newest `replay_max` items are sent.
+       """
+       if not self.log.manifest_path.exists():
+           return []
+       manifest = await asyncio.to_thread(self.log.manifest)
+       end = self.log.next_seq(manifest)
+       if from_seq > end:
+           from_seq = 0
+       start = max(from_seq, end - self.replay_max)
+       items, next_seq, _ = await asyncio.to_thread(self.log.read_from, start, None, manifest)
+       frames = [
+           sse_frame(seq, item)
+           for seq, item in zip(range(next_seq - len(items), next_seq), items)
+           if matches(subscription.key, item)
+       ]
+       # Never past the end of the log, or items appended later would be taken as already sent.
+       subscription.last_seq = max(subscription.last_seq, min(next_seq, end) - 1)
+       return frames
+
+
+   def publish(self, entries: list):
+       """
+       Queues (seq, item) entries to every subscriber whose filter they match.
+       """
+       encoded = [(seq, item, sse_frame(seq, item)) for seq, item in entries]
+       for key, group in list(self._groups.items()):
+           frames = [(seq, frame) for seq, item, frame in encoded if matches(key, item)]
+           if not frames:
+               continue
+           for subscription in list(group):
+               for entry in frames:
+                   try:
+                       subscription.queue.put_nowait(entry)
+                   except asyncio.QueueFull:
+                       self._drop(subscription)
+                       break
+       self.published += len(entries)
+
+
+   async def poll(self) -> int:
+       """
+       Publishes the items appended to the log since the last poll.
+
+
+       Returns:
+           int: The number of new items.
+       """
+       try:
+           stat = os.stat(self.log.manifest_path)
+       except FileNotFoundError:
+           return 0
+       signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+       if signature == self._signature:
+           return 0
+       self._signature = signature
+       if self._seq is None:
+           # The first time the hub sees the log, it starts from the log's end: only items
+           # appended from then on are pushed. This also covers a log created while the hub
+           # was running, whose first append may be the whole legacy feed being imported
+           # (see migrate_legacy_feed); clients load existing items from /feed instead.
+           self._seq = await asyncio.to_thread(self.log.next_seq)
+           return 0
+
+       items, next_seq, self._position = await asyncio.to_thread(self.log.read_from, self._seq, self._position)
+       self._seq = next_seq
+       if items:
+           self.publish(list(zip(range(next_seq - len(items), next_seq), items)))
+       return len(items)
+
+
+   def start(self):
+       if self._task is None:
+           self._task = asyncio.create_task(self._run())
+
+
+   async def stop(self):
+       if self._task is not None:
+           self._task.cancel()
+           try:
+               await self._task
+           except asyncio.CancelledError:
+               pass
+           self._task = None
+
+
+   def stats(self) -> dict:
+       return {
+           "subscribers": self.subscribers,
+           "filters": len(self._groups),
+           "published": self.published,
+           "dropped": self.dropped,
+           "next_seq": self._seq
+       }
+
+
+   async def _run(self):
+       while True:
+           try:
+               await self.poll()
+           except Exception as e:
+               # A log being compacted or rewritten is picked up again on the next poll.
+               logger.warning("Error reading new feed items for the live stream: %s", e)
+           await asyncio.sleep(self.poll_interval)
+
+
+   def _drop(self, subscription: Subscription):
+       self.unsubscribe(subscription)
+       subscription.dropped = True
+       self.dropped += 1
+       # Make room for the end-of-stream marker; the client catches up by reconnecting.
+       while not subscription.queue.empty():
+           subscription.queue.get_nowait()
+       subscription.queue.put_nowait(None)
+
+
+# Create a single instance of the hub for the dashboard
+feed_hub = FeedHub(
+   FeedLog(settings.FEED_LOG_DIR),
+   queue_size=settings.FEED_STREAM_QUEUE_SIZE,
+   poll_interval=settings.FEED_STREAM_POLL_INTERVAL,
+   max_subscribers=settings.FEED_STREAM_MAX_SUBSCRIBERS,
+   replay_max=settings.FEED_STREAM_REPLAY_MAX
+)
@@ -0,0 +1,239 @@
+# --- feed_index.py ---
+# This module builds query indexes over the aggregated dashboard feed, so a filtered,
+# paginated request touches only the matching items instead of scanning the whole feed.
+
+
+import base64
+import binascii
+import json
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+from app.core.responses import dumps
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class InvalidCursorError(ValueError):
+   """
+   Raised when a pagination cursor cannot be decoded.
+   """
+
+
+def parse_timestamp(value) -> float:
+   """
+   Converts a feed timestamp to epoch seconds. Sources use ISO 8601 (NewsAPI, our own jobs)
+   or RFC 2822 (RSS). Missing or unparseable timestamps sort as the oldest items.
+   """
+   if not isinstance(value, str) or not value:
+       return 0.0
+   try:
+       parsed = datetime.fromisoformat(value)
+   except ValueError:
+       try:
+           parsed = parsedate_to_datetime(value)
+       except (TypeError, ValueError):
+           return 0.0
+   if parsed.tzinfo is None:
+       parsed = parsed.replace(tzinfo=timezone.utc)
+   return parsed.timestamp()
+
+
+def tokenize(text: str) -> set:
+   return set(TOKEN_PATTERN.findall(text.casefold())) if text else set()
+
+
+class FeedIndex:
+   """
+   Read-only indexes over one version of the feed.
+
+
+   Items are ranked newest first; every index stores ranks, in ascending order, in compact
+   integer arrays:
+   - `by_source` and `by_risk`: exact (case-insensitive) value -> ranks.
+   - `by_token`: word from the title or content -> ranks (an inverted index).
+   - `by_campaign`: campaign ID assigned by the ingestion job (see campaign_index.py) -> ranks.
+   - `neg_timestamps`: negated timestamp per rank, so a time range maps to a rank range by bisection.
+
+
+   A query picks the shortest posting list among its filters, walks it from the page start
+   and checks the other filters by bisection, stopping once the page is full.
+
+
+   `query_json` serves pages as response bytes: each item is encoded the first time a page
+   includes it and kept, so popular pages (the newest items) are assembled from bytes.
+   """
+
+   def __init__(self, items: list, version: str = ""):
+       self.items = items
+       self.version = version
+       timestamps = [parse_timestamp(item.get("timestamp")) if isinstance(item, dict) else 0.0 for item in items]
+       # Newest first; ties keep their order in the file.
+       self.order = array("I", sorted(range(len(items)), key=lambda i: -timestamps[i]))
+       self.neg_timestamps = array("d", (-timestamps[i] for i in self.order))
+
+       by_source, by_risk, by_token, by_campaign = {}, {}, {}, {}
+       for rank, i in enumerate(self.order):
+           item = items[i]
+           if not isinstance(item, dict):
+               continue
+           by_source.setdefault(str(item.get("source", "")).casefold(), []).append(rank)
+           by_risk.setdefault(str(item.get("risk_level", "")).casefold(), []).append(rank)
+           for token in tokenize(f"{item.get('title') or ''} {item.get('content') or ''}"):
+               by_token.setdefault(token, []).append(rank)
+           if item.get("campaign_id") is not None:
+               by_campaign.setdefault(item["campaign_id"], []).append(rank)
+       self.by_source = {key: array("I", ranks) for key, ranks in by_source.items()}
+       self.by_risk = {key: array("I", ranks) for key, ranks in by_risk.items()}
+       self.by_token = {key: array("I", ranks) for key, ranks in by_token.items()}
+       self.by_campaign = {key: array("I", ranks) for key, ranks in by_campaign.items()}
+       # Encoded items, by position in `items`; filled in by `query_json`.
+       self._encoded = [None] * len(items)
+
+
+   def query(self, source: str = None, risk_level: str = None, since: float = None, until: float = None,
+             search: str = None, campaign_id: int = None, cursor: str = None, limit: int = 50) -> dict:
+       """
+       Returns one page of items matching every given filter, newest first.
+
+
+       Args:
+           source (str, optional): Exact source name, case-insensitive.
+           risk_level (str, optional): Exact risk level, case-insensitive.
+           since (float, optional): Only items at or after this epoch time.
+           until (float, optional): Only items at or before this epoch time.
+           search (str, optional): Words that must all appear in the title or content.
+           campaign_id (int, optional): Only items of this campaign.
+           cursor (str, optional): `next_cursor` from the previous page.
+           limit (int): Page size.
+
+
+       Returns:
+           dict: {"items": [...], "next_cursor": str or None}
+       """
+       page, next_cursor = self._page(source, risk_level, since, until, search, campaign_id, cursor, limit)
+       return {"items": [self.items[i] for i in page], "next_cursor": next_cursor}
+
+
+   def query_json(self, **filters) -> bytes:
+       """
+       Same as `query`, serialized as the JSON response body.
+       """
+       page, next_cursor = self._page(**filters)
+       items = b",".join(self._encoded[i] or self._encode(i) for i in page)
+       return b'{"items":[' + items + b'],"next_cursor":' + dumps(next_cursor) + b"}"
+
+
+   def _encode(self, i: int) -> bytes:
+       # Racing threads may both encode an item; they store the same bytes.
+       self._encoded[i] = dumps(self.items[i])
+       return self._encoded[i]
+
+
+   def _page(self, source: str = None, risk_level: str = None, since: float = None, until: float = None,
+             search: str = None, campaign_id: int = None, cursor: str = None, limit: int = 50) -> tuple:
+       """
+       Returns the positions in `items` of one page of matches, and the cursor of the next page.
+       """
+       # Time range -> rank range [low, high).
+       low = bisect_left(self.neg_timestamps, -until) if until is not None else 0
+       high = bisect_right(self.neg_timestamps, -since) if since is not None else len(self.order)
+       low = max(low, self._resume_rank(cursor))
+
+       postings = []
+       if source is not None:
+           postings.append(self.by_source.get(source.casefold()))
+       if risk_level is not None:
+           postings.append(self.by_risk.get(risk_level.casefold()))
+       if campaign_id is not None:
+           postings.append(self.by_campaign.get(campaign_id))
+       if search:
+           words = tokenize(search)
+           if not words:
+               # A search with no word tokens (e.g. "!!!") matches nothing, not everything.
+               return [], None
+           postings.extend(self.by_token.get(word) for word in words)
+       if any(posting is None for posting in postings):
+           return [], None
+
+       ranks = self._matching_ranks(postings, low, high, limit + 1)
+       next_cursor = self._encode_cursor(ranks[limit]) if len(ranks) > limit else None
+       return [self.order[rank] for rank in ranks[:limit]], next_cursor
+
+
+   def campaigns(self, min_items: int = 2, limit: int = 50) -> list:
+       """
+       The campaigns with the most items in this version of the feed, largest first.
+
+
+       Returns:
+           list: [{"campaign_id", "items", "campaign_size", "latest"}], where `items` counts the
+                 campaign's items in the feed, `campaign_size` is the largest size the ingestion
+                 job recorded (it includes items since dropped from the feed) and `latest` is
+                 the newest item.
+       """
+       largest = sorted(
+           ((campaign_id, ranks) for campaign_id, ranks in self.by_campaign.items() if len(ranks) >= min_items),
+           key=lambda entry: (-len(entry[1]), entry[1][0])
+       )[:limit]
+       campaigns = []
+       for campaign_id, ranks in largest:
+           members = [self.items[self.order[rank]] for rank in ranks]
+           campaigns.append({
+               "campaign_id": campaign_id,
+               "items": len(ranks),
+               "campaign_size": max(member.get("campaign_size") or 0 for member in members),
+               "latest": members[0]
+           })
+       return campaigns
+
+
+   def _matching_ranks(self, postings: list, low: int, high: int, count: int) -> list:
+       if not postings:
+           return list(range(low, min(high, low + count)))
+
+       postings = sorted(postings, key=len)
+       driver, others = postings[0], postings[1:]
+       matches = []
+       for position in range(bisect_left(driver, low), len(driver)):
+           rank = driver[position]
+           if rank >= high:
+               break
+           if all(self._contains(posting, rank) for posting in others):
+               matches.append(rank)
+               if len(matches) == count:
+                   break
+       return matches
+
+
+   @staticmethod
+   def _contains(posting: array, rank: int) -> bool:
+       position = bisect_left(posting, rank)
+       return position < len(posting) and posting[position] == rank
+
+
+   def _encode_cursor(self, rank: int) -> str:
+       state = {"v": self.version, "r": rank, "t": -self.neg_timestamps[rank]}
+       return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+   def _resume_rank(self, cursor: str) -> int:
+       """
+       Maps a cursor to the rank where the next page starts. A cursor from an older version
+       of the feed resumes at the first item no newer than the one it pointed to.
+       """
+       if not cursor:
+           return 0
+       try:
+           state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+           rank, timestamp = int(state["r"]), float(state["t"])
+       except (binascii.Error, ValueError, TypeError, KeyError) as e:
+           raise InvalidCursorError("Invalid pagination cursor.") from e
+       if state.get("v") == self.version:
+           return rank
+       return bisect_left(self.neg_timestamps, -timestamp)
@@ -0,0 +1,332 @@
+# --- feed_log.py ---
+# Storage for the aggregated feed: an append-only log of JSON Lines segments plus a small
+# manifest that indexes them. The ingestion job appends new items; the API reads them.
+#
+#   feed_log/
+#       manifest.json           <- segments, their committed sizes, sequence numbers and time ranges
+#       segment-000001.jsonl    <- one compact JSON object per line, oldest first
+#       segment-000002.jsonl
+#
+# Only bytes listed in the manifest are visible to readers. The writer appends to the newest
+# segment, flushes it to disk, then publishes a new manifest by writing a temp file and
+# renaming it over the old one, so readers always see a complete, consistent feed.
+# Every item has a sequence number (its position in the log since it was created), which
+# retention does not change, so a reader can resume exactly where it stopped.
+
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+from app.services.feed_index import parse_timestamp
+
+
+# Advisory locking of the single writer; not available on Windows, where it is skipped.
+try:
+   import fcntl
+except ImportError:
+   fcntl = None
+
+
+MANIFEST_NAME = "manifest.json"
+
+
+def encode_item(item: dict) -> bytes:
+   # Same compact encoding as FastAPI's JSONResponse, so segments can be served as-is.
+   return json.dumps(item, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def lines_to_json_array(data: bytes) -> bytes:
+   """
+   Turns JSON Lines into one JSON array. Encoded items never contain a raw newline,
+   so joining the lines with commas is enough.
+   """
+   data = data.rstrip(b"\n")
+   return b"[" + data.replace(b"\n", b",") + b"]" if data else b"[]"
+
+
+class FeedLog:
+   """
+   Append-only, segmented feed storage.
+
+
+   Args:
+       directory (Path): Where the manifest and segments live.
+       segment_max_items (int): A new segment is started once the newest one holds this many items.
+   """
+
+   def __init__(self, directory: Path, segment_max_items: int = 50_000):
+       self.directory = Path(directory)
+       self.segment_max_items = segment_max_items
+       self.manifest_path = self.directory / MANIFEST_NAME
+       self._lock = threading.Lock()
+
+
+   # --- Reading ---
+
+   def manifest(self) -> dict:
+       """
+       Returns the published manifest.
+
+
+       Raises:
+           FileNotFoundError: If nothing has been published yet.
+       """
+       with open(self.manifest_path, "r", encoding="utf-8") as f:
+           manifest = json.load(f)
+       # Logs written before sequence numbers were recorded start at 0.
+       first = 0
+       for segment in manifest["segments"]:
+           segment.setdefault("first", first)
+           first = segment["first"] + segment["items"]
+       return manifest
+
+
+   def read_bytes(self, manifest: dict = None, segments: list = None) -> bytes:
+       """
+       Returns the committed JSON Lines of the given segments (all of them by default).
+       """
+       manifest = manifest or self.manifest()
+       chunks = []
+       for segment in segments if segments is not None else manifest["segments"]:
+           with open(self.directory / segment["name"], "rb") as f:
+               chunks.append(f.read(segment["bytes"]))
+       return b"".join(chunks)
+
+
+   def read_all(self, manifest: dict = None) -> list:
+       """
+       Returns every item, oldest first.
+       """
+       return json.loads(lines_to_json_array(self.read_bytes(manifest)))
+
+
+   def tail(self, count: int, manifest: dict = None) -> list:
+       """
+       Returns the `count` most recently appended items, oldest first, reading only
+       as many of the newest segments as needed.
+       """
+       return json.loads(self.tail_json(count, manifest))
+
+
+   def tail_json(self, count: int, manifest: dict = None) -> bytes:
+       """
+       Same as `tail`, as a JSON array built from the stored lines without decoding them.
+       """
+       manifest = manifest or self.manifest()
+       segments = []
+       total = 0
+       for segment in reversed(manifest["segments"]):
+           if total >= count:
+               break
+           segments.insert(0, segment)
+           total += segment["items"]
+       data = self.read_bytes(manifest, segments).rstrip(b"\n")
+       if not count or not data:
+           return b"[]"
+       return b"[" + b",".join(data.split(b"\n")[-count:]) + b"]"
+
+
+   def read_from(self, seq: int, position: tuple = None, manifest: dict = None) -> tuple:
+       """
+       Returns the items with sequence numbers from `seq` on. Items already dropped by
+       retention are skipped.
+
+
+       Args:
+           seq (int): Sequence number of the first item wanted.
+           position (tuple, optional): The position returned by the previous call. If it still
+                                       points at `seq`, reading starts at that byte offset
+                                       instead of skipping lines of the segment.
+
+
+       Returns:
+           tuple: (items, next_seq, position)
+       """
+       manifest = manifest or self.manifest()
+       items = []
+       for segment in manifest["segments"]:
+           end = segment["first"] + segment["items"]
+           if end <= seq:
+               continue
+           offset, skip = 0, max(0, seq - segment["first"])
+           if position and position[0] == segment["name"] and position[2] == seq and position[1] <= segment["bytes"]:
+               offset, skip = position[1], 0
+           with open(self.directory / segment["name"], "rb") as f:
+               f.seek(offset)
+               data = f.read(segment["bytes"] - offset)
+           if skip:
+               data = data.split(b"\n", skip)[-1]
+           items.extend(json.loads(lines_to_json_array(data)))
+           seq = end
+           position = (segment["name"], segment["bytes"], end)
+       return items, seq, position
+
+
+   def next_seq(self, manifest: dict = None) -> int:
+       """
+       The sequence number the next appended item will get.
+       """
+       manifest = manifest or self.manifest()
+       segments = manifest["segments"]
+       return segments[-1]["first"] + segments[-1]["items"] if segments else 0
+
+
+   def count(self) -> int:
+       try:
+           return sum(segment["items"] for segment in self.manifest()["segments"])
+       except FileNotFoundError:
+           return 0
+
+
+   # --- Writing (single writer, e.g. the aggregation job) ---
+
+   def append(self, items: list) -> int:
+       """
+       Appends items and publishes them atomically.
+
+
+       Returns:
+           int: The number of items appended.
+       """
+       if not items:
+           return 0
+       with self._writer() as manifest:
+           segments = manifest["segments"]
+           pending = list(items)
+           while pending:
+               if not segments or segments[-1]["items"] >= self.segment_max_items:
+                   segments.append(self._new_segment_entry(manifest, self.next_seq(manifest)))
+               segment = segments[-1]
+               batch, pending = pending[:self.segment_max_items - segment["items"]], pending[self.segment_max_items - segment["items"]:]
+               data = b"".join(encode_item(item) + b"\n" for item in batch)
+               path = self.directory / segment["name"]
+               with open(path, "ab") as f:
+                   # Drop bytes a crashed writer appended but never published.
+                   f.truncate(segment["bytes"])
+                   f.write(data)
+                   f.flush()
+                   os.fsync(f.fileno())
+               segment["items"] += len(batch)
+               segment["bytes"] += len(data)
+               self._update_time_range(segment, batch)
+           self._publish(manifest)
+       return len(items)
+
+
+   def compact(self, max_items: int = None) -> dict:
+       """
+       Applies retention and tidies old segments, rewriting only what changes:
+       - whole segments are dropped from the old end while at least `max_items` items remain,
+         so retention never rewrites a segment;
+       - runs of undersized segments (e.g. left over from a smaller segment size) are merged.
+       The newest segment, which is still being appended to, is left alone. Files that are no
+       longer referenced are deleted after the new manifest is published.
+
+
+       Returns:
+           dict: {"segments_before", "segments_after", "segments_rewritten", "items_dropped"}
+       """
+       with self._writer() as manifest:
+           old_segments = manifest["segments"]
+           kept, active = old_segments[:-1], old_segments[-1:]
+           remaining = sum(segment["items"] for segment in old_segments)
+           dropped = 0
+           while kept and max_items is not None and remaining - kept[0]["items"] >= max_items:
+               remaining -= kept[0]["items"]
+               dropped += kept.pop(0)["items"]
+
+           compacted = []
+           rewritten = 0
+           i = 0
+           while i < len(kept):
+               group = [kept[i]]
+               size = kept[i]["items"]
+               i += 1
+               while i < len(kept) and size + kept[i]["items"] <= self.segment_max_items:
+                   group.append(kept[i])
+                   size += kept[i]["items"]
+                   i += 1
+               if len(group) == 1:
+                   compacted.append(group[0])
+                   continue
+               items = json.loads(lines_to_json_array(self.read_bytes(manifest, group)))
+               compacted.append(self._write_sealed_segment(manifest, items, group[0]["first"]))
+               rewritten += len(group)
+
+           if dropped or rewritten:
+               manifest["segments"] = compacted + active
+               self._publish(manifest)
+               live = {segment["name"] for segment in manifest["segments"]}
+               for segment in old_segments:
+                   if segment["name"] not in live:
+                       try:
+                           (self.directory / segment["name"]).unlink()
+                       except FileNotFoundError:
+                           pass
+           return {
+               "segments_before": len(old_segments),
+               "segments_after": len(compacted + active),
+               "segments_rewritten": rewritten,
+               "items_dropped": dropped
+           }
+
+
+   @contextmanager
+   def _writer(self):
+       self.directory.mkdir(parents=True, exist_ok=True)
+       with self._lock, open(self.directory / ".lock", "a") as lock_file:
+           if fcntl is not None:
+               fcntl.flock(lock_file, fcntl.LOCK_EX)
+           try:
+               try:
+                   manifest = self.manifest()
+               except FileNotFoundError:
+                   manifest = {"version": 0, "next_segment": 1, "segments": []}
+               yield manifest
+           finally:
+               if fcntl is not None:
+                   fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+   def _new_segment_entry(self, manifest: dict, first: int) -> dict:
+       name = f"segment-{manifest['next_segment']:06d}.jsonl"
+       manifest["next_segment"] += 1
+       return {"name": name, "first": first, "items": 0, "bytes": 0, "min_ts": None, "max_ts": None}
+
+
+   def _write_sealed_segment(self, manifest: dict, items: list, first: int) -> dict:
+       segment = self._new_segment_entry(manifest, first)
+       data = b"".join(encode_item(item) + b"\n" for item in items)
+       self._write_atomically(self.directory / segment["name"], data)
+       segment["items"] = len(items)
+       segment["bytes"] = len(data)
+       self._update_time_range(segment, items)
+       return segment
+
+
+   def _update_time_range(self, segment: dict, items: list):
+       timestamps = [parse_timestamp(item.get("timestamp")) for item in items if isinstance(item, dict)]
+       timestamps = [timestamp for timestamp in timestamps if timestamp]
+       if segment["min_ts"] is not None:
+           timestamps += [segment["min_ts"], segment["max_ts"]]
+       if timestamps:
+           segment["min_ts"] = min(timestamps)
+           segment["max_ts"] = max(timestamps)
+
+
+   def _publish(self, manifest: dict):
+       manifest["version"] += 1
+       self._write_atomically(self.manifest_path, json.dumps(manifest, indent=1).encode("utf-8"))
+
+
+   def _write_atomically(self, path: Path, data: bytes):
+       tmp_path = path.with_name(path.name + ".tmp")
+       with open(tmp_path, "wb") as f:
+           f.write(data)
+           f.flush()
+           os.fsync(f.fileno())
+       os.replace(tmp_path, path)
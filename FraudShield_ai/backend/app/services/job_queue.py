@@ -0,0 +1,515 @@
+# --- job_queue.py ---
+# Asynchronous verification jobs for media uploads.
+# Media inference takes seconds (minutes for real videos), too long to hold a /verify
+# connection open. A job is recorded in a local SQLite queue and answered right away with
+# its ID; background workers run the pipeline, and clients poll the job or get a callback.
+# Jobs and their uploaded files are kept on disk, so they survive a server restart.
+
+
+import asyncio
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+
+import httpx
+
+
+from app.core.config import settings
+from app.services.upload_spooler import SpooledUpload
+from app.services.verification_orchestrator import verification_orchestrator
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+   id TEXT PRIMARY KEY,
+   status TEXT NOT NULL,
+   priority INTEGER NOT NULL,
+   text TEXT,
+   file_path TEXT,
+   file_hash TEXT,
+   filename TEXT,
+   callback_url TEXT,
+   attempts INTEGER NOT NULL DEFAULT 0,
+   lease_until REAL,
+   created_at REAL NOT NULL,
+   started_at REAL,
+   finished_at REAL,
+   result TEXT,
+   error TEXT,
+   owner TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_priority ON jobs (status, priority DESC, created_at);
+"""
+
+# Failures worth running a job again for: timeouts, lost connections, a busy database,
+# memory pressure. Anything else (e.g. an unreadable file) would fail the same way again.
+TRANSIENT_ERRORS = (TimeoutError, asyncio.TimeoutError, ConnectionError, sqlite3.OperationalError, MemoryError)
+
+
+def _owner(client: Optional[str]) -> Optional[str]:
+   # Jobs record a digest of their client, which may be an API key, never the key itself.
+   return hashlib.sha256(client.encode()).hexdigest() if client is not None else None
+
+
+# Columns returned to clients.
+JOB_COLUMNS = "id, status, priority, filename, attempts, created_at, started_at, finished_at, result, error"
+
+
+class JobQueueFullError(Exception):
+   """
+   Raised when the queue already holds its maximum number of unfinished jobs.
+   """
+
+
+class InvalidCallbackError(ValueError):
+   """
+   Raised for a callback URL the server must not send requests to.
+   """
+
+
+def check_callback_url(url: str, allowed_hosts: list = None):
+   """
+   Checks that a job callback URL is an http(s) URL whose host is in `allowed_hosts`, or,
+   without an allow-list, resolves only to public addresses, so clients cannot make the
+   server send requests into its own network. Blocking: the host name is resolved.
+
+
+   Raises:
+       InvalidCallbackError: If the URL is not acceptable.
+   """
+   parsed = urlparse(url)
+   if parsed.scheme not in ("http", "https") or not parsed.hostname:
+       raise InvalidCallbackError("'callback_url' must be an http(s) URL.")
+   host = parsed.hostname.lower()
+   if allowed_hosts:
+       if host not in allowed_hosts:
+           raise InvalidCallbackError(f"Callbacks to '{host}' are not allowed.")
+       return
+
+   try:
+       port = parsed.port or (443 if parsed.scheme == "https" else 80)
+       addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+   except (socket.gaierror, ValueError) as e:
+       raise InvalidCallbackError(f"Cannot resolve the callback host '{host}': {e}")
+   for address in addresses:
+       # Drops an IPv6 zone ("fe80::1%eth0") before parsing.
+       ip = ipaddress.ip_address(address.split("%")[0])
+       if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+           ip = ip.ipv4_mapped
+       if not ip.is_global or ip.is_multicast:
+           raise InvalidCallbackError(f"Callbacks to non-public addresses ({host} -> {ip}) are not allowed.")
+
+
+class MediaJobQueue:
+   """
+   Persistent priority queue of verification jobs, with a pool of async workers.
+
+
+   Higher `priority` runs first, then oldest first. At most `concurrency` jobs run at a time
+   in this process; the inference itself still runs in the orchestrator's media thread pool.
+
+
+   A claimed job holds a lease that its worker renews while it runs. If the server stops or
+   crashes mid-job, the lease runs out and the job is picked up again, up to `max_attempts`
+   times; so is a job that raised one of `retry_on`. Any other error fails the job at once.
+   Several server processes can share one queue file; a job is only claimed once.
+
+
+   Args:
+       db_path (str): SQLite file of the queue.
+       storage_dir (str): Where uploaded files are kept until their job has run.
+       run_job (callable): Async function (text, file_path, file_hash) -> result dict.
+       callback_hosts (list): Hosts callbacks may go to; any public host if empty (see `check_callback_url`).
+       max_priority (int): Highest priority a job may have; priorities range from 0 to it.
+       concurrency (int): Jobs run at once by this process.
+       max_pending (int): Unfinished jobs accepted before submissions are refused.
+       max_attempts (int): Runs of a job before it is marked failed.
+       lease_seconds (float): How long a claim lasts without renewal.
+       poll_interval (float): Seconds between checks for jobs submitted by other processes.
+       result_ttl (float): Seconds finished jobs are kept.
+       retry_on (tuple): Exception types after which a job is run again (TRANSIENT_ERRORS by default).
+   """
+
+   def __init__(self, db_path: str, storage_dir: str, run_job, concurrency: int = 2, max_pending: int = 1000,
+                max_attempts: int = 3, lease_seconds: float = 60, poll_interval: float = 1.0,
+                result_ttl: float = 7 * 86400, callback_hosts: list = None,
+                retry_on: tuple = TRANSIENT_ERRORS, max_priority: int = 9):
+       self.db_path = str(db_path)
+       self.storage_dir = Path(storage_dir)
+       self.run_job = run_job
+       self.concurrency = concurrency
+       self.max_pending = max_pending
+       self.max_attempts = max_attempts
+       self.lease_seconds = lease_seconds
+       self.poll_interval = poll_interval
+       self.result_ttl = result_ttl
+       self.callback_hosts = callback_hosts or []
+       self.retry_on = retry_on
+       self.max_priority = max_priority
+       self._conn = None
+       self._lock = threading.Lock()
+       self._wakeup = None
+       self._workers = []
+       self._running = set()
+       self.completed = 0
+       self.failed = 0
+
+
+   # --- Submitting and reading jobs (API side) ---
+
+   def submit(self, text: Optional[str] = None, upload: Optional[SpooledUpload] = None, priority: int = 0,
+              callback_url: Optional[str] = None, client: Optional[str] = None) -> dict:
+       """
+       Records a job (blocking). The spooled upload is moved into the queue's storage,
+       so the request handler must not clean it up afterwards. `client` owns the job:
+       only it can read or cancel it (see `get` and `cancel`).
+
+
+       Raises:
+           ValueError: If `priority` is outside 0..`max_priority`.
+           JobQueueFullError: If `max_pending` jobs are still queued or running.
+       """
+       if not 0 <= priority <= self.max_priority:
+           raise ValueError(f"'priority' must be between 0 and {self.max_priority}.")
+       with self._lock:
+           pending = self._connection().execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+       if pending >= self.max_pending:
+           raise JobQueueFullError(f"The job queue is full ({self.max_pending} unfinished jobs).")
+
+       job_id = uuid.uuid4().hex
+       file_path = None
+       if upload:
+           # A rename when the spool directory is on the same file system, a copy otherwise.
+           self.storage_dir.mkdir(parents=True, exist_ok=True)
+           file_path = str(self.storage_dir / (job_id + os.path.splitext(upload.filename or "")[1]))
+           shutil.move(upload.path, file_path)
+       try:
+           with self._lock:
+               conn = self._connection()
+               with conn:
+                   conn.execute(
+                       "INSERT INTO jobs (id, status, priority, text, file_path, file_hash, filename, callback_url, created_at, owner) "
+                       "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?)",
+                       (job_id, priority, text, file_path, upload.sha256 if upload else None,
+                        upload.filename if upload else None, callback_url, time.time(), _owner(client))
+                   )
+       except BaseException:
+           # No job refers to the file, so nothing else would ever delete it.
+           if file_path:
+               self._remove_file(file_path)
+           raise
+       if self._wakeup is not None:
+           self._wakeup.set()
+       return self.get(job_id, client)
+
+
+   def get(self, job_id: str, client: Optional[str] = None) -> Optional[dict]:
+       """
+       Returns the job's status (and result or error once finished), or None if unknown.
+       With `client`, jobs submitted by other clients are unknown too.
+       """
+       with self._lock:
+           row = self._connection().execute(
+               f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ? AND (? IS NULL OR owner = ?)", (job_id, client, _owner(client))
+           ).fetchone()
+       return self._job_from_row(row) if row else None
+
+
+   def cancel(self, job_id: str, client: Optional[str] = None) -> bool:
+       """
+       Cancels a job that has not started yet. With `client`, only a job it submitted.
+
+
+       Returns:
+           bool: False if the job is unknown or already running or finished.
+       """
+       with self._lock:
+           conn = self._connection()
+           row = conn.execute(
+               "SELECT file_path FROM jobs WHERE id = ? AND status = 'queued' AND (? IS NULL OR owner = ?)",
+               (job_id, client, _owner(client))
+           ).fetchone()
+           if row is None:
+               return False
+           with conn:
+               cancelled = conn.execute(
+                   "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                   (time.time(), job_id)
+               ).rowcount
+       if cancelled and row[0]:
+           self._remove_file(row[0])
+       return bool(cancelled)
+
+
+   def stats(self) -> dict:
+       with self._lock:
+           counts = dict(self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+       return {
+           "counts": counts,
+           "running_here": len(self._running),
+           "concurrency": self.concurrency,
+           "completed": self.completed,
+           "failed": self.failed
+       }
+
+
+   # --- Workers ---
+
+   def start(self):
+       """
+       Starts the worker tasks on the running event loop.
+       """
+       if self._workers:
+           return
+       self._wakeup = asyncio.Event()
+       self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+
+   async def stop(self):
+       """
+       Stops the workers. Jobs interrupted here are queued again for the next start.
+       """
+       for worker in self._workers:
+           worker.cancel()
+       await asyncio.gather(*self._workers, return_exceptions=True)
+       self._workers = []
+       if self._running:
+           await asyncio.to_thread(self._requeue, list(self._running))
+           self._running.clear()
+
+
+   async def _worker(self):
+       while True:
+           try:
+               job, expired = await asyncio.to_thread(self._claim)
+           except Exception as e:
+               logger.error("Error claiming a verification job: %s", e)
+               job, expired = None, []
+           for job_id, callback_url in expired:
+               self.failed += 1
+               logger.error("Verification job %s failed: interrupted too many times.", job_id)
+               if callback_url:
+                   try:
+                       await self._send_callback(callback_url, await asyncio.to_thread(self.get, job_id))
+                   except Exception as e:
+                       logger.error("Error sending the callback of verification job %s: %s", job_id, e)
+           if job is None:
+               # Sleep until a local submission, or poll for jobs submitted by other processes.
+               try:
+                   await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+               except asyncio.TimeoutError:
+                   pass
+               self._wakeup.clear()
+               continue
+           try:
+               await self._process(job)
+           except asyncio.CancelledError:
+               raise
+           except Exception as e:
+               # E.g. the queue database was locked while the result was saved. The job keeps
+               # its lease, which runs out and hands it to a worker again; this one carries on.
+               self._running.discard(job["id"])
+               logger.error("Error processing verification job %s, left to its lease: %s", job["id"], e)
+
+
+   async def _process(self, job: dict):
+       self._running.add(job["id"])
+       renewal = asyncio.create_task(self._renew_lease(job["id"]))
+       retry = False
+       try:
+           result = await self.run_job(text_content=job["text"], file_path=job["file_path"], file_hash=job["file_hash"])
+           error = None
+       except asyncio.CancelledError:
+           raise
+       except Exception as e:
+           result, error = None, f"{type(e).__name__}: {e}"
+           retry = isinstance(e, self.retry_on) and job["attempts"] < self.max_attempts
+       finally:
+           renewal.cancel()
+
+       self._running.discard(job["id"])
+       await asyncio.to_thread(self._finish, job, result, error, retry)
+       if retry:
+           logger.warning("Verification job %s failed (attempt %d), queued again: %s", job["id"], job["attempts"], error)
+           return
+       if error:
+           self.failed += 1
+           logger.error("Verification job %s failed: %s", job["id"], error)
+       else:
+           self.completed += 1
+       if job["callback_url"]:
+           await self._send_callback(job["callback_url"], await asyncio.to_thread(self.get, job["id"]))
+
+
+   async def _renew_lease(self, job_id: str):
+       while True:
+           await asyncio.sleep(self.lease_seconds / 3)
+           await asyncio.to_thread(self._extend_lease, job_id)
+
+
+   async def _send_callback(self, url: str, job: dict):
+       """
+       POSTs the finished job to the client's callback URL. Best effort: clients can
+       always poll the job if the callback does not get through.
+
+
+       The URL is checked again right before sending, since what its host resolves to may
+       have changed since the job was submitted. Redirects are not followed.
+       """
+       try:
+           await asyncio.to_thread(check_callback_url, url, self.callback_hosts)
+       except InvalidCallbackError as e:
+           logger.warning("Callback for verification job %s to %s refused: %s", job["id"], url, e)
+           return
+       try:
+           async with httpx.AsyncClient(timeout=10) as client:
+               response = await client.post(url, json=job)
+               response.raise_for_status()
+       except httpx.HTTPError as e:
+           logger.warning("Callback for verification job %s to %s failed: %s", job["id"], url, e)
+
+
+   # --- Queue storage ---
+
+   def _connection(self) -> sqlite3.Connection:
+       # Opened on first use, so importing the module creates no files.
+       if self._conn is None:
+           Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+           self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+           self._conn.execute("PRAGMA journal_mode=WAL")
+           self._conn.executescript(SCHEMA)
+           # Queues created before jobs recorded their client.
+           columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+           if "owner" not in columns:
+               self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+       return self._conn
+
+
+   def _claim(self) -> tuple:
+       """
+       Takes the next job: the highest-priority queued one, or a running one whose lease
+       ran out because its worker stopped.
+
+
+       Returns:
+           tuple: (job or None if there is nothing to run, [(job_id, callback_url)] of the jobs
+                  that just failed for running out of attempts; their files are already removed).
+       """
+       now = time.time()
+       with self._lock:
+           conn = self._connection()
+           with conn:
+               expired = self._expire(conn, now)
+               row = conn.execute(
+                   "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, started_at = ? "
+                   "WHERE id = ("
+                   "  SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)"
+                   "  ORDER BY priority DESC, created_at LIMIT 1"
+                   ") RETURNING id, text, file_path, file_hash, callback_url, attempts",
+                   (now + self.lease_seconds, now, now)
+               ).fetchone()
+       # Only once the transaction is committed, so a rolled-back expiry keeps its file.
+       for _, file_path, _ in expired:
+           if file_path:
+               self._remove_file(file_path)
+       expired = [(job_id, callback_url) for job_id, _, callback_url in expired]
+       if row is None:
+           return None, expired
+       keys = ("id", "text", "file_path", "file_hash", "callback_url", "attempts")
+       return dict(zip(keys, row)), expired
+
+
+   def _expire(self, conn: sqlite3.Connection, now: float) -> list:
+       # Jobs whose lease ran out on their last allowed attempt fail instead of running again.
+       # Returns their (id, file_path, callback_url).
+       expired = conn.execute(
+           "UPDATE jobs SET status = 'failed', finished_at = ?, lease_until = NULL, error = 'Interrupted too many times.' "
+           "WHERE status = 'running' AND lease_until < ? AND attempts >= ? "
+           "RETURNING id, file_path, callback_url",
+           (now, now, self.max_attempts)
+       ).fetchall()
+       conn.execute(
+           "DELETE FROM jobs WHERE status IN ('succeeded', 'failed', 'cancelled') AND finished_at < ?",
+           (now - self.result_ttl,)
+       )
+       return expired
+
+
+   def _extend_lease(self, job_id: str):
+       with self._lock:
+           conn = self._connection()
+           with conn:
+               conn.execute(
+                   "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+                   (time.time() + self.lease_seconds, job_id)
+               )
+
+
+   def _finish(self, job: dict, result: Optional[dict], error: Optional[str], retry: bool):
+       with self._lock:
+           conn = self._connection()
+           with conn:
+               if retry:
+                   conn.execute("UPDATE jobs SET status = 'queued', lease_until = NULL, error = ? WHERE id = ?", (error, job["id"]))
+               else:
+                   conn.execute(
+                       "UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL, result = ?, error = ? WHERE id = ?",
+                       ("failed" if error else "succeeded", time.time(), json.dumps(result) if result else None, error, job["id"])
+                   )
+       if not retry and job["file_path"]:
+           self._remove_file(job["file_path"])
+
+
+   def _requeue(self, job_ids: list):
+       with self._lock:
+           conn = self._connection()
+           with conn:
+               conn.executemany(
+                   "UPDATE jobs SET status = 'queued', lease_until = NULL, attempts = attempts - 1 WHERE id = ? AND status = 'running'",
+                   [(job_id,) for job_id in job_ids]
+               )
+
+
+   @staticmethod
+   def _remove_file(path: str):
+       try:
+           os.unlink(path)
+       except FileNotFoundError:
+           pass
+
+
+   @staticmethod
+   def _job_from_row(row: tuple) -> dict:
+       job = dict(zip(JOB_COLUMNS.split(", "), row))
+       job["result"] = json.loads(job["result"]) if job["result"] else None
+       return job
+
+
+# Create a single instance of the queue for media verification jobs
+media_job_queue = MediaJobQueue(
+   settings.JOB_QUEUE_DB_PATH,
+   settings.JOB_STORAGE_DIR,
+   verification_orchestrator.run_full_verification,
+   concurrency=settings.JOB_WORKERS,
+   max_pending=settings.JOB_MAX_PENDING,
+   max_attempts=settings.JOB_MAX_ATTEMPTS,
+   lease_seconds=settings.JOB_LEASE_SECONDS,
+   result_ttl=settings.JOB_RESULT_TTL,
+   callback_hosts=settings.JOB_CALLBACK_ALLOWED_HOSTS,
+   max_priority=settings.JOB_MAX_PRIORITY
+)
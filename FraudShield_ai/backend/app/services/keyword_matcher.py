@@ -0,0 +1,144 @@
+# --- keyword_matcher.py ---
+# A compiled multi-phrase matcher for the suspicious-language lexicon.
+# All phrases are folded into one trie-shaped regular expression, so a text is
+# scanned once no matter how many phrases the lexicon holds.
+# The scan finds the longest phrase starting at every position, and each phrase carries the
+# categories of the shorter phrases it starts with, so overlapping and nested phrases raise
+# the same flags as checking every phrase on its own would.
+
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+
+# Marks the end of a phrase inside the trie.
+_END = ""
+_WORD_CHAR = re.compile(r"\w")
+
+
+class KeywordMatcher:
+   """
+   Finds every lexicon phrase in a text in a single pass and maps each hit to its flag category.
+
+
+   Matching rules:
+   - Case-insensitive ("URGENT" matches "urgent").
+   - Whole words only: a phrase must not be preceded or followed by a word character,
+     so "urgent" does not fire inside "urgently".
+   - Any run of whitespace matches a space in a phrase ("act   now" matches "act now").
+   - Phrases may overlap or nest: in "guaranteed profit" both it and a phrase "profit" count.
+   """
+
+   def __init__(self, lexicon: dict[str, str]):
+       """
+       Args:
+           lexicon (dict): Maps each phrase to the flag category it raises,
+                           e.g., {"risk-free": "Promissory Language"}.
+       """
+       self.phrase_categories = {self.normalize(phrase): category for phrase, category in lexicon.items() if phrase.strip()}
+       trie = self._build_trie(self.phrase_categories)
+       self.pattern = self._compile(trie)
+       # Categories raised by a hit on each phrase: its own and those of the phrases it starts with.
+       self.hit_categories = self._prefix_categories(self.phrase_categories, trie)
+       # Identifies the lexicon contents, e.g. to invalidate results computed with an older lexicon.
+       self.fingerprint = hashlib.sha256(json.dumps(self.phrase_categories, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+   @classmethod
+   def from_file(cls, path: Path) -> "KeywordMatcher":
+       """
+       Builds a matcher from a JSON lexicon file grouped by category, e.g.:
+           {"Promissory Language": ["guaranteed profit", "risk-free"], "Insider Claim": ["insider tip"]}
+       """
+       with open(path, "r", encoding="utf-8") as f:
+           grouped = json.load(f)
+       return cls({phrase: category for category, phrases in grouped.items() for phrase in phrases})
+
+
+   @staticmethod
+   def normalize(phrase: str) -> str:
+       return " ".join(phrase.casefold().split())
+
+
+   def finditer(self, text: str):
+       """
+       Yields (start_offset, category) for every phrase found in the text. Phrases that start
+       where a longer one does yield their categories at the same offset.
+       """
+       if self.pattern is None:
+           return
+       for match in self.pattern.finditer(text):
+           for category in self.hit_categories[self.normalize(match.group(1))]:
+               yield match.start(), category
+
+
+   def categories(self, text: str) -> set:
+       """
+       Returns the set of flag categories raised by the text.
+       """
+       return {category for _, category in self.finditer(text)}
+
+
+   @staticmethod
+   def _build_trie(phrase_categories: dict) -> dict:
+       # A character trie, so phrases sharing a prefix share regex branches.
+       # Python's regex engine tries alternatives one by one, so a flat
+       # "p1|p2|...|pN" costs O(N) per position while the trie costs O(alphabet).
+       trie = {}
+       for phrase in phrase_categories:
+           node = trie
+           for char in phrase:
+               node = node.setdefault(char, {})
+           node[_END] = {}
+       return trie
+
+
+   def _compile(self, trie: dict):
+       if not trie:
+           return None
+
+       body = self._trie_to_regex(trie)
+       # The lookahead matches without consuming the text, so a phrase is looked for at every
+       # start, including inside or across an earlier hit ("act now" in "urgent act now").
+       return re.compile(rf"(?=(?<!\w)({body})(?!\w))", re.IGNORECASE)
+
+
+   @staticmethod
+   def _prefix_categories(phrase_categories: dict, trie: dict) -> dict:
+       """
+       Maps each phrase to its own category followed by those of the phrases it starts with
+       as whole words. The scan only reports the longest phrase at each start, so this is how
+       a shorter phrase sharing that start ("guaranteed" in "guaranteed profit") still counts.
+       """
+       hit_categories = {}
+       for phrase, category in phrase_categories.items():
+           found = [category]
+           node = trie
+           for end, char in enumerate(phrase[:-1]):
+               node = node[char]
+               if _END in node and not _WORD_CHAR.match(phrase[end + 1]):
+                   found.append(phrase_categories[phrase[:end + 1]])
+           hit_categories[phrase] = tuple(dict.fromkeys(found))
+       return hit_categories
+
+
+   def _trie_to_regex(self, node: dict) -> str:
+       alternatives = []
+       can_end = False
+       for char in sorted(node):
+           if char == _END:
+               can_end = True
+               continue
+           token = r"\s+" if char == " " else re.escape(char)
+           alternatives.append(token + self._trie_to_regex(node[char]))
+
+       if not alternatives:
+           return ""
+       if len(alternatives) == 1 and not can_end:
+           return alternatives[0]
+
+       group = "(?:" + "|".join(alternatives) + ")"
+       # Greedy "?" tries the longer phrase first and backtracks to the shorter one.
+       return group + "?" if can_end else group
@@ -0,0 +1,121 @@
+# --- micro_batcher.py ---
+# This module implements dynamic micro-batching for model inference.
+# Concurrent requests each submit one input; the batcher groups them and runs the model
+# once per group, which amortizes the per-call overhead of transformer models on CPU.
+
+
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+
+
+class MicroBatcher:
+   """
+   Collects items submitted concurrently on the event loop and processes them in batches.
+
+
+   A batch is dispatched as soon as it holds `max_batch_size` items, or `max_delay` seconds
+   after its oldest item arrived, whichever comes first. At most `max_in_flight` batches run
+   at once; while the model is busy, new items keep accumulating into the next batch instead
+   of queueing up as many small ones, so batches grow with load.
+
+
+   The batch function runs in `executor` and must return one result per input, in order;
+   each result is routed back to the caller that submitted the matching item.
+
+
+   Args:
+       process_batch (callable): Blocking function mapping a list of inputs to a list of results.
+       max_batch_size (int): Largest batch passed to `process_batch`. 1 disables batching.
+       max_delay (float): Longest time, in seconds, an item waits for its batch to fill up
+                          while the model is idle.
+       max_in_flight (int): Batches allowed to run concurrently.
+       executor (Executor, optional): Where `process_batch` runs. Defaults to the loop's executor.
+   """
+
+   def __init__(self, process_batch, max_batch_size: int = 32, max_delay: float = 0.01,
+                max_in_flight: int = 1, executor: Executor = None):
+       self.process_batch = process_batch
+       self.max_batch_size = max(1, max_batch_size)
+       self.max_delay = max_delay
+       self.max_in_flight = max(1, max_in_flight)
+       self.executor = executor
+       # (item, future, arrival time) in arrival order.
+       self._pending = []
+       self._timer = None
+       self._running = set()
+       self.batches = 0
+       self.items = 0
+
+
+   async def submit(self, item):
+       """
+       Queues one input and waits for its result.
+       An exception raised by the batch function is raised in every caller of that batch.
+       """
+       loop = asyncio.get_running_loop()
+       future = loop.create_future()
+       self._pending.append((item, future, loop.time()))
+       self._dispatch_ready()
+       return await future
+
+
+   def stats(self) -> dict:
+       return {
+           "batches": self.batches,
+           "items": self.items,
+           "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0
+       }
+
+
+   def _dispatch_ready(self):
+       """
+       Starts every batch that is full or past its deadline, as long as a slot is free,
+       then arms the deadline timer for whatever is still pending.
+       """
+       loop = asyncio.get_running_loop()
+       while self._pending and len(self._running) < self.max_in_flight:
+           full = len(self._pending) >= self.max_batch_size
+           due = loop.time() - self._pending[0][2] >= self.max_delay
+           if not (full or due):
+               break
+           batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+           # Callers that were cancelled while waiting (e.g. the client disconnected) are dropped.
+           batch = [(item, future) for item, future, _ in batch if not future.done()]
+           if batch:
+               self.batches += 1
+               self.items += len(batch)
+               # Keep a reference so the task is not garbage-collected before it finishes.
+               task = loop.create_task(self._run(batch))
+               self._running.add(task)
+               task.add_done_callback(self._batch_done)
+
+       # With every slot busy, the next batch is started when one finishes instead.
+       if self._pending and self._timer is None and len(self._running) < self.max_in_flight:
+           self._timer = loop.call_at(self._pending[0][2] + self.max_delay, self._deadline_reached)
+
+
+   def _deadline_reached(self):
+       self._timer = None
+       self._dispatch_ready()
+
+
+   def _batch_done(self, task: asyncio.Task):
+       self._running.discard(task)
+       self._dispatch_ready()
+
+
+   async def _run(self, batch: list):
+       loop = asyncio.get_running_loop()
+       try:
+           results = await loop.run_in_executor(self.executor, partial(self.process_batch, [item for item, _ in batch]))
+           if len(results) != len(batch):
+               raise ValueError(f"Batch function returned {len(results)} results for {len(batch)} inputs.")
+       except Exception as e:
+           for _, future in batch:
+               if not future.done():
+                   future.set_exception(e)
+           return
+       for (_, future), result in zip(batch, results):
+           if not future.done():
+               future.set_result(result)
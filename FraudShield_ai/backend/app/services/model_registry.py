@@ -0,0 +1,160 @@
+# --- model_registry.py ---
+# This module keeps track of every model and reference dataset the services need.
+# Nothing is loaded at import time: each entry is loaded on first use, or ahead of
+# traffic by `warm_up()` (called from the FastAPI lifespan in app/main.py).
+
+
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class ModelLoadError(RuntimeError):
+   """
+   Raised when a registered model failed to load.
+   """
+
+
+class _Entry:
+   def __init__(self, name: str, loader, fork_safe: bool):
+       self.name = name
+       self.loader = loader
+       self.fork_safe = fork_safe
+       self.lock = threading.Lock()
+       self.state = "registered"
+       self.value = None
+       self.error = None
+       self.load_seconds = None
+
+
+class ModelRegistry:
+   """
+   Registry of lazily loaded models.
+
+
+   A model is registered with a zero-argument loader. The first `get()` (or `warm_up()`)
+   calls the loader once and keeps the result; concurrent callers wait for that load
+   instead of loading the model again.
+
+
+   `fork_safe` marks entries whose loaded value can be shared with worker processes forked
+   after loading (plain in-memory weights and tables). Entries that hold open connections
+   or threads, like SQLite handles, must be loaded in each worker instead.
+   """
+
+   def __init__(self):
+       self._entries = {}
+       self._lock = threading.Lock()
+       self.warm_up_finished = False
+
+
+   def register(self, name: str, loader, fork_safe: bool = True):
+       """
+       Registers a loader under `name`. Registering a name again replaces its loader and
+       drops any value loaded by the previous one.
+       """
+       with self._lock:
+           self._entries[name] = _Entry(name, loader, fork_safe)
+
+
+   def get(self, name: str):
+       """
+       Returns the loaded model, loading it first if needed.
+
+
+       Raises:
+           KeyError: If nothing is registered under `name`.
+           ModelLoadError: If the loader failed.
+       """
+       entry = self._entries[name]
+       if entry.state != "loaded":
+           self._load(entry)
+       return entry.value
+
+
+   def is_loaded(self, name: str) -> bool:
+       entry = self._entries.get(name)
+       return entry is not None and entry.state == "loaded"
+
+
+   def warm_up(self, fork_safe_only: bool = False) -> bool:
+       """
+       Loads every registered model that is not loaded yet, in registration order.
+       A failed load is recorded and does not stop the others.
+
+
+       Args:
+           fork_safe_only (bool): Only load entries marked fork-safe. Used when preloading
+                                  in a parent process before workers are forked.
+
+
+       Returns:
+           bool: True if every attempted load succeeded.
+       """
+       ok = True
+       for entry in list(self._entries.values()):
+           if fork_safe_only and not entry.fork_safe:
+               continue
+           try:
+               self._load(entry)
+           except ModelLoadError:
+               ok = False
+       if not fork_safe_only:
+           self.warm_up_finished = True
+       return ok
+
+
+   def skip_warm_up(self):
+       """
+       Marks the registry ready without loading anything; models load on first use instead.
+       """
+       self.warm_up_finished = True
+
+
+   def is_ready(self) -> bool:
+       """
+       True once a full warm-up has finished and no model failed to load.
+       """
+       return self.warm_up_finished and all(entry.state != "failed" for entry in self._entries.values())
+
+
+   def status(self) -> dict:
+       """
+       Returns the load state of every entry, for the readiness endpoint.
+       """
+       models = {}
+       for entry in list(self._entries.values()):
+           info = {"state": entry.state}
+           if entry.load_seconds is not None:
+               info["load_seconds"] = round(entry.load_seconds, 3)
+           if entry.error:
+               info["error"] = entry.error
+           models[entry.name] = info
+       return {"ready": self.is_ready(), "warm_up_finished": self.warm_up_finished, "models": models}
+
+
+   def _load(self, entry: _Entry):
+       with entry.lock:
+           if entry.state == "loaded":
+               return
+           if entry.state == "failed":
+               raise ModelLoadError(f"Model '{entry.name}' failed to load: {entry.error}")
+           entry.state = "loading"
+           start = time.perf_counter()
+           try:
+               entry.value = entry.loader()
+           except Exception as e:
+               entry.state = "failed"
+               entry.error = f"{type(e).__name__}: {e}"
+               logger.error("Error loading model '%s': %s", entry.name, entry.error)
+               raise ModelLoadError(f"Model '{entry.name}' failed to load: {entry.error}") from e
+           entry.load_seconds = time.perf_counter() - start
+           entry.state = "loaded"
+           logger.info("Loaded model '%s' in %.2fs.", entry.name, entry.load_seconds)
+
+
+# Create a single registry shared by all services
+model_registry = ModelRegistry()
@@ -2,20 +2,134 @@
 # This service handles text analysis using NLP models and rule-based checks.
 
 
+import logging
+import os
 import re
+import threading
+import time
+from bisect import bisect_right
+from pathlib import Path
+
+
+from app.core.config import settings
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.model_registry import model_registry
 # You would import your NLP libraries here, e.g.:
 # from transformers import pipeline
 # import spacy
 
 
+logger = logging.getLogger(__name__)
+
+
 class NLPService:
+   BATCH_SEPARATOR = "\x00"
+
+   # Used when the lexicon file (settings.SCAM_LEXICON_PATH) cannot be read at startup.
+   DEFAULT_LEXICON = {
+       "guaranteed profit": "Promissory Language",
+       "risk-free": "Promissory Language",
+       "insider tip": "Insider Claim",
+       "act now": "Urgency Pressure",
+       "urgent": "Urgency Pressure",
+   }
+
+
    def __init__(self):
-       # In a real implementation, you would load your pre-trained NLP model here.
-       # This is often done via the Hugging Face transformers library or spaCy.
-       # self.sentiment_analyzer = pipeline("sentiment-analysis", model="ProsusAI/finbert")
-       # self.ner_model = spacy.load("en_core_web_sm") # Example for NER
-       print("NLP Service Initialized (using mock logic).")
-       self.suspicious_keywords = ["guaranteed profit", "risk-free", "insider tip", "act now", "urgent"]
+       # In a real implementation, you would register your pre-trained NLP models here.
+       # They are loaded by the model registry on first use or during warm-up, not at import, e.g.:
+       # model_registry.register("finbert", lambda: pipeline("sentiment-analysis", model="ProsusAI/finbert"))
+       # model_registry.register("spacy_ner", lambda: spacy.load("en_core_web_sm")) # Example for NER
+       # and fetch them with model_registry.get("finbert").
+       logger.info("NLP Service Initialized (using mock logic).")
+
+       # The suspicious-language lexicon is compiled once into a single-pass matcher.
+       # It is rebuilt whenever the lexicon file changes, without restarting the service.
+       self.lexicon_path = Path(settings.SCAM_LEXICON_PATH)
+       self.lexicon_reload_interval = settings.LEXICON_RELOAD_INTERVAL
+       self._lexicon_lock = threading.Lock()
+       self._lexicon_signature = None
+       self._lexicon_checked_at = 0.0
+       self.keyword_matcher = KeywordMatcher(self.DEFAULT_LEXICON)
+       model_registry.register("scam_lexicon", self._load_lexicon)
+
+       # Patterns compiled once and shared by the single-text and batch paths.
+       # Finds quoted names with a legal suffix, like 'Innovate Corp', 'FutureTech Ltd' or 'INNOVATE CORP.',
+       # and cashtags like $INNOV. The CrossVerifier resolves spelling variants to the official company.
+       self.org_pattern = re.compile(
+           r"'([A-Z][A-Za-z0-9&.\s]*?\s(?i:corp|corporation|ltd|limited|inc|industries)\.?)'|\$([A-Z]{2,10})\b"
+       )
+       self.percentage_pattern = re.compile(r'(\d+\s*%)') # Finds numbers followed by %
+       self.sentiment_pattern = re.compile("profit|growth", re.IGNORECASE)
+
+
+   def reload_lexicon(self) -> bool:
+       """
+       Re-reads the lexicon file and swaps in a freshly compiled matcher if it changed.
+
+
+       The new matcher is built before it replaces the old one, so requests in flight keep
+       using a complete matcher. If the file is missing or invalid, the current lexicon stays.
+
+
+       Returns:
+           bool: True if a new lexicon was loaded.
+       """
+       with self._lexicon_lock:
+           return self._reload_lexicon_locked()
+
+
+   def _reload_lexicon_locked(self) -> bool:
+       self._lexicon_checked_at = time.monotonic()
+       try:
+           stat = os.stat(self.lexicon_path)
+       except OSError:
+           return False
+
+       signature = (stat.st_mtime_ns, stat.st_size)
+       if signature == self._lexicon_signature:
+           return False
+
+       try:
+           matcher = KeywordMatcher.from_file(self.lexicon_path)
+       except (OSError, ValueError, AttributeError) as e:
+           logger.warning("Error loading lexicon from %s, keeping the current one: %s", self.lexicon_path, e)
+           return False
+
+       self.keyword_matcher = matcher
+       self._lexicon_signature = signature
+       logger.info("Loaded %d lexicon phrases from %s.", len(matcher.phrase_categories), self.lexicon_path)
+       return True
+
+
+   @property
+   def lexicon_fingerprint(self) -> str:
+       """
+       Fingerprint of the active lexicon, loading it first if needed.
+       """
+       return self._current_matcher().fingerprint
+
+
+   def _load_lexicon(self) -> KeywordMatcher:
+       # Initial load, run once by the model registry. Later changes are picked up by _current_matcher.
+       self.reload_lexicon()
+       return self.keyword_matcher
+
+
+   def _current_matcher(self) -> KeywordMatcher:
+       """
+       Returns the active keyword matcher, checking the lexicon file for changes at most
+       once per reload interval. Only one thread performs the check; the others keep
+       using the current matcher instead of waiting for it.
+       """
+       model_registry.get("scam_lexicon")
+       if time.monotonic() - self._lexicon_checked_at >= self.lexicon_reload_interval:
+           if self._lexicon_lock.acquire(blocking=False):
+               try:
+                   self._reload_lexicon_locked()
+               finally:
+                   self._lexicon_lock.release()
+       return self.keyword_matcher
 
 
    def analyze_text_for_anomalies(self, text: str) -> dict:
@@ -28,37 +142,91 @@ class NLPService:
        2. Use a proper NER model (like from spaCy or FinBERT) to extract company names, monetary values, and percentages.
        3. Combine model output with rule-based checks.
        """
-       print("Running MOCK NLP analysis with entity extraction...")
+       logger.debug("Running MOCK NLP analysis with entity extraction...")
       
        flags = []
        text_lower = text.lower()
       
        # --- Keyword Analysis ---
-       for keyword in self.suspicious_keywords:
-           if keyword in text_lower:
-               if keyword in ["guaranteed profit", "risk-free"]:
-                   flags.append("Promissory Language")
-               elif keyword in ["insider tip"]:
-                   flags.append("Insider Claim")
-               elif keyword in ["act now", "urgent"]:
-                   flags.append("Urgency Pressure")
+       # One pass over the text finds every lexicon phrase and its flag category.
+       flags.extend(self._current_matcher().categories(text))
       
        # --- Mock Entity Extraction (NER) ---
        # A real implementation would use a spaCy or Hugging Face model here.
        # This regex is a simple placeholder for the hackathon.
-       extracted_orgs = re.findall(r"'([A-Z][A-Za-z\s]+Corp)'", text) # Finds words like 'Innovate Corp'
-       extracted_percentages = re.findall(r'(\d+\s*%)', text) # Finds numbers followed by %
+       extracted_orgs = [quoted or cashtag for quoted, cashtag in self.org_pattern.findall(text)]
+       extracted_percentages = self.percentage_pattern.findall(text)
+
+
+       # --- Mock Sentiment Analysis ---
+       sentiment = "Positive" if "profit" in text_lower or "growth" in text_lower else "Neutral"
+
+       return self._build_result(flags, extracted_orgs, extracted_percentages, sentiment)
+
+
+   def analyze_batch(self, texts: list[str]) -> list[dict]:
+       """
+       Analyzes many texts in one call and returns one result per text, in input order.
+
+
+       Each result has exactly the same shape as `analyze_text_for_anomalies`. Instead of
+       scanning every text separately, the batch is joined into a single buffer and each
+       pattern (keywords, organizations, percentages, sentiment) makes one pass over it.
+       Match offsets are then mapped back to the text they came from.
+
 
+       This is also the entry point for micro-batched /verify requests. Once FinBERT and NER
+       replace the mock, the texts are tokenized as one padded batch and run through each
+       model in a single call here.
+       """
+       logger.debug("Running MOCK NLP batch analysis on %d texts...", len(texts))
+       if not texts:
+           return []
+
+       # NUL never matches any of our patterns, so no match can span two texts.
+       cleaned = [text.replace(self.BATCH_SEPARATOR, " ") for text in texts]
+       text_starts = self._segment_starts(cleaned)
+       joined = self.BATCH_SEPARATOR.join(cleaned)
+       matcher = self._current_matcher()
+
+       flags = [[] for _ in texts]
+       orgs = [[] for _ in texts]
+       percentages = [[] for _ in texts]
+       positive = [False] * len(texts)
+
+       for start, category in matcher.finditer(joined):
+           flags[bisect_right(text_starts, start) - 1].append(category)
+       for match in self.org_pattern.finditer(joined):
+           orgs[bisect_right(text_starts, match.start()) - 1].append(match.group(1) or match.group(2))
+       for match in self.percentage_pattern.finditer(joined):
+           percentages[bisect_right(text_starts, match.start()) - 1].append(match.group(1))
+       for match in self.sentiment_pattern.finditer(joined):
+           positive[bisect_right(text_starts, match.start()) - 1] = True
+
+       return [
+           self._build_result(flags[i], orgs[i], percentages[i], "Positive" if positive[i] else "Neutral")
+           for i in range(len(texts))
+       ]
+
+
+   def _segment_starts(self, texts: list[str]) -> list[int]:
+       """
+       Returns the offset at which each text starts once joined with BATCH_SEPARATOR.
+       """
+       starts = []
+       offset = 0
+       for text in texts:
+           starts.append(offset)
+           offset += len(text) + len(self.BATCH_SEPARATOR)
+       return starts
 
+
+   def _build_result(self, flags: list, extracted_orgs: list, extracted_percentages: list, sentiment: str) -> dict:
        entities = {
            "organizations": list(set(extracted_orgs)),
            "percentages": list(set(extracted_percentages))
        }
 
-
-       # --- Mock Sentiment Analysis ---
-       sentiment = "Positive" if "profit" in text_lower or "growth" in text_lower else "Neutral"
-      
        # --- Final Summary ---
        summary = "Text contains high-risk language and pressure tactics." if flags else "Text appears to be standard."
        if entities["organizations"] or entities["percentages"]:
@@ -0,0 +1,343 @@
+# --- official_records.py ---
+# This module provides the indexed store of official company records used by the
+# CrossVerifier. Records live in SQLite: every company is reachable through an
+# indexed lookup table holding its exact name, normalized name, aliases and ticker.
+
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+
+# Legal-form suffixes are folded to one spelling so "Innovate Corporation" and
+# "INNOVATE CORP." normalize to the same key.
+_SUFFIXES = {
+   "corporation": "corp",
+   "incorporated": "inc",
+   "limited": "ltd",
+   "company": "co",
+   "private": "pvt",
+}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+   id INTEGER PRIMARY KEY,
+   name TEXT NOT NULL,
+   ticker TEXT,
+   exchange TEXT,
+   latest_growth_claim TEXT
+);
+CREATE TABLE IF NOT EXISTS company_keys (
+   lookup_key TEXT NOT NULL,
+   company_id INTEGER NOT NULL REFERENCES companies(id),
+   kind TEXT NOT NULL,
+   PRIMARY KEY (lookup_key, company_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS filings (
+   company_id INTEGER NOT NULL REFERENCES companies(id),
+   title TEXT NOT NULL,
+   filed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_filings_company ON filings (company_id);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def normalize_company_name(name: str) -> str:
+   """
+   Normalizes a company name for lookup: case-folded, punctuation removed,
+   whitespace collapsed and legal suffixes folded (e.g. "Limited" -> "ltd").
+   """
+   tokens = _NON_ALNUM.sub(" ", name.casefold()).split()
+   return " ".join(_SUFFIXES.get(token, token) for token in tokens)
+
+
+def lookup_keys_for(company: dict) -> list[tuple]:
+   """
+   Returns every (lookup_key, kind) a company can be found under.
+   Exact names are stored as-is; normalized names, aliases and tickers are normalized.
+   """
+   keys = [(company["name"], "exact"), (normalize_company_name(company["name"]), "normalized")]
+   for alias in company.get("aliases", []):
+       keys.append((normalize_company_name(alias), "alias"))
+   if company.get("ticker"):
+       keys.append((normalize_company_name(company["ticker"]), "ticker"))
+   return list(dict.fromkeys(key for key in keys if key[0]))
+
+
+class OfficialRecordsStore:
+   """
+   SQLite-backed store of official company records.
+
+
+   Lookups go through the `company_keys` table, whose primary key is a B-tree over the
+   lookup key, so each name resolves in O(log n). `lookup_many` resolves every name a
+   request mentions with a single query.
+
+
+   With a `reload_interval`, `reload_if_changed` reopens the database when its file is
+   rebuilt or replaced on disk (see data_ingestion/build_official_records.py), so new
+   records are served, and `version` changes, without restarting the service.
+   """
+
+   def __init__(self, db_path: str = ":memory:", reload_interval: float = None):
+       self.db_path = db_path
+       self.reload_interval = reload_interval
+       self._conn = sqlite3.connect(db_path, check_same_thread=False)
+       self._lock = threading.Lock()
+       self._reload_lock = threading.Lock()
+       self._conn.executescript(SCHEMA)
+       self._signature = self._file_signature()
+       self._checked_at = time.monotonic()
+       self.version = self._read_version()
+
+
+   @classmethod
+   def from_companies_file(cls, companies_path: Path, db_path: str = ":memory:") -> "OfficialRecordsStore":
+       """
+       Builds a store from a JSON list of companies (see `replace_all` for the format).
+       """
+       with open(companies_path, "r", encoding="utf-8") as f:
+           companies = json.load(f)
+       store = cls(db_path)
+       store.replace_all(companies)
+       return store
+
+
+   def replace_all(self, companies: list[dict]):
+       """
+       Replaces every record in the store.
+
+
+       Args:
+           companies (list): Company records, e.g.
+               {"name": "Innovate Corp", "ticker": "INNOV", "exchange": "NSE",
+                "aliases": ["Innovate Corporation"], "latest_growth_claim": "25%",
+                "official_filings": ["Q3 Report Filed"]}
+       """
+       with self._lock, self._conn:
+           self._conn.execute("DELETE FROM company_keys")
+           self._conn.execute("DELETE FROM filings")
+           self._conn.execute("DELETE FROM companies")
+           for company_id, company in enumerate(companies, start=1):
+               self._conn.execute(
+                   "INSERT INTO companies (id, name, ticker, exchange, latest_growth_claim) VALUES (?, ?, ?, ?, ?)",
+                   (company_id, company["name"], company.get("ticker"), company.get("exchange"), company.get("latest_growth_claim"))
+               )
+               self._conn.executemany(
+                   "INSERT OR IGNORE INTO company_keys (lookup_key, company_id, kind) VALUES (?, ?, ?)",
+                   [(key, company_id, kind) for key, kind in lookup_keys_for(company)]
+               )
+               self._conn.executemany(
+                   "INSERT INTO filings (company_id, title, filed_at) VALUES (?, ?, ?)",
+                   [self._filing_row(company_id, filing) for filing in company.get("official_filings", [])]
+               )
+           version = hashlib.sha256(json.dumps(companies, sort_keys=True).encode("utf-8")).hexdigest()
+           self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (version,))
+       self.version = version
+
+
+   def add_filings(self, filings: list[tuple]) -> int:
+       """
+       Attaches filings to companies by name.
+
+
+       Args:
+           filings (list): (company_name, title, filed_at) tuples.
+
+
+       Returns:
+           int: Number of filings matched to a company.
+       """
+       matched = 0
+       with self._lock, self._conn:
+           for company_name, title, filed_at in filings:
+               row = self._conn.execute(
+                   "SELECT company_id FROM company_keys WHERE lookup_key = ? LIMIT 1",
+                   (normalize_company_name(company_name),)
+               ).fetchone()
+               if row:
+                   self._conn.execute(
+                       "INSERT INTO filings (company_id, title, filed_at) VALUES (?, ?, ?)",
+                       (row[0], title, filed_at)
+                   )
+                   matched += 1
+           version = self._bump_version(f"filings:{matched}")
+       self.version = version
+       return matched
+
+
+   def lookup_many(self, names: list[str]) -> dict:
+       """
+       Resolves company names with a single indexed query.
+
+
+       Each name is tried by exact match first, then by normalized name, alias or ticker.
+
+
+       Returns:
+           dict: Maps each name that was found to its record:
+                 {"id", "name", "ticker", "exchange", "latest_growth_claim", "matched_by"}.
+       """
+       if not names:
+           return {}
+
+       candidates = {}
+       for name in names:
+           candidates.setdefault(name, []).append(name)
+           candidates.setdefault(normalize_company_name(name), []).append(name)
+
+       placeholders = ",".join("?" * len(candidates))
+       with self._lock:
+           rows = self._conn.execute(
+               f"""SELECT k.lookup_key, k.kind, c.id, c.name, c.ticker, c.exchange, c.latest_growth_claim
+                   FROM company_keys k JOIN companies c ON c.id = k.company_id
+                   WHERE k.lookup_key IN ({placeholders})""",
+               list(candidates)
+           ).fetchall()
+
+       # Prefer exact matches over normalized/alias/ticker ones.
+       rank = {"exact": 0, "normalized": 1, "alias": 2, "ticker": 3}
+       found = {}
+       for lookup_key, kind, company_id, name, ticker, exchange, growth in sorted(rows, key=lambda row: rank[row[1]]):
+           for mention in candidates[lookup_key]:
+               if kind == "exact" and mention != lookup_key:
+                   continue
+               found.setdefault(mention, {
+                   "id": company_id,
+                   "name": name,
+                   "ticker": ticker,
+                   "exchange": exchange,
+                   "latest_growth_claim": growth,
+                   "matched_by": kind
+               })
+       return found
+
+
+   def get_many(self, company_ids: list[int]) -> dict:
+       """
+       Fetches company records by ID with a single query.
+
+
+       Returns:
+           dict: company_id -> {"id", "name", "ticker", "exchange", "latest_growth_claim"}.
+       """
+       if not company_ids:
+           return {}
+       ids = list(set(company_ids))
+       placeholders = ",".join("?" * len(ids))
+       with self._lock:
+           rows = self._conn.execute(
+               f"SELECT id, name, ticker, exchange, latest_growth_claim FROM companies WHERE id IN ({placeholders})",
+               ids
+           ).fetchall()
+       return {
+           row[0]: {"id": row[0], "name": row[1], "ticker": row[2], "exchange": row[3], "latest_growth_claim": row[4]}
+           for row in rows
+       }
+
+
+   def lookup_entries(self) -> list[tuple]:
+       """
+       Returns every normalized (company_id, lookup_key, kind) entry, e.g. to build a name index.
+       """
+       with self._lock:
+           return self._conn.execute(
+               "SELECT company_id, lookup_key, kind FROM company_keys WHERE kind != 'exact' ORDER BY company_id"
+           ).fetchall()
+
+
+   def filings_for(self, company_id: int) -> list[str]:
+       with self._lock:
+           rows = self._conn.execute(
+               "SELECT title FROM filings WHERE company_id = ? ORDER BY rowid", (company_id,)
+           ).fetchall()
+       return [row[0] for row in rows]
+
+
+   def reload_if_changed(self) -> bool:
+       """
+       Reopens the database if its file changed since it was opened, checking at most once
+       per `reload_interval`. Only one thread performs the check; the others keep using the
+       current connection instead of waiting for it. Stores without a reload interval, such
+       as in-memory ones, never reload.
+
+
+       Returns:
+           bool: True if the store was reopened.
+       """
+       if self.reload_interval is None or time.monotonic() - self._checked_at < self.reload_interval:
+           return False
+       if not self._reload_lock.acquire(blocking=False):
+           return False
+       try:
+           self._checked_at = time.monotonic()
+           signature = self._file_signature()
+           if signature is None or signature == self._signature:
+               return False
+           try:
+               conn = sqlite3.connect(self.db_path, check_same_thread=False)
+               conn.executescript(SCHEMA)
+               version = self._read_version(conn)
+           except sqlite3.Error as e:
+               logger.warning("Error reopening official records %s, keeping the current ones: %s", self.db_path, e)
+               return False
+           with self._lock:
+               old_conn, self._conn = self._conn, conn
+               self._signature = signature
+               self.version = version
+           old_conn.close()
+           logger.info("Reloaded official records from %s (version %s).", self.db_path, version[:12])
+           return True
+       finally:
+           self._reload_lock.release()
+
+
+   def count(self) -> int:
+       with self._lock:
+           return self._conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+
+   def close(self):
+       with self._lock:
+           self._conn.close()
+
+
+   def _filing_row(self, company_id: int, filing) -> tuple:
+       if isinstance(filing, dict):
+           return (company_id, filing["title"], filing.get("filed_at"))
+       return (company_id, filing, None)
+
+
+   def _read_version(self, conn: sqlite3.Connection = None) -> str:
+       row = (conn or self._conn).execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+       return row[0] if row else ""
+
+
+   def _file_signature(self):
+       # The inode changes when the file is replaced (os.replace), mtime and size when it is
+       # rewritten in place. None for in-memory stores and missing files.
+       if self.db_path == ":memory:":
+           return None
+       try:
+           stat = os.stat(self.db_path)
+       except OSError:
+           return None
+       return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+   def _bump_version(self, change: str) -> str:
+       version = hashlib.sha256(f"{self._read_version()}:{change}".encode("utf-8")).hexdigest()
+       self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (version,))
+       return version
@@ -0,0 +1,201 @@
+# --- result_cache.py ---
+# A content-addressed cache for verification results.
+# Scam posts are reposted verbatim across platforms, so the same text (or the same
+# media file) reaches /verify many times. Results are cached by a hash of the
+# normalized content and reused until they expire or the reference data changes.
+
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class VerificationResultCache:
+   """
+   Two-tier result cache: a bounded in-memory LRU with TTL, plus an optional SQLite
+   tier that survives restarts.
+
+
+   Every entry belongs to a "reference version" (a fingerprint of the lexicon and the
+   official records used to compute it). When the version changes, both tiers are
+   cleared so no stale verdict is ever served.
+   """
+
+   def __init__(self, max_entries: int, ttl_seconds: float, db_path: Optional[str] = None,
+                prune_interval: float = 60.0):
+       self.max_entries = max_entries
+       self.ttl_seconds = ttl_seconds
+       self.db_path = db_path or None
+       self.prune_interval = prune_interval
+       self._pruned_at = 0.0
+       self._entries = OrderedDict()  # key -> (stored_at, result)
+       self._lock = threading.Lock()
+       self._version = None
+       self._db = None
+
+       self.hits = 0
+       self.disk_hits = 0
+       self.misses = 0
+       self.invalidations = 0
+
+       if self.db_path:
+           self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+           self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, stored_at REAL, result TEXT)")
+           self._db.execute("CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at)")
+           self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+           self._db.commit()
+           row = self._db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+           self._version = row[0] if row else None
+
+
+   @staticmethod
+   def make_key(text: Optional[str] = None, file_hash: Optional[str] = None) -> str:
+       """
+       Builds the cache key for a request from its normalized text and/or the SHA-256
+       of the uploaded file bytes. Unicode form and whitespace differences are ignored.
+       """
+       normalized = " ".join(unicodedata.normalize("NFC", text).split()) if text else ""
+       digest = hashlib.sha256()
+       digest.update(b"text:" + normalized.encode("utf-8"))
+       digest.update(b"\x00file:" + (file_hash or "").encode("ascii"))
+       return digest.hexdigest()
+
+
+   def ensure_version(self, version: str):
+       """
+       Clears the cache if the reference data it was built from has changed.
+       """
+       if version == self._version:
+           return
+       with self._lock:
+           if version == self._version:
+               return
+           if self._version is not None:
+               logger.info("Reference data changed. Invalidating cached verification results.")
+               self.invalidations += 1
+           self._entries.clear()
+           if self._db:
+               self._db.execute("DELETE FROM results")
+               self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (version,))
+               self._db.commit()
+           self._version = version
+
+
+   def get(self, key: str) -> Optional[dict]:
+       """
+       Returns the cached result for the key, or None on a miss or an expired entry.
+       A hit in the SQLite tier is promoted to memory.
+       """
+       now = time.time()
+       with self._lock:
+           entry = self._entries.get(key)
+           if entry and now - entry[0] < self.ttl_seconds:
+               self._entries.move_to_end(key)
+               self.hits += 1
+               return entry[1]
+           if entry:
+               del self._entries[key]
+
+           if self._db:
+               row = self._db.execute("SELECT stored_at, result FROM results WHERE key = ?", (key,)).fetchone()
+               if row and now - row[0] < self.ttl_seconds:
+                   result = json.loads(row[1])
+                   self._remember(key, row[0], result)
+                   self.disk_hits += 1
+                   return result
+
+           self.misses += 1
+           return None
+
+
+   def put(self, key: str, result: dict):
+       now = time.time()
+       with self._lock:
+           self._remember(key, now, result)
+           if self._db:
+               self._db.execute(
+                   "INSERT OR REPLACE INTO results (key, stored_at, result) VALUES (?, ?, ?)",
+                   (key, now, json.dumps(result))
+               )
+               self._prune_expired(now)
+               self._db.commit()
+
+
+   def put_many(self, results: dict):
+       """
+       Stores several results (key -> result) in one transaction.
+       """
+       now = time.time()
+       with self._lock:
+           for key, result in results.items():
+               self._remember(key, now, result)
+           if self._db:
+               self._db.executemany(
+                   "INSERT OR REPLACE INTO results (key, stored_at, result) VALUES (?, ?, ?)",
+                   [(key, now, json.dumps(result)) for key, result in results.items()]
+               )
+               self._prune_expired(now)
+               self._db.commit()
+
+
+   def invalidate(self):
+       """
+       Drops every cached result from both tiers.
+       """
+       with self._lock:
+           self._entries.clear()
+           if self._db:
+               self._db.execute("DELETE FROM results")
+               self._db.commit()
+           self.invalidations += 1
+
+
+   def stats(self) -> dict:
+       lookups = self.hits + self.disk_hits + self.misses
+       return {
+           "entries": len(self._entries),
+           "max_entries": self.max_entries,
+           "ttl_seconds": self.ttl_seconds,
+           "disk_tier": self.db_path is not None,
+           "hits": self.hits,
+           "disk_hits": self.disk_hits,
+           "misses": self.misses,
+           "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+           "invalidations": self.invalidations
+       }
+
+
+   def _prune_expired(self, now: float):
+       # Expired rows are never served (get() checks the age), so they only need to be
+       # swept out occasionally to bound the file size, not on every write.
+       if now - self._pruned_at < self.prune_interval:
+           return
+       self._db.execute("DELETE FROM results WHERE stored_at < ?", (now - self.ttl_seconds,))
+       self._pruned_at = now
+
+
+   def _remember(self, key: str, stored_at: float, result: dict):
+       self._entries[key] = (stored_at, result)
+       self._entries.move_to_end(key)
+       while len(self._entries) > self.max_entries:
+           self._entries.popitem(last=False)
+
+
+# Create a single instance of the cache
+result_cache = VerificationResultCache(
+   max_entries=settings.RESULT_CACHE_SIZE,
+   ttl_seconds=settings.RESULT_CACHE_TTL,
+   db_path=settings.RESULT_CACHE_DB_PATH
+)
@@ -0,0 +1,231 @@
+# --- speech_pipeline.py ---
+# This module implements chunked speech-to-text for long media: the audio track is
+# decoded and resampled as a stream, cut into overlapping windows, stripped of silence
+# by a cheap energy-based voice-activity detector, and transcribed window by window on
+# a pool of workers. Transcript segments come out in order as soon as each window is
+# done, so an hour-long earnings call is never held in memory as a whole and its first
+# minutes can be analyzed while the rest is still being transcribed.
+# Everything runs on CPU.
+
+
+import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# PyAV decodes and resamples the audio; NumPy holds the samples. Both are required.
+try:
+   import av
+   import numpy as np
+except ImportError:
+   av = None
+   np = None
+
+
+# Speech models expect 16 kHz mono audio.
+SAMPLE_RATE = 16000
+# The voice-activity detector looks at the energy of 30 ms frames.
+VAD_FRAME_SECONDS = 0.03
+
+
+def pipeline_available() -> bool:
+   return av is not None and np is not None
+
+
+class NoAudioStreamError(ValueError):
+   """
+   Raised when the media file has no audio track.
+   """
+
+
+class SpeechConfig:
+   """
+   Settings for one pipeline.
+
+
+   Args:
+       chunk_seconds (float): Length of each window handed to the model.
+       overlap_seconds (float): Audio shared by consecutive windows, so words cut at a window
+                                boundary are heard whole in one of them.
+       workers (int): Windows transcribed at the same time.
+       vad_threshold_db (float): Frames louder than this (dBFS) count as speech.
+       min_speech_ratio (float): Windows with a smaller share of speech frames are skipped.
+       vad_padding_seconds (float): Audio kept around the speech when silence is trimmed
+                                    from the start and end of a window.
+       max_pending (int): Windows decoded ahead of the oldest one still being transcribed;
+                          bounds memory use to about max_pending windows.
+   """
+
+   def __init__(self, chunk_seconds: float = 30.0, overlap_seconds: float = 2.0, workers: int = 2,
+                vad_threshold_db: float = -40.0, min_speech_ratio: float = 0.05, vad_padding_seconds: float = 0.2,
+                max_pending: int = None):
+       if overlap_seconds * 2 >= chunk_seconds:
+           raise ValueError("overlap_seconds must be less than half of chunk_seconds.")
+       self.chunk_seconds = chunk_seconds
+       self.overlap_seconds = overlap_seconds
+       self.workers = max(1, workers)
+       self.vad_threshold_db = vad_threshold_db
+       self.min_speech_ratio = min_speech_ratio
+       self.vad_padding_seconds = vad_padding_seconds
+       self.max_pending = max_pending or self.workers * 2
+
+
+def read_audio_windows(file_path: str, chunk_seconds: float, overlap_seconds: float):
+   """
+   Decodes the first audio track as 16 kHz mono float32 and yields (start_seconds, samples, is_last)
+   windows of `chunk_seconds`, each starting `overlap_seconds` before the previous one ends.
+   Only the current window is buffered.
+
+
+   Raises:
+       NoAudioStreamError: If the file has no audio track.
+   """
+   chunk = int(chunk_seconds * SAMPLE_RATE)
+   step = chunk - int(overlap_seconds * SAMPLE_RATE)
+   resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+   parts, buffered, start = [], 0, 0
+   held = None
+
+   with av.open(file_path) as container:
+       if not container.streams.audio:
+           raise NoAudioStreamError(f"{file_path} has no audio track.")
+       stream = container.streams.audio[0]
+       # Each decoded frame is resampled on its own; a None frame flushes the resampler at the end.
+       frames = (frame for packet in container.demux(stream) for frame in packet.decode())
+       for frame in _with_flush(frames):
+           for resampled in resampler.resample(frame):
+               samples = resampled.to_ndarray().reshape(-1)
+               parts.append(samples)
+               buffered += len(samples)
+           while buffered >= chunk:
+               window = np.concatenate(parts)
+               if held is not None:
+                   yield held + (False,)
+               held = (start / SAMPLE_RATE, window[:chunk])
+               parts, buffered, start = [window[step:]], len(window) - step, start + step
+
+   # What is left is new audio only if it goes past the overlap with the last window.
+   if buffered > (chunk - step if held is not None else 0):
+       if held is not None:
+           yield held + (False,)
+       held = (start / SAMPLE_RATE, np.concatenate(parts))
+   if held is not None:
+       yield held + (True,)
+
+
+def _with_flush(frames):
+   yield from frames
+   yield None
+
+
+def speech_span(samples, config: SpeechConfig) -> tuple:
+   """
+   Runs the voice-activity detector on a window: frames are speech if their RMS level is
+   above the threshold.
+
+
+   Returns:
+       tuple: (offset_seconds, samples) of the window trimmed to its first and last speech frame
+              (plus padding), or None if it has too little speech to be worth transcribing.
+   """
+   frame = int(SAMPLE_RATE * VAD_FRAME_SECONDS)
+   count = len(samples) // frame
+   if count == 0:
+       return None
+   frames = samples[:count * frame].reshape(count, frame)
+   rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+   voiced = np.flatnonzero(rms > 10 ** (config.vad_threshold_db / 20))
+   if len(voiced) < max(1, config.min_speech_ratio * count):
+       return None
+   padding = int(config.vad_padding_seconds * SAMPLE_RATE)
+   first = max(0, voiced[0] * frame - padding)
+   last = min(len(samples), (voiced[-1] + 1) * frame + padding)
+   return float(first) / SAMPLE_RATE, samples[first:last]
+
+
+class SpeechPipeline:
+   """
+   Transcribes one file at a time per caller; any number of callers can share it, and
+   their windows share its pool of `config.workers` threads.
+
+
+   The model is any callable that takes float32 16 kHz mono samples and returns a list of
+   (start_seconds, end_seconds, text) segments relative to the start of the samples. It is
+   called from several threads at once, so it should release the GIL while it computes
+   (as native inference runtimes do) for the workers to run in parallel.
+   """
+
+   def __init__(self, config: SpeechConfig):
+       self.config = config
+       self._executor = None
+       self._executor_lock = threading.Lock()
+
+
+   def segments(self, file_path: str, model, stats: dict = None):
+       """
+       Yields the transcript of a file as {"start", "end", "text"} segments, in order and as
+       soon as each window has been transcribed. Times are in seconds from the start of the file.
+
+
+       Consecutive windows overlap; each keeps the segments whose midpoint lies in its own half
+       of the overlaps, so words in an overlap are transcribed twice but reported once.
+
+
+       Args:
+           stats (dict, optional): Filled in with audio_seconds, speech_seconds, windows and
+                                   windows_skipped as the file is processed.
+
+
+       Raises:
+           NoAudioStreamError: If the file has no audio track.
+       """
+       config = self.config
+       stats = stats if stats is not None else {}
+       stats.update(audio_seconds=0.0, speech_seconds=0.0, windows=0, windows_skipped=0)
+       executor = self._get_executor()
+       half_overlap = config.overlap_seconds / 2
+       pending = deque()
+       try:
+           for index, (start, samples, is_last) in enumerate(read_audio_windows(file_path, config.chunk_seconds, config.overlap_seconds)):
+               end = start + len(samples) / SAMPLE_RATE
+               stats["audio_seconds"] = end
+               stats["windows"] += 1
+               owned = (start + half_overlap if index else -math.inf, end - half_overlap if not is_last else math.inf)
+               span = speech_span(samples, config)
+               if span is None:
+                   stats["windows_skipped"] += 1
+                   continue
+               offset, speech = span
+               stats["speech_seconds"] += len(speech) / SAMPLE_RATE
+               pending.append((start + offset, owned, executor.submit(model, speech)))
+               # Hand over finished windows in order; wait for the oldest once enough are queued.
+               while pending and (pending[0][2].done() or len(pending) >= config.max_pending):
+                   yield from self._collect(*pending.popleft())
+           while pending:
+               yield from self._collect(*pending.popleft())
+       finally:
+           # The caller stopped early (or decoding failed): don't transcribe the rest.
+           for _, _, future in pending:
+               future.cancel()
+
+
+   def close(self):
+       if self._executor is not None:
+           self._executor.shutdown(wait=False, cancel_futures=True)
+           self._executor = None
+
+
+   def _collect(self, offset: float, owned: tuple, future):
+       for start, end, text in future.result():
+           text = text.strip()
+           midpoint = offset + (start + end) / 2
+           if text and owned[0] <= midpoint < owned[1]:
+               yield {"start": round(float(offset + start), 2), "end": round(float(offset + end), 2), "text": text}
+
+
+   def _get_executor(self) -> ThreadPoolExecutor:
+       with self._executor_lock:
+           if self._executor is None:
+               self._executor = ThreadPoolExecutor(max_workers=self.config.workers, thread_name_prefix="stt")
+           return self._executor
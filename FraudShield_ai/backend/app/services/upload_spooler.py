@@ -0,0 +1,265 @@
+# --- upload_spooler.py ---
+# This module streams multipart uploads for /verify straight to disk.
+# The request body is parsed as it arrives: file data is written to a temporary file
+# in fixed-size chunks and hashed on the way, so memory use stays flat no matter how
+# large the upload is, and oversized uploads are rejected as soon as they cross the limit.
+
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+
+from fastapi import Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+
+from app.core.config import settings
+
+
+class UploadTooLargeError(Exception):
+   pass
+
+
+class InvalidUploadError(Exception):
+   pass
+
+
+class SpooledUpload:
+   """
+   An uploaded file that has been written to a temporary file on disk.
+   The path can be handed to the media services as-is; nothing is copied again.
+   """
+
+   def __init__(self, filename: str, content_type: str, path: str, size: int, sha256: str):
+       self.filename = filename
+       self.content_type = content_type
+       self.path = path
+       self.size = size
+       self.sha256 = sha256
+
+
+   def cleanup(self):
+       try:
+           os.unlink(self.path)
+       except FileNotFoundError:
+           pass
+
+
+class _SpoolTarget:
+   """
+   Receives the bytes of the file part being streamed. Data is buffered up to one chunk
+   and then hashed and written in a worker thread, so the event loop never blocks on disk.
+   """
+
+   def __init__(self, filename: str, content_type: str, spool_dir: Optional[str]):
+       self.filename = filename
+       self.content_type = content_type
+       fd, self.path = tempfile.mkstemp(prefix="upload-", suffix=os.path.splitext(filename)[1], dir=spool_dir)
+       self.file = os.fdopen(fd, "wb")
+       self.digest = hashlib.sha256()
+       self.size = 0
+       self.pending = []
+       self.pending_bytes = 0
+
+
+   def _write(self, data: bytes):
+       self.digest.update(data)
+       self.file.write(data)
+
+
+   async def flush(self):
+       if self.pending:
+           data = b"".join(self.pending)
+           self.pending = []
+           self.pending_bytes = 0
+           await asyncio.to_thread(self._write, data)
+
+
+   def close(self) -> SpooledUpload:
+       self.file.close()
+       return SpooledUpload(self.filename, self.content_type, self.path, self.size, self.digest.hexdigest())
+
+
+   def discard(self):
+       self.file.close()
+       try:
+           os.unlink(self.path)
+       except FileNotFoundError:
+           pass
+
+
+class UploadSpooler:
+   """
+   Parses a /verify request body without buffering the upload in memory.
+
+
+   Returns the plain form fields and, if one was sent, the spooled file. Supports
+   multipart/form-data (fields and at most one file) and url-encoded forms (fields only).
+
+
+   Limits hold while the body streams in, so they also apply to chunked bodies that have
+   no Content-Length: the file may not exceed `max_file_bytes`, and there may be at most
+   `max_fields` text fields, whose data and part headers add up to at most `max_field_bytes`.
+   """
+
+   def __init__(self, max_file_bytes: int, max_field_bytes: int, chunk_size: int, spool_dir: Optional[str] = None,
+                max_fields: int = 20):
+       self.max_file_bytes = max_file_bytes
+       self.max_field_bytes = max_field_bytes
+       self.max_fields = max_fields
+       self.chunk_size = chunk_size
+       self.spool_dir = spool_dir or None
+
+
+   async def spool(self, request: Request) -> tuple[dict, Optional[SpooledUpload]]:
+       # Reject obviously oversized bodies before reading a single byte.
+       content_length = request.headers.get("content-length")
+       if content_length and content_length.isdigit() and int(content_length) > self.max_file_bytes + self.max_field_bytes:
+           raise UploadTooLargeError(f"Request body exceeds the {self.max_file_bytes} byte upload limit.")
+
+       content_type, params = parse_options_header(request.headers.get("content-type", ""))
+       if content_type == b"multipart/form-data":
+           boundary = params.get(b"boundary")
+           if not boundary:
+               raise InvalidUploadError("Missing boundary in multipart body.")
+           return await self._spool_multipart(request, boundary)
+
+       if content_type == b"application/x-www-form-urlencoded":
+           if content_length and content_length.isdigit() and int(content_length) > self.max_field_bytes:
+               raise UploadTooLargeError(f"Form fields exceed the {self.max_field_bytes} byte limit.")
+           form = await request.form(max_fields=self.max_fields, max_part_size=self.max_field_bytes)
+           return {key: value for key, value in form.items() if isinstance(value, str)}, None
+
+       raise InvalidUploadError("Expected a multipart/form-data or url-encoded form body.")
+
+
+   async def _spool_multipart(self, request: Request, boundary: bytes) -> tuple[dict, Optional[SpooledUpload]]:
+       fields = {}
+       state = {"header_field": b"", "header_value": b"", "disposition": b"", "content_type": b""}
+       part = {"name": None, "data": None, "target": None}
+       targets = []
+       errors = []
+       # Text fields, and bytes of text fields and part headers, so far.
+       counts = {"fields": 0, "bytes": 0}
+
+       def count_field_bytes(size: int) -> bool:
+           counts["bytes"] += size
+           if counts["bytes"] > self.max_field_bytes:
+               if not errors:
+                   errors.append(UploadTooLargeError(f"Form fields exceed the {self.max_field_bytes} byte limit."))
+               return False
+           return True
+
+       def on_part_begin():
+           state["disposition"] = b""
+           state["content_type"] = b""
+           part.update(name=None, data=bytearray(), target=None)
+
+       def on_header_field(data, start, end):
+           if count_field_bytes(end - start):
+               state["header_field"] += data[start:end]
+
+       def on_header_value(data, start, end):
+           if count_field_bytes(end - start):
+               state["header_value"] += data[start:end]
+
+       def on_header_end():
+           field = state["header_field"].lower()
+           if field == b"content-disposition":
+               state["disposition"] = state["header_value"]
+           elif field == b"content-type":
+               state["content_type"] = state["header_value"]
+           state["header_field"] = b""
+           state["header_value"] = b""
+
+       def on_headers_finished():
+           _, options = parse_options_header(state["disposition"])
+           part["name"] = options.get(b"name", b"").decode("utf-8", "replace")
+           if b"filename" in options:
+               if targets:
+                   errors.append(InvalidUploadError("Only one file may be uploaded per request."))
+                   return
+               target = _SpoolTarget(
+                   options[b"filename"].decode("utf-8", "replace"),
+                   state["content_type"].decode("latin-1"),
+                   self.spool_dir
+               )
+               targets.append(target)
+               part["target"] = target
+           else:
+               counts["fields"] += 1
+               if counts["fields"] > self.max_fields:
+                   errors.append(InvalidUploadError(f"Too many form fields (at most {self.max_fields})."))
+
+       def on_part_data(data, start, end):
+           target = part["target"]
+           if target is None:
+               if count_field_bytes(end - start):
+                   part["data"] += data[start:end]
+               return
+           target.size += end - start
+           if target.size > self.max_file_bytes:
+               errors.append(UploadTooLargeError(f"Uploaded file exceeds the {self.max_file_bytes} byte limit."))
+               return
+           target.pending.append(data[start:end])
+           target.pending_bytes += end - start
+
+       def on_part_end():
+           if part["target"] is None and part["name"]:
+               fields[part["name"]] = part["data"].decode("utf-8", "replace")
+
+       parser = MultipartParser(boundary, {
+           "on_part_begin": on_part_begin,
+           "on_part_data": on_part_data,
+           "on_part_end": on_part_end,
+           "on_header_field": on_header_field,
+           "on_header_value": on_header_value,
+           "on_header_end": on_header_end,
+           "on_headers_finished": on_headers_finished,
+       })
+
+       # The spooled file is deleted unless the whole body was read, including when the
+       # request is cancelled (a client disconnect or server shutdown) mid-upload.
+       complete = False
+       try:
+           async for chunk in request.stream():
+               parser.write(chunk)
+               if errors:
+                   raise errors[0]
+               for target in targets:
+                   if target.pending_bytes >= self.chunk_size:
+                       await target.flush()
+           parser.finalize()
+           if errors:
+               raise errors[0]
+           for target in targets:
+               await target.flush()
+           upload = targets[0].close() if targets else None
+           complete = True
+       except (UploadTooLargeError, InvalidUploadError):
+           raise
+       except Exception as e:
+           raise InvalidUploadError(f"Invalid multipart body: {e}") from e
+       finally:
+           if not complete:
+               for target in targets:
+                   target.discard()
+
+       # Browsers send an empty, unnamed file part when no file was chosen.
+       if upload and upload.size == 0 and not upload.filename:
+           upload.cleanup()
+           upload = None
+       return fields, upload
+
+
+# Create a single instance of the spooler
+upload_spooler = UploadSpooler(
+   max_file_bytes=settings.MAX_UPLOAD_BYTES,
+   max_field_bytes=settings.MAX_FORM_FIELD_BYTES,
+   chunk_size=settings.UPLOAD_CHUNK_SIZE,
+   spool_dir=settings.UPLOAD_SPOOL_DIR,
+   max_fields=settings.MAX_FORM_FIELDS
+)
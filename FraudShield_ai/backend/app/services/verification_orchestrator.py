@@ -3,13 +3,60 @@
 # It uses the other services (deepfake, nlp, cross_verifier) to perform a comprehensive analysis.
 
 
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
 from fastapi import UploadFile
+from app.core.config import settings
+from app.core.metrics import metrics, stage_timer
 from app.services.deepfake_service import deepfake_service
 from app.services.nlp_service import nlp_service
 from app.services.cross_verifier import cross_verifier
+from app.services.result_cache import result_cache, VerificationResultCache
+from app.services.micro_batcher import MicroBatcher
+
+
+VERIFICATIONS = metrics.counter(
+   "marketguard_verifications",
+   "Verifications run through the async pipeline, by input and whether the result cache answered.",
+   ("input", "cache")
+)
 
 
 class VerificationOrchestrator:
+   def __init__(self, max_workers: int = None, media_max_workers: int = None, cache: VerificationResultCache = result_cache):
+       # The model-bound stages are synchronous (and deepfake inference blocks for seconds),
+       # so the async API runs them in bounded pools instead of on the event loop.
+       # Media inference has its own pool so text-only requests never wait behind it.
+       self.executor = ThreadPoolExecutor(
+           max_workers=max_workers or settings.VERIFICATION_MAX_WORKERS,
+           thread_name_prefix="verification"
+       )
+       self.media_executor = ThreadPoolExecutor(
+           max_workers=media_max_workers or settings.MEDIA_MAX_WORKERS,
+           thread_name_prefix="verification-media"
+       )
+       # Speech-to-text reads and screens the audio while the media pool runs deepfake detection.
+       # Its threads mostly wait on the speech pipeline's own workers.
+       self.stt_executor = ThreadPoolExecutor(
+           max_workers=media_max_workers or settings.MEDIA_MAX_WORKERS,
+           thread_name_prefix="verification-stt"
+       )
+       self.result_cache = cache
+       # Concurrent /verify requests share NLP model calls: their texts are grouped into one
+       # batch (see NLPService.analyze_batch), flushed when full or after a short deadline.
+       self.nlp_batcher = MicroBatcher(
+           nlp_service.analyze_batch,
+           max_batch_size=settings.NLP_BATCH_MAX_SIZE,
+           max_delay=settings.NLP_BATCH_MAX_DELAY_MS / 1000,
+           max_in_flight=settings.NLP_BATCH_MAX_IN_FLIGHT,
+           executor=self.executor
+       )
+
+
    def process_verification_request(self, text: str = None, file: UploadFile = None) -> dict:
        """
        Orchestrates the entire verification process.
@@ -21,6 +68,10 @@ class VerificationOrchestrator:
        4. It calculates a final, consolidated risk score.
 
 
+       This is the blocking version of the pipeline. Request handlers should use
+       `run_full_verification` instead so the event loop is never stalled.
+
+
        Args:
            text (str, optional): Text input from the user.
            file (UploadFile, optional): File upload from the user.
@@ -29,15 +80,8 @@ class VerificationOrchestrator:
        Returns:
            dict: A consolidated analysis result.
        """
-       final_result = {
-           "risk_score": 0,
-           "risk_level": "Low",
-           "summary": "",
-           "deepfake_analysis": None,
-           "text_analysis": None,
-           "cross_verification": None
-       }
-      
+       final_result = self._new_result()
+
        analysis_text = text
 
 
@@ -48,29 +92,342 @@ class VerificationOrchestrator:
            file_path = file.filename
            media_analysis = deepfake_service.run_inference(file_path=file_path)
            final_result["deepfake_analysis"] = media_analysis
-          
+
            # Use the transcribed text for content analysis
            if media_analysis.get("transcribed_text"):
                analysis_text = media_analysis["transcribed_text"]
-      
-       # --- Step 2: Process Text (if available) ---
-       if analysis_text:
-           text_analysis_result = nlp_service.analyze_text_for_anomalies(analysis_text)
-           final_result["text_analysis"] = text_analysis_result
 
+       # --- Step 2 & 3: Process Text and Cross-Verify Claims (if available) ---
+       if analysis_text:
+           final_result["text_analysis"], final_result["cross_verification"] = self._analyze_text(analysis_text)
 
-           # --- Step 3: Cross-Verify Claims ---
-           if text_analysis_result.get("entities"):
-               cross_verification_result = cross_verifier.verify_claims(text_analysis_result["entities"])
-               final_result["cross_verification"] = cross_verification_result
-      
        # --- Step 4: Calculate Final Risk Score ---
-       self._calculate_final_risk(final_result)
+       with stage_timer("risk_scoring"):
+           self._calculate_final_risk(final_result)
 
 
        return final_result
 
 
+   async def run_full_verification(self, text_content: str = None, file_path: str = None, file_hash: str = None) -> dict:
+       """
+       Non-blocking version of the verification pipeline used by the API.
+       Runs `stream_full_verification` to the end and returns its final result.
+
+
+       Args:
+           text_content (str, optional): Text input from the user.
+           file_path (str, optional): Path (or name) of the uploaded media file.
+           file_hash (str, optional): SHA-256 hex digest of the uploaded file bytes.
+
+
+       Returns:
+           dict: A consolidated analysis result, in the same shape as `process_verification_request`.
+       """
+       async for event, data in self.stream_full_verification(text_content, file_path, file_hash):
+           pass
+       return data
+
+
+   async def stream_full_verification(self, text_content: str = None, file_path: str = None, file_hash: str = None):
+       """
+       Runs the verification pipeline and yields (event, data) pairs as each stage finishes,
+       so callers can act on the cheap signals without waiting for media inference.
+
+
+       Every stage runs in one of the orchestrator's thread pools. Stages that do not depend on
+       each other run concurrently:
+       - Deepfake detection on the file.
+       - Speech-to-text on the file, with each transcript segment screened by NLP as soon as it
+         is transcribed (see `_transcribe_and_flag`).
+       - NLP analysis followed by cross-verification on the caller-supplied text. NLP analysis
+         is micro-batched with other in-flight requests.
+       If only a file is given, the whole transcript is analyzed once transcription finishes.
+
+
+       Events, in the order they become available:
+       - "text_analysis": NLP flags, sentiment and entities of the text (or of the transcript).
+       - "cross_verification": Claims checked against the official records, if any were found.
+       - "flagged_segment": A transcript segment NLP raised flags on, with its timestamps.
+       - "transcript": The full transcript, its flagged segments and the speech statistics.
+       - "deepfake_analysis": The deepfake verdict.
+       - "result": The consolidated result with the final risk score, always last.
+
+
+       Results are cached by content: a repeat of the same normalized text and/or the
+       same file bytes (identified by `file_hash`) skips the pipeline entirely and yields
+       only the "result" event. Requests with a file but no `file_hash` are never cached.
+
+
+       Args:
+           text_content (str, optional): Text input from the user.
+           file_path (str, optional): Path (or name) of the uploaded media file.
+           file_hash (str, optional): SHA-256 hex digest of the uploaded file bytes.
+
+
+       Yields:
+           tuple: (event, data), where data is a dict.
+       """
+       kind = "+".join(name for name, given in (("text", text_content), ("media", file_path)) if given) or "empty"
+       cache_key = None
+       if self.result_cache and (file_hash or not file_path):
+           cache_key = self.result_cache.make_key(text_content, file_hash)
+           cached = await self._cache_get(cache_key)
+           if cached is not None:
+               VERIFICATIONS.inc(kind, "hit")
+               yield "result", cached
+               return
+       VERIFICATIONS.inc(kind, "miss")
+
+       final_result = self._new_result()
+       # Stages report their events here; a finished stage reports itself as (None, task).
+       events = asyncio.Queue()
+
+       def emit(event: str, data: dict):
+           events.put_nowait((event, data))
+
+       async def analyze_text(text: str):
+           # Includes the time spent waiting for the batch to fill.
+           with stage_timer("nlp"):
+               final_result["text_analysis"] = await self.nlp_batcher.submit(text)
+           emit("text_analysis", final_result["text_analysis"])
+           if final_result["text_analysis"].get("entities"):
+               with stage_timer("cross_verification"):
+                   final_result["cross_verification"] = await self._run_stage(
+                       self.executor, cross_verifier.verify_claims, final_result["text_analysis"]["entities"]
+                   )
+               emit("cross_verification", final_result["cross_verification"])
+
+       async def detect_deepfake() -> dict:
+           media_analysis = await self._run_stage(
+               self.media_executor, deepfake_service.run_inference, file_path=file_path, transcribe=False
+           )
+           emit("deepfake_analysis", media_analysis)
+           return media_analysis
+
+       async def transcribe() -> dict:
+           speech_analysis = await self._transcribe_and_flag(file_path, emit)
+           emit("transcript", speech_analysis)
+           # Without caller text, the transcript is what gets analyzed.
+           if not text_content and speech_analysis["transcribed_text"]:
+               await analyze_text(speech_analysis["transcribed_text"])
+           return speech_analysis
+
+       stages = []
+       if file_path:
+           stages += [detect_deepfake(), transcribe()]
+       if text_content:
+           stages.append(analyze_text(text_content))
+       tasks = [asyncio.create_task(stage) for stage in stages]
+       for task in tasks:
+           task.add_done_callback(lambda task: events.put_nowait((None, task)))
+
+
+       try:
+           remaining = len(tasks)
+           while remaining:
+               event, data = await events.get()
+               if event is None:
+                   # Re-raises the stage's exception, if it failed.
+                   data.result()
+                   remaining -= 1
+               else:
+                   yield event, data
+       finally:
+           # Don't leave a sibling stage running if another one failed, or the caller went away.
+           for task in tasks:
+               if not task.done():
+                   task.cancel()
+
+       if file_path:
+           final_result["deepfake_analysis"] = {**tasks[0].result(), **tasks[1].result()}
+
+
+       with stage_timer("risk_scoring"):
+           self._calculate_final_risk(final_result)
+
+       # A file that could not be analyzed is not cached, so uploading it again retries it.
+       frame_analysis = (final_result.get("deepfake_analysis") or {}).get("frame_analysis") or {}
+       if cache_key and "error" not in frame_analysis:
+           await self._cache_put(cache_key, final_result)
+
+
+       yield "result", final_result
+
+
+   async def run_batch_verification(self, texts: list[str]) -> list[dict]:
+       """
+       Verifies a batch of texts and returns one consolidated result per text, in order.
+
+
+       NLP analysis runs once over the whole batch (see `NLPService.analyze_batch`), which
+       amortizes the per-call overhead that N separate /verify requests would pay.
+       The whole batch is processed in the text thread pool.
+       """
+       return await self._run_stage(self.executor, self.process_batch, texts)
+
+
+   def process_batch(self, texts: list[str]) -> list[dict]:
+       """
+       Blocking implementation behind `run_batch_verification`.
+       Cached texts are answered from the result cache; only the rest are analyzed.
+       """
+       results = [None] * len(texts)
+       keys = [None] * len(texts)
+       if self.result_cache:
+           self.result_cache.ensure_version(self.reference_version())
+           for i, text in enumerate(texts):
+               keys[i] = self.result_cache.make_key(text)
+               results[i] = self.result_cache.get(keys[i])
+
+       pending = [i for i, result in enumerate(results) if result is None]
+       fresh = {}
+       # One observation for the whole batch; per-text NLP time is this over the batch size.
+       with stage_timer("nlp_batch"):
+           analyses = nlp_service.analyze_batch([texts[i] for i in pending])
+       for i, text_analysis_result in zip(pending, analyses):
+           final_result = self._new_result()
+           final_result["text_analysis"] = text_analysis_result
+           if text_analysis_result.get("entities"):
+               with stage_timer("cross_verification"):
+                   final_result["cross_verification"] = cross_verifier.verify_claims(text_analysis_result["entities"])
+           self._calculate_final_risk(final_result)
+           results[i] = final_result
+           if keys[i]:
+               fresh[keys[i]] = final_result
+       if fresh:
+           self.result_cache.put_many(fresh)
+       return results
+
+
+   async def _transcribe_and_flag(self, file_path: str, emit=None) -> dict:
+       """
+       Transcribes the file in the STT pool and sends every transcript segment to the NLP
+       micro-batcher as soon as it comes out of the speech pipeline, so flagging a long
+       recording overlaps with transcribing it.
+
+
+       Args:
+           emit (callable, optional): Called with ("flagged_segment", segment) for each segment
+                                      NLP raises flags on, as soon as it has been screened.
+
+
+       Returns:
+           dict: {"transcribed_text", "flagged_segments"}, where flagged_segments lists the
+                 segments ({"start", "end", "text", "flags"}) NLP raised flags on, plus
+                 "speech_analysis" with the pipeline's statistics when a model transcribed the file.
+       """
+       loop = asyncio.get_running_loop()
+       queue = asyncio.Queue()
+       stop = threading.Event()
+       stats = {}
+
+       def produce():
+           try:
+               with stage_timer("stt"):
+                   for segment in deepfake_service.transcribe_segments(file_path, stats):
+                       if stop.is_set():
+                           break
+                       loop.call_soon_threadsafe(queue.put_nowait, segment)
+           finally:
+               loop.call_soon_threadsafe(queue.put_nowait, None)
+
+       async def screen(segment: dict) -> dict:
+           analysis = await self.nlp_batcher.submit(segment["text"])
+           if emit and analysis.get("flags"):
+               emit("flagged_segment", {**segment, "flags": analysis["flags"]})
+           return analysis
+
+       producer = loop.run_in_executor(self.stt_executor, produce)
+       segments = []
+       screening = []
+       try:
+           while (segment := await queue.get()) is not None:
+               segments.append(segment)
+               screening.append(asyncio.create_task(screen(segment)))
+           await producer
+           analyses = await asyncio.gather(*screening)
+       finally:
+           # Stops the producer early if this request was cancelled.
+           stop.set()
+           for task in screening:
+               task.cancel()
+
+       result = {
+           "transcribed_text": " ".join(segment["text"] for segment in segments),
+           "flagged_segments": [
+               {**segment, "flags": analysis["flags"]} for segment, analysis in zip(segments, analyses) if analysis.get("flags")
+           ]
+       }
+       if stats:
+           result["speech_analysis"] = stats
+       return result
+
+
+   async def _cache_get(self, key: str):
+       # The SQLite tier does disk I/O, so only the pure in-memory cache is consulted on the loop.
+       if self.result_cache.db_path:
+           return await self._run_stage(self.executor, self._cache_get_sync, key)
+       return self._cache_get_sync(key)
+
+
+   def _cache_get_sync(self, key: str):
+       self.result_cache.ensure_version(self.reference_version())
+       return self.result_cache.get(key)
+
+
+   async def _cache_put(self, key: str, result: dict):
+       if self.result_cache.db_path:
+           await self._run_stage(self.executor, self.result_cache.put, key, result)
+       else:
+           self.result_cache.put(key, result)
+
+
+   def reference_version(self) -> str:
+       """
+       Fingerprint of the reference data that results depend on: the scam lexicon and
+       the official records. A change to either invalidates the result cache.
+       """
+       return f"{nlp_service.lexicon_fingerprint}:{cross_verifier.data_version}"
+
+
+   async def _run_stage(self, executor: ThreadPoolExecutor, func, *args, **kwargs):
+       """
+       Runs a synchronous stage in the given bounded executor and awaits its result.
+       """
+       loop = asyncio.get_running_loop()
+       return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+   def _new_result(self) -> dict:
+       return {
+           "risk_score": 0,
+           "risk_level": "Low",
+           "summary": "",
+           "deepfake_analysis": None,
+           "text_analysis": None,
+           "cross_verification": None
+       }
+
+
+   def _analyze_text(self, text: str) -> tuple:
+       """
+       Runs NLP analysis on the text and cross-verifies any extracted entities.
+
+
+       Returns:
+           tuple: (text_analysis, cross_verification). cross_verification is None
+                  when no entities were extracted.
+       """
+       with stage_timer("nlp"):
+           text_analysis_result = nlp_service.analyze_text_for_anomalies(text)
+       cross_verification_result = None
+       if text_analysis_result.get("entities"):
+           with stage_timer("cross_verification"):
+               cross_verification_result = cross_verifier.verify_claims(text_analysis_result["entities"])
+       return text_analysis_result, cross_verification_result
+
+
    def _calculate_final_risk(self, result: dict):
        """
        Calculates a final risk score based on the consolidated results.
@@ -96,9 +453,9 @@ class VerificationOrchestrator:
        if result.get("cross_verification") and not result["cross_verification"]["is_verified"]:
            score += len(result["cross_verification"]["flags"]) * 25  # 25 points per failed check
            reasons.extend(result["cross_verification"]["flags"])
-      
+
        score = min(score, 100) # Cap score at 100
-      
+
        risk_level = "Low"
        if score > 75:
            risk_level = "Critical"
@@ -0,0 +1,295 @@
+# --- video_pipeline.py ---
+# This module implements the frame pipeline behind deepfake detection:
+# decode a sampled subset of video frames, detect and crop faces, and feed the crops
+# to the classifier in batches. Decoding runs in a prefetching thread so it overlaps
+# with inference, and analysis stops early once the verdict is confident enough.
+# Everything runs on CPU.
+
+
+import queue
+import threading
+import time
+
+
+# OpenCV (and NumPy, which it depends on) is required for the pipeline. PyAV is optional
+# and only used for keyframe-only decoding.
+try:
+   import cv2
+   import numpy as np
+except ImportError:
+   cv2 = None
+   np = None
+
+try:
+   import av
+except ImportError:
+   av = None
+
+
+SAMPLING_MODES = ("keyframe", "every_nth", "scene_change")
+
+# Marks the end of the decoded stream in the prefetch queue.
+_END_OF_STREAM = None
+
+
+def pipeline_available() -> bool:
+   return cv2 is not None
+
+
+class SamplingConfig:
+   """
+   Settings for one pipeline run.
+
+
+   Args:
+       mode (str): "keyframe" (only decode keyframes, needs PyAV), "every_nth" (decode
+                   every Nth frame) or "scene_change" (pick a frame whenever the scene changes,
+                   and at least every `max_gap` frames).
+       every_nth (int): Stride for "every_nth" mode.
+       scene_threshold (float): Mean absolute difference (0-255) between thumbnails that counts
+                                as a scene change.
+       max_frames (int): Upper bound on frames analyzed per file.
+       batch_size (int): Face crops per model call.
+       early_exit_confidence (float): Stop once the running mean fake probability is at least
+                                      this, or at most 1 minus this.
+       min_frames_for_exit (int): Crops that must be scored before early exit is considered.
+       detect_faces (bool): Crop detected faces. If False, or if this OpenCV build has no face
+                            detector, a centered square crop is used.
+       face_size (int): Side of the square crops fed to the model.
+       prefetch (int): Capacity of the decode-ahead queue, in frames.
+   """
+
+   def __init__(self, mode: str = "every_nth", every_nth: int = 15, scene_threshold: float = 30.0,
+                max_frames: int = 300, batch_size: int = 16, early_exit_confidence: float = 0.9,
+                min_frames_for_exit: int = 16, detect_faces: bool = True, face_size: int = 256,
+                prefetch: int = 64, max_gap: int = 150):
+       if mode not in SAMPLING_MODES:
+           raise ValueError(f"Unknown sampling mode '{mode}'. Expected one of {SAMPLING_MODES}.")
+       self.mode = mode
+       self.every_nth = max(1, every_nth)
+       self.scene_threshold = scene_threshold
+       self.max_frames = max_frames
+       self.batch_size = batch_size
+       self.early_exit_confidence = early_exit_confidence
+       self.min_frames_for_exit = min_frames_for_exit
+       self.detect_faces = detect_faces
+       self.face_size = face_size
+       self.prefetch = prefetch
+       self.max_gap = max_gap
+
+
+class FramePipeline:
+   """
+   Runs sampled decoding, face cropping and batched classification for one video at a time.
+
+
+   The model is any callable that takes a uint8 array of RGB crops shaped
+   (N, face_size, face_size, 3) and returns N fake probabilities in [0, 1].
+   """
+
+   def __init__(self, config: SamplingConfig):
+       self.config = config
+       # Face detectors loaded so far and not in use. Every analysis starts a new decoder
+       # thread, so detectors are lent out per analysis rather than kept per thread.
+       self._detectors = queue.SimpleQueue()
+
+
+   def analyze(self, file_path: str, model) -> dict:
+       """
+       Analyzes a video (or a still image) and returns the aggregated verdict with run statistics.
+       """
+       start = time.perf_counter()
+       stop = threading.Event()
+       frames = queue.Queue(maxsize=self.config.prefetch)
+       stats = {"frames_decoded": 0, "frames_sampled": 0, "faces": 0, "decode_error": None}
+
+       decoder = threading.Thread(
+           target=self._decode_worker, args=(file_path, frames, stop, stats), name="frame-decoder", daemon=True
+       )
+       decoder.start()
+
+       scores = []
+       batch = []
+       early_exit = False
+       try:
+           while True:
+               crops = frames.get()
+               if crops is _END_OF_STREAM:
+                   break
+               batch.extend(crops)
+               if len(batch) >= self.config.batch_size:
+                   scores.extend(self._predict(model, batch))
+                   batch = []
+                   if self._confident(scores):
+                       early_exit = True
+                       break
+           if batch and not early_exit:
+               scores.extend(self._predict(model, batch))
+       finally:
+           stop.set()
+           # Unblock the decoder if it is waiting on a full queue.
+           while decoder.is_alive():
+               try:
+                   frames.get_nowait()
+               except queue.Empty:
+                   decoder.join(timeout=0.01)
+
+       elapsed = time.perf_counter() - start
+       result = {
+           "frames_decoded": stats["frames_decoded"],
+           "frames_analyzed": stats["frames_sampled"],
+           "faces_scored": len(scores),
+           "early_exit": early_exit,
+           "sampling_mode": self.config.mode,
+           "seconds": round(elapsed, 3)
+       }
+       if stats["decode_error"]:
+           result["error"] = stats["decode_error"]
+       if not scores:
+           # Nothing was scored (unreadable file, or no faces): no verdict rather than a clean one.
+           result.update(is_deepfake=None, confidence=None)
+           return result
+
+       fake_probability = float(np.mean(scores))
+       result.update(is_deepfake=fake_probability >= 0.5, confidence=round(fake_probability, 2))
+       return result
+
+
+   def _confident(self, scores: list) -> bool:
+       if len(scores) < self.config.min_frames_for_exit:
+           return False
+       mean = float(np.mean(scores))
+       return mean >= self.config.early_exit_confidence or mean <= 1 - self.config.early_exit_confidence
+
+
+   def _predict(self, model, crops: list) -> list:
+       probabilities = model(np.stack(crops))
+       return [float(p) for p in np.asarray(probabilities).reshape(-1)]
+
+
+   # --- Decoding (runs in the prefetch thread) ---
+
+   def _decode_worker(self, file_path: str, frames: queue.Queue, stop: threading.Event, stats: dict):
+       detector = None
+       try:
+           detector = self._checkout_detector() if self.config.detect_faces else None
+           for frame in self._sampled_frames(file_path, stop, stats):
+               stats["frames_sampled"] += 1
+               crops = self._crop(frame, detector)
+               stats["faces"] += len(crops)
+               if crops:
+                   frames.put(crops)
+               if stop.is_set() or stats["frames_sampled"] >= self.config.max_frames:
+                   break
+       except Exception as e:
+           stats["decode_error"] = str(e)
+       finally:
+           if detector is not None:
+               self._detectors.put(detector)
+           frames.put(_END_OF_STREAM)
+
+
+   def _sampled_frames(self, file_path: str, stop: threading.Event, stats: dict):
+       if self.config.mode == "keyframe" and av is not None:
+           yield from self._keyframes(file_path, stop, stats)
+           return
+
+       capture = cv2.VideoCapture(file_path)
+       try:
+           if not capture.isOpened():
+               # Not a video OpenCV can open; try it as a still image.
+               image = cv2.imread(file_path)
+               if image is None:
+                   raise ValueError("Unsupported or unreadable media file.")
+               stats["frames_decoded"] += 1
+               yield image
+               return
+
+           if self.config.mode == "scene_change":
+               yield from self._scene_changes(capture, stop, stats)
+           else:
+               stride = self.config.every_nth
+               if self.config.mode == "keyframe":
+                   # Without PyAV, approximate keyframes with one frame per second.
+                   stride = max(1, round(capture.get(cv2.CAP_PROP_FPS) or 25))
+               yield from self._every_nth(capture, stride, stop, stats)
+       finally:
+           capture.release()
+
+
+   def _every_nth(self, capture, stride: int, stop: threading.Event, stats: dict):
+       index = 0
+       while not stop.is_set():
+           # grab() demuxes and decodes without the colour conversion; retrieve() only for kept frames.
+           if not capture.grab():
+               return
+           stats["frames_decoded"] += 1
+           if index % stride == 0:
+               ok, frame = capture.retrieve()
+               if ok:
+                   yield frame
+           index += 1
+
+
+   def _scene_changes(self, capture, stop: threading.Event, stats: dict):
+       previous = None
+       since_last = 0
+       while not stop.is_set():
+           ok, frame = capture.read()
+           if not ok:
+               return
+           stats["frames_decoded"] += 1
+           thumbnail = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (32, 18), interpolation=cv2.INTER_AREA)
+           changed = previous is None or float(cv2.absdiff(thumbnail, previous).mean()) >= self.config.scene_threshold
+           if changed or since_last >= self.config.max_gap:
+               previous = thumbnail
+               since_last = 0
+               yield frame
+           else:
+               since_last += 1
+
+
+   def _keyframes(self, file_path: str, stop: threading.Event, stats: dict):
+       with av.open(file_path) as container:
+           stream = container.streams.video[0]
+           # The decoder skips every non-key frame without decoding it.
+           stream.codec_context.skip_frame = "NONKEY"
+           for frame in container.decode(stream):
+               if stop.is_set():
+                   return
+               stats["frames_decoded"] += 1
+               yield frame.to_ndarray(format="bgr24")
+
+
+   def _crop(self, frame, detector=None) -> list:
+       size = self.config.face_size
+       if detector is None:
+           height, width = frame.shape[:2]
+           side = min(height, width)
+           top, left = (height - side) // 2, (width - side) // 2
+           crop = frame[top:top + side, left:left + side]
+           return [cv2.cvtColor(cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB)]
+
+       # Detect on a downscaled grayscale copy, then crop from the full-resolution frame.
+       scale = min(1.0, 320 / frame.shape[1])
+       gray = cv2.cvtColor(cv2.resize(frame, None, fx=scale, fy=scale), cv2.COLOR_BGR2GRAY)
+       faces = detector.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(24, 24))
+       crops = []
+       for x, y, w, h in faces:
+           x, y, w, h = (int(v / scale) for v in (x, y, w, h))
+           crop = frame[y:y + h, x:x + w]
+           crops.append(cv2.cvtColor(cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB))
+       return crops
+
+
+   def _checkout_detector(self):
+       # Cascade classifiers are not safe to share between threads, so each running analysis
+       # borrows its own; one is only loaded when all the loaded ones are in use, i.e. at most
+       # once per concurrent analysis over the pipeline's lifetime. The caller puts it back.
+       # OpenCV builds without the Haar cascades (e.g. 5.x) get None, and frames are center-cropped.
+       if not hasattr(cv2, "CascadeClassifier"):
+           return None
+       try:
+           return self._detectors.get_nowait()
+       except queue.Empty:
+           return cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
@@ -0,0 +1,80 @@
+# --- batch_throughput.py ---
+# Throughput benchmark comparing one-text-per-request /verify calls against
+# /verify/batch. Both run against a single uvicorn worker serving the app.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.batch_throughput --texts 2000 --batch-size 500
+
+
+import argparse
+import asyncio
+import random
+import time
+
+
+import httpx
+
+
+from app.main import app
+from app.services.result_cache import result_cache
+from benchmarks.common import start_server
+from benchmarks.verify_load import SAMPLE_TEXTS
+
+
+async def single_requests(client: httpx.AsyncClient, texts: list, concurrency: int) -> float:
+   semaphore = asyncio.Semaphore(concurrency)
+
+   async def one_request(text: str):
+       async with semaphore:
+           response = await client.post("/api/verification/verify", data={"text": text})
+           response.raise_for_status()
+
+   start = time.perf_counter()
+   await asyncio.gather(*(one_request(text) for text in texts))
+   return time.perf_counter() - start
+
+
+async def batch_requests(client: httpx.AsyncClient, texts: list, batch_size: int) -> float:
+   start = time.perf_counter()
+   for offset in range(0, len(texts), batch_size):
+       response = await client.post("/api/verification/verify/batch", json={"texts": texts[offset:offset + batch_size]})
+       response.raise_for_status()
+   return time.perf_counter() - start
+
+
+async def run(total_texts: int, batch_size: int, concurrency: int, seed: int) -> dict:
+   rng = random.Random(seed)
+   texts = [f"{rng.choice(SAMPLE_TEXTS)} #{i}" for i in range(total_texts)]
+
+   server, thread, base_url = start_server(app)
+   try:
+       limits = httpx.Limits(max_connections=concurrency)
+       async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+           single_time = await single_requests(client, texts, concurrency)
+           # Both phases send the same texts; start the batch phase cold so it
+           # measures batching, not result cache hits.
+           result_cache.invalidate()
+           batch_time = await batch_requests(client, texts, batch_size)
+   finally:
+       server.should_exit = True
+       thread.join()
+
+   return {"single": total_texts / single_time, "batch": total_texts / batch_time}
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Single vs. batch verification throughput.")
+   parser.add_argument("--texts", type=int, default=2000)
+   parser.add_argument("--batch-size", type=int, default=500)
+   parser.add_argument("--concurrency", type=int, default=16)
+   parser.add_argument("--seed", type=int, default=7)
+   args = parser.parse_args()
+
+   results = asyncio.run(run(args.texts, args.batch_size, args.concurrency, args.seed))
+   print(f"single requests: {results['single']:>10.0f} texts/s")
+   print(f"batch requests:  {results['batch']:>10.0f} texts/s")
+   print(f"speedup:         {results['batch'] / results['single']:>10.1f}x")
+
+
+if __name__ == "__main__":
+   main()
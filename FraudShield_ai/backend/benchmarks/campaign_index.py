@@ -0,0 +1,130 @@
+# --- campaign_index.py ---
+# Benchmark for the campaign clustering of the aggregation job (data_ingestion/campaign_index.py).
+# Feeds a stream of synthetic items into an on-disk CampaignIndex in job-sized batches: most
+# are unrelated posts, the rest reworded copies of a few hundred campaign messages. Reports
+# the insert cost per item as the index grows, the cost of a lookup without insert, how well
+# the copies were grouped, and the size of the index on disk.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.campaign_index --items 1000000
+
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+from benchmarks.common import percentile
+
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "data_ingestion"))
+from campaign_index import CampaignIndex  # noqa: E402
+
+
+def vocabulary(count: int, rng: random.Random) -> list:
+   letters = "abcdefghijklmnopqrstuvwxyz"
+   return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(count)]
+
+
+def reword(words: list, edits: int, words_pool: list, rng: random.Random) -> str:
+   """
+   A copy of a message with a few words replaced, dropped or added, as spammers vary their posts.
+   """
+   words = list(words)
+   for _ in range(edits):
+       position = rng.randrange(len(words))
+       action = rng.random()
+       if action < 0.5:
+           words[position] = rng.choice(words_pool)
+       elif action < 0.75 and len(words) > 5:
+           del words[position]
+       else:
+           words.insert(position, rng.choice(words_pool))
+   return " ".join(words)
+
+
+def synthetic_stream(count: int, campaigns: int, campaign_share: float, rng: random.Random):
+   """
+   Yields (item, campaign) pairs; `campaign` is the true campaign number, or None for an unrelated post.
+   """
+   words_pool = vocabulary(20_000, rng)
+   messages = [[rng.choice(words_pool) for _ in range(rng.randint(20, 40))] for _ in range(campaigns)]
+   for _ in range(count):
+       if rng.random() < campaign_share:
+           campaign = rng.randrange(campaigns)
+           title = reword(messages[campaign], rng.randint(0, 3), words_pool, rng)
+       else:
+           campaign = None
+           title = " ".join(rng.choice(words_pool) for _ in range(rng.randint(15, 40)))
+       yield {"source": "Telegram Group", "title": title, "content": "", "link": "#"}, campaign
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Campaign clustering insert and lookup cost.")
+   parser.add_argument("--items", type=int, default=1_000_000)
+   parser.add_argument("--batch", type=int, default=1000, help="Items per job run (one commit each).")
+   parser.add_argument("--campaigns", type=int, default=300)
+   parser.add_argument("--campaign-share", type=float, default=0.2, help="Share of items that copy a campaign message.")
+   parser.add_argument("--lookups", type=int, default=2000)
+   parser.add_argument("--seed", type=int, default=7)
+   args = parser.parse_args()
+   rng = random.Random(args.seed)
+
+   with tempfile.TemporaryDirectory() as tmp_dir:
+       db_path = Path(tmp_dir) / "campaigns.db"
+       index = CampaignIndex(db_path)
+       checkpoints = {args.items * share // 100 for share in (1, 10, 50, 100)}
+       # True campaign -> how often each assigned campaign ID was given to its copies.
+       assignments = {}
+       false_joins = 0
+       inserted = 0
+       batch, labels = [], []
+       window_start, window_items = time.perf_counter(), 0
+
+       print(f"{'items indexed':>14} {'campaigns':>10} {'insert us/item':>15}")
+       for item, campaign in synthetic_stream(args.items, args.campaigns, args.campaign_share, rng):
+           batch.append(item)
+           labels.append(campaign)
+           if len(batch) < args.batch and inserted + len(batch) < args.items:
+               continue
+           index.assign(batch)
+           index.commit()
+           for item, campaign in zip(batch, labels):
+               if campaign is None:
+                   false_joins += item["campaign_size"] > 1
+               else:
+                   counts = assignments.setdefault(campaign, {})
+                   counts[item["campaign_id"]] = counts.get(item["campaign_id"], 0) + 1
+           inserted += len(batch)
+           window_items += len(batch)
+           batch, labels = [], []
+           if any(inserted >= mark > inserted - args.batch for mark in checkpoints):
+               elapsed = time.perf_counter() - window_start
+               print(f"{inserted:>14,} {index.count():>10,} {elapsed / window_items * 1e6:>15.1f}")
+               window_start, window_items = time.perf_counter(), 0
+
+       # Lookups of fresh copies and of fresh unrelated posts against the full index.
+       durations = []
+       found = 0
+       for item, campaign in synthetic_stream(args.lookups, args.campaigns, 0.5, rng):
+           start = time.perf_counter()
+           campaign_id, _ = index.match(item)
+           durations.append(time.perf_counter() - start)
+           found += campaign is not None and campaign_id is not None
+
+       copies = sum(sum(counts.values()) for counts in assignments.values())
+       grouped = sum(max(counts.values()) for counts in assignments.values())
+       unrelated = args.items - copies
+       print(f"\nlookup without insert: p50 {percentile(durations, 50) * 1e6:.0f} us, p99 {percentile(durations, 99) * 1e6:.0f} us")
+       print(f"campaign copies in their campaign's main cluster: {grouped / copies:.1%} of {copies:,}")
+       print(f"unrelated posts wrongly clustered: {false_joins / unrelated:.3%} of {unrelated:,}")
+       index.close()
+       size = sum(path.stat().st_size for path in Path(tmp_dir).iterdir())
+       print(f"index on disk: {size / 1e6:.0f} MB ({size / args.items:.0f} bytes per item)")
+
+
+if __name__ == "__main__":
+   main()
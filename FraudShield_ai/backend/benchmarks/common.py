@@ -0,0 +1,97 @@
+# --- common.py ---
+# Helpers shared by the benchmark scripts.
+
+
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+import uvicorn
+from fastapi import FastAPI
+
+
+from app.core.rate_limit import rate_limiter
+
+
+def percentile(values: list, pct: float) -> float:
+   if not values:
+       return 0.0
+   ordered = sorted(values)
+   index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+   return ordered[index]
+
+
+def summarize(seconds: list) -> dict:
+   """
+   Count, mean and percentiles of a list of durations, in milliseconds.
+   """
+   if not seconds:
+       return {"count": 0}
+   return {
+       "count": len(seconds),
+       "mean_ms": round(statistics.mean(seconds) * 1000, 4),
+       "p50_ms": round(percentile(seconds, 50) * 1000, 4),
+       "p90_ms": round(percentile(seconds, 90) * 1000, 4),
+       "p99_ms": round(percentile(seconds, 99) * 1000, 4),
+       "max_ms": round(max(seconds) * 1000, 4)
+   }
+
+
+def run_metadata() -> dict:
+   """
+   What a result depends on besides the code: the commit, the interpreter and the machine.
+   """
+   try:
+       commit = subprocess.run(
+           ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+           cwd=Path(__file__).parent
+       ).stdout.strip()
+       dirty = bool(subprocess.run(
+           ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True,
+           cwd=Path(__file__).parent
+       ).stdout.strip())
+   except (OSError, subprocess.CalledProcessError):
+       commit, dirty = None, None
+   return {
+       "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+       "commit": commit,
+       "dirty": dirty,
+       "python": platform.python_version(),
+       "platform": platform.platform(),
+       "cpus": os.cpu_count()
+   }
+
+
+def write_results(path: Path, results: dict):
+   path.parent.mkdir(parents=True, exist_ok=True)
+   with open(path, "w", encoding="utf-8") as f:
+       json.dump(results, f, indent=2)
+       f.write("\n")
+
+
+def start_server(app: FastAPI) -> tuple:
+   """
+   Starts uvicorn for `app` on a free local port in a daemon thread.
+   A real server (rather than an in-process ASGI transport) is needed so that a
+   blocked server event loop shows up as client-side latency.
+   The benchmark is a single client measuring the pipeline, so per-client rate limits are off.
+   """
+   rate_limiter.enabled = False
+   with socket.socket() as sock:
+       sock.bind(("127.0.0.1", 0))
+       port = sock.getsockname()[1]
+
+   server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+   thread = threading.Thread(target=server.run, daemon=True)
+   thread.start()
+   while not server.started:
+       time.sleep(0.01)
+   return server, thread, f"http://127.0.0.1:{port}"
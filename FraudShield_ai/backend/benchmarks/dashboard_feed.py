@@ -0,0 +1,145 @@
+# --- dashboard_feed.py ---
+# Load benchmark for /api/dashboard/feed under many concurrently polling analysts.
+# Compares the old handler (open + json.load on every GET) with the cached feed,
+# both for full responses and for revalidation polls that send If-None-Match.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.dashboard_feed --items 2000 --clients 20 --polls 25
+
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+
+from app.api.endpoints import dashboard
+from app.services.feed_cache import FeedCache
+from benchmarks.common import percentile
+
+
+def write_feed(path: Path, items: int):
+   feed = [
+       {
+           "source": "BSE",
+           "title": f"Announcement {i}: 'Innovate Corp' board meeting outcome and quarterly results",
+           "timestamp": "2024-01-01T00:00:00Z",
+           "link": f"https://example.com/{i}",
+           "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4,
+           "risk_level": "Low",
+           "reason": ""
+       }
+       for i in range(items)
+   ]
+   with open(path, "w", encoding="utf-8") as f:
+       json.dump(feed, f, indent=4)
+
+
+def build_uncached_app(path: Path) -> FastAPI:
+   """
+   Serves the feed the way the endpoint worked before caching: read and parse on every GET.
+   """
+   uncached_app = FastAPI()
+
+   @uncached_app.get("/api/dashboard/feed")
+   async def get_dashboard_feed():
+       with open(path, "r") as f:
+           return json.load(f)
+
+   return uncached_app
+
+
+def build_cached_app(path: Path) -> FastAPI:
+   dashboard.feed_cache = FeedCache(path)
+   cached_app = FastAPI()
+   cached_app.include_router(dashboard.router, prefix="/api/dashboard")
+   return cached_app
+
+
+def serve(path: Path, cached: bool, port: int):
+   app = build_cached_app(path) if cached else build_uncached_app(path)
+   uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server_process(path: Path, cached: bool) -> tuple:
+   """
+   Runs the server in its own process, so the load generator doesn't compete with it for the GIL.
+   """
+   with socket.socket() as sock:
+       sock.bind(("127.0.0.1", 0))
+       port = sock.getsockname()[1]
+   process = multiprocessing.Process(target=serve, args=(path, cached, port), daemon=True)
+   process.start()
+   base_url = f"http://127.0.0.1:{port}"
+   while True:
+       try:
+           httpx.get(base_url + "/docs")
+           return process, base_url
+       except httpx.TransportError:
+           time.sleep(0.05)
+
+
+async def poll(base_url: str, clients: int, polls: int, revalidate: bool) -> dict:
+   latencies = []
+   limits = httpx.Limits(max_connections=clients)
+   async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+
+       # With revalidation, each analyst first loads the feed once (not measured), as a
+       # dashboard that is already open would have; the measured polls then send its ETag.
+       etags = [None] * clients
+       if revalidate:
+           responses = await asyncio.gather(*(client.get("/api/dashboard/feed") for _ in range(clients)))
+           etags = [response.headers.get("etag") for response in responses]
+
+       async def analyst(etag):
+           for _ in range(polls):
+               headers = {"If-None-Match": etag} if etag else {}
+               start = time.perf_counter()
+               await client.get("/api/dashboard/feed", headers=headers)
+               latencies.append(time.perf_counter() - start)
+
+       start = time.perf_counter()
+       await asyncio.gather(*(analyst(etag) for etag in etags))
+       wall_time = time.perf_counter() - start
+   return {"latencies": latencies, "wall_time": wall_time}
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Dashboard feed polling benchmark.")
+   parser.add_argument("--items", type=int, default=2000)
+   parser.add_argument("--clients", type=int, default=20)
+   parser.add_argument("--polls", type=int, default=25)
+   args = parser.parse_args()
+
+   with tempfile.TemporaryDirectory() as tmp_dir:
+       path = Path(tmp_dir) / "aggregated_feed.json"
+       write_feed(path, args.items)
+       print(f"feed: {args.items} items, {os.path.getsize(path) / 1024:.0f} KiB; {args.clients} analysts x {args.polls} polls")
+       print(f"{'handler':<22} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+       runs = [("uncached", False, False), ("cached", True, False), ("cached + ETag (304)", True, True)]
+       for name, cached, revalidate in runs:
+           server, base_url = start_server_process(path, cached)
+           try:
+               result = asyncio.run(poll(base_url, args.clients, args.polls, revalidate))
+           finally:
+               server.terminate()
+               server.join()
+           values = result["latencies"]
+           print(
+               f"{name:<22} {len(values) / result['wall_time']:>8.0f} "
+               f"{percentile(values, 50) * 1000:>9.1f} {percentile(values, 99) * 1000:>9.1f}"
+           )
+
+
+if __name__ == "__main__":
+   main()
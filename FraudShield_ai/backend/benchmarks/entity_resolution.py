@@ -0,0 +1,70 @@
+# --- entity_resolution.py ---
+# Latency benchmark for fuzzy company-name resolution.
+# Builds a CompanyNameIndex over a synthetic company universe and resolves exact,
+# reformatted, misspelled and unknown mentions against it.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.entity_resolution --companies 50000
+
+
+import argparse
+import random
+import time
+
+
+from app.services.entity_resolver import CompanyNameIndex
+from app.services.official_records import lookup_keys_for
+from benchmarks.records_lookup import synthetic_companies
+from benchmarks.common import percentile
+
+
+def misspell(name: str, rng: random.Random) -> str:
+   chars = list(name)
+   position = rng.randrange(1, len(chars) - 1)
+   chars[position] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+   return "".join(chars)
+
+
+def mention_for(company: dict, rng: random.Random) -> str:
+   kind = rng.choice(["exact", "reformatted", "misspelled", "unknown"])
+   if kind == "exact":
+       return company["name"]
+   if kind == "reformatted":
+       return company["name"].upper().replace("LTD", "LIMITED") + "."
+   if kind == "misspelled":
+       return misspell(company["name"], rng)
+   return f"Zzqx {rng.randint(0, 10**9)} Holdings"
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Fuzzy company-name resolution latency.")
+   parser.add_argument("--companies", type=int, default=50_000)
+   parser.add_argument("--lookups", type=int, default=10_000)
+   parser.add_argument("--seed", type=int, default=7)
+   args = parser.parse_args()
+
+   rng = random.Random(args.seed)
+   companies = synthetic_companies(args.companies, rng)
+   entries = [
+       (company_id, key, kind)
+       for company_id, company in enumerate(companies, start=1)
+       for key, kind in lookup_keys_for(company) if kind != "exact"
+   ]
+
+   start = time.perf_counter()
+   index = CompanyNameIndex(entries)
+   build_time = time.perf_counter() - start
+
+   latencies = []
+   for _ in range(args.lookups):
+       mention = mention_for(rng.choice(companies), rng)
+       start = time.perf_counter()
+       index.resolve(mention)
+       latencies.append(time.perf_counter() - start)
+
+   print(f"companies: {args.companies}, indexed names: {len(index.names)}, build: {build_time:.2f}s")
+   print(f"resolve p50: {percentile(latencies, 50) * 1e6:.1f} us, p99: {percentile(latencies, 99) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,115 @@
+# --- feed_log.py ---
+# Benchmark for the feed storage used by the aggregation job and the dashboard.
+# Compares the append-only FeedLog against the single JSON file the job used to rewrite
+# on every run: writing a run's new items into a large feed, loading the whole feed,
+# reading only the newest items, and compaction.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.feed_log --items 1000000
+
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+
+from app.services.feed_log import FeedLog, lines_to_json_array
+from benchmarks.common import percentile
+from benchmarks.feed_queries import synthetic_feed
+
+
+def rewrite_json(path: Path, new_items: list):
+   """
+   What a run cost before: load the whole feed, add the new items, rewrite it atomically.
+   """
+   with open(path, "r", encoding="utf-8") as f:
+       items = json.load(f)
+   items.extend(new_items)
+   tmp_path = path.with_suffix(".json.tmp")
+   with open(tmp_path, "w", encoding="utf-8") as f:
+       json.dump(items, f, indent=4, ensure_ascii=False)
+   os.replace(tmp_path, path)
+
+
+def load_json(path: Path) -> bytes:
+   # The old FeedCache reload: parse the file, then encode the response body.
+   with open(path, "rb") as f:
+       data = json.loads(f.read())
+   return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def load_log(log: FeedLog) -> bytes:
+   # The FeedCache reload from the log: join the segments, then parse once for the indexes.
+   body = lines_to_json_array(log.read_bytes())
+   json.loads(body)
+   return body
+
+
+def timed(function, *args) -> float:
+   start = time.perf_counter()
+   function(*args)
+   return time.perf_counter() - start
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Append-only feed log vs. full JSON rewrite.")
+   parser.add_argument("--items", type=int, default=1_000_000)
+   parser.add_argument("--segment-items", type=int, default=50_000)
+   parser.add_argument("--batch", type=int, default=50, help="New items per simulated job run.")
+   parser.add_argument("--runs", type=int, default=5)
+   args = parser.parse_args()
+
+   rng = random.Random(5)
+   items = synthetic_feed(args.items, rng)
+   batches = [synthetic_feed(args.batch, rng) for _ in range(args.runs)]
+
+   with tempfile.TemporaryDirectory() as tmp_dir:
+       json_path = Path(tmp_dir) / "aggregated_feed.json"
+       log = FeedLog(Path(tmp_dir) / "feed_log", args.segment_items)
+
+       print(f"feed: {args.items} items; job runs append {args.batch} items each\n")
+       print("--- initial write ---")
+       t = timed(log.append, items)
+       size = sum(segment["bytes"] for segment in log.manifest()["segments"])
+       print(f"{'feed log, bulk append':<28} {t:>8.2f} s {args.items / t:>10.0f} items/s {size / 2**20:>7.0f} MiB")
+       start = time.perf_counter()
+       with open(json_path, "w", encoding="utf-8") as f:
+           json.dump(items, f, indent=4, ensure_ascii=False)
+       t = time.perf_counter() - start
+       size = json_path.stat().st_size
+       print(f"{'JSON file, json.dump':<28} {t:>8.2f} s {args.items / t:>10.0f} items/s {size / 2**20:>7.0f} MiB")
+       del items
+
+       print(f"\n--- one job run into a {args.items}-item feed ---")
+       log_times = [timed(log.append, batch) for batch in batches]
+       json_times = [timed(rewrite_json, json_path, batch) for batch in batches]
+       print(f"{'':<28} {'p50 ms':>10} {'max ms':>10}")
+       print(f"{'feed log append':<28} {percentile(log_times, 50) * 1000:>10.1f} {max(log_times) * 1000:>10.1f}")
+       print(f"{'JSON load + rewrite':<28} {percentile(json_times, 50) * 1000:>10.1f} {max(json_times) * 1000:>10.1f}")
+
+       print("\n--- readers ---")
+       log_body = load_log(log)
+       json_body = load_json(json_path)
+       assert log_body == json_body
+       tail_times = [timed(log.tail, 100) for _ in range(20)]
+       print(f"{'full load, feed log':<28} {timed(load_log, log):>8.2f} s")
+       print(f"{'full load, JSON file':<28} {timed(load_json, json_path):>8.2f} s")
+       print(f"{'newest 100, feed log tail':<28} {percentile(tail_times, 50) * 1000:>8.1f} ms")
+       print(f"{'newest 100, JSON file':<28} {timed(lambda: json.loads(json_path.read_bytes())[-100:]) * 1000:>8.1f} ms")
+       del log_body, json_body
+
+       print("\n--- compaction ---")
+       start = time.perf_counter()
+       result = log.compact(max_items=args.items // 2)
+       print(f"{'retention to half':<28} {(time.perf_counter() - start) * 1000:>8.1f} ms  {result}")
+       start = time.perf_counter()
+       result = FeedLog(log.directory, args.segment_items * 4).compact()
+       print(f"{'merge into 4x segments':<28} {time.perf_counter() - start:>8.2f} s   {result}")
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,120 @@
+# --- feed_queries.py ---
+# Benchmark for filtered, paginated dashboard feed queries over a large synthetic feed.
+# Builds the FeedIndex once, then times typical dashboard queries against a full linear
+# scan of the feed with the same filters.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.feed_queries --items 1000000
+
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+
+from app.services.feed_index import FeedIndex, parse_timestamp, tokenize
+from benchmarks.common import percentile
+
+
+SOURCES = ["BSE India", "SEBI", "Reuters", "Economic Times", "Telegram Group", "X (Twitter)", "YouTube Comment"] + [
+   f"News Outlet {i}" for i in range(13)
+]
+RISK_LEVELS = ["Low"] * 7 + ["Medium"] * 2 + ["High"]
+COMPANIES = [f"company{i}" for i in range(2000)]
+WORDS = [f"word{i}" for i in range(20000)] + ["quarterly", "results", "board", "guaranteed", "profit", "insider", "urgent"]
+
+
+def synthetic_feed(count: int, rng: random.Random) -> list:
+   start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+   items = []
+   for _ in range(count):
+       words = rng.choices(WORDS, k=14)
+       company = rng.choice(COMPANIES)
+       timestamp = start + timedelta(seconds=rng.randrange(365 * 86400))
+       items.append({
+           "source": rng.choice(SOURCES),
+           "title": f"{company} {' '.join(words[:6])}",
+           "timestamp": timestamp.isoformat().replace("+00:00", "Z"),
+           "link": "#",
+           "content": " ".join(words[6:]),
+           "risk_level": rng.choice(RISK_LEVELS),
+           "reason": ""
+       })
+   return items
+
+
+def scan(items: list, source=None, risk_level=None, since=None, until=None, search=None, limit=50) -> list:
+   """
+   What serving a filtered page costs without indexes: filter everything, sort, slice.
+   """
+   words = tokenize(search) if search else set()
+   matches = []
+   for item in items:
+       if source is not None and item["source"].casefold() != source.casefold():
+           continue
+       if risk_level is not None and item["risk_level"].casefold() != risk_level.casefold():
+           continue
+       timestamp = parse_timestamp(item["timestamp"])
+       if (since is not None and timestamp < since) or (until is not None and timestamp > until):
+           continue
+       if words and not words <= tokenize(f"{item['title']} {item['content']}"):
+           continue
+       matches.append((timestamp, item))
+   matches.sort(key=lambda match: -match[0])
+   return [item for _, item in matches[:limit]]
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Indexed vs. scanned feed queries.")
+   parser.add_argument("--items", type=int, default=1_000_000)
+   parser.add_argument("--repeat", type=int, default=200)
+   parser.add_argument("--scan-repeat", type=int, default=1)
+   args = parser.parse_args()
+
+   rng = random.Random(3)
+   items = synthetic_feed(args.items, rng)
+   start = time.perf_counter()
+   index = FeedIndex(items, version="bench")
+   print(f"{args.items} items, index built in {time.perf_counter() - start:.1f}s ({len(index.by_token)} distinct words)")
+
+   june = datetime(2024, 6, 1, tzinfo=timezone.utc).timestamp()
+   queries = {
+       "latest page": {},
+       "source": {"source": "SEBI"},
+       "risk_level": {"risk_level": "High"},
+       "time range (1 week)": {"since": june, "until": june + 7 * 86400},
+       "search, rare word": {"search": "company42"},
+       "search, 2 words": {"search": "guaranteed profit"},
+       "source + risk + search": {"source": "Telegram Group", "risk_level": "High", "search": "urgent"},
+   }
+
+   print(f"{'query':<24} {'indexed p50 us':>15} {'indexed p99 us':>15} {'scan ms':>9}")
+   for name, filters in queries.items():
+       timings = []
+       for _ in range(args.repeat):
+           t = time.perf_counter()
+           page = index.query(**filters)
+           timings.append(time.perf_counter() - t)
+       t = time.perf_counter()
+       for _ in range(args.scan_repeat):
+           expected = scan(items, **filters)
+       scan_ms = (time.perf_counter() - t) / args.scan_repeat * 1000
+       assert [parse_timestamp(i["timestamp"]) for i in page["items"]] == [parse_timestamp(i["timestamp"]) for i in expected]
+       print(
+           f"{name:<24} {percentile(timings, 50) * 1e6:>15.0f} {percentile(timings, 99) * 1e6:>15.0f} {scan_ms:>9.0f}"
+       )
+
+   # Walk 20 pages deep with cursors.
+   timings = []
+   cursor = None
+   for _ in range(20):
+       t = time.perf_counter()
+       page = index.query(risk_level="High", cursor=cursor)
+       timings.append(time.perf_counter() - t)
+       cursor = page["next_cursor"]
+   print(f"{'20 pages via cursor':<24} {percentile(timings, 50) * 1e6:>15.0f} {percentile(timings, 99) * 1e6:>15.0f}")
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,218 @@
+# --- feed_stream.py ---
+# Benchmark for the live feed stream.
+# 1. Fan-out: thousands of in-process subscribers with mixed filters, a few of which never
+#    read; measures how long publishing a job run's items takes and how long until every
+#    reading subscriber has them, against encoding and filtering per subscriber.
+# 2. End to end: SSE clients connected to a server process; measures the delay between the
+#    job appending to the feed log and the clients receiving the items.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.feed_stream --subscribers 5000 --sse-clients 200
+
+
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import random
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+
+from app.api.endpoints import dashboard
+from app.services.feed_hub import FeedHub, matches, sse_frame
+from app.services.feed_log import FeedLog
+from benchmarks.common import percentile
+
+
+RISK_FILTERS = [[], ["High", "Critical"], ["Critical"], ["Medium", "High", "Critical"]]
+SOURCE_FILTERS = [[], ["Telegram Group"], ["X (Twitter)", "YouTube Comment"], ["SEBI"]]
+SOURCES = ["BSE India", "SEBI", "Telegram Group", "X (Twitter)", "YouTube Comment", "Reuters"]
+RISK_LEVELS = ["Low", "Low", "Low", "Medium", "High", "Critical"]
+
+
+def new_items(count: int, rng: random.Random) -> list:
+   return [
+       {
+           "source": rng.choice(SOURCES),
+           "title": f"Item {rng.randrange(10**9)}: 'Innovate Corp' guaranteed profit, act now",
+           "timestamp": "2024-01-01T00:00:00Z",
+           "link": "#",
+           "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3,
+           "risk_level": rng.choice(RISK_LEVELS),
+           "risk_score": rng.randrange(100),
+           "reason": "Promissory Language"
+       }
+       for _ in range(count)
+   ]
+
+
+def publish_per_subscriber(subscribers: list, entries: list):
+   """
+   Fan-out without grouping or shared frames: every subscriber filters and encodes every item.
+   """
+   for subscription in subscribers:
+       for seq, item in entries:
+           if matches(subscription.key, item):
+               try:
+                   subscription.queue.put_nowait((seq, sse_frame(seq, item)))
+               except asyncio.QueueFull:
+                   pass
+
+
+async def fan_out(subscriber_count: int, slow_share: float, runs: int, batch: int, grouped: bool) -> dict:
+   rng = random.Random(1)
+   hub = FeedHub(FeedLog(tempfile.mkdtemp()), queue_size=256)
+   subscriptions = []
+   for _ in range(subscriber_count):
+       subscriptions.append(hub.subscribe(rng.choice(RISK_FILTERS), rng.choice(SOURCE_FILTERS)))
+   slow = set(rng.sample(range(subscriber_count), int(subscriber_count * slow_share)))
+   expected = [0] * subscriber_count
+   received = [0] * subscriber_count
+   behind = 0
+   done = asyncio.Event()
+
+   async def consume(i: int, subscription):
+       nonlocal behind
+       async for _ in subscription.frames(heartbeat=3600):
+           received[i] += 1
+           if received[i] == expected[i]:
+               behind -= 1
+               if not behind:
+                   done.set()
+
+   fast = [i for i in range(subscriber_count) if i not in slow]
+   tasks = [asyncio.create_task(consume(i, subscriptions[i])) for i in fast]
+   await asyncio.sleep(0)
+
+   publish_times, delivery_times = [], []
+   seq = 0
+   for _ in range(runs):
+       items = new_items(batch, rng)
+       entries = list(zip(range(seq, seq + batch), items))
+       seq += batch
+       counts = {}
+       for i in fast:
+           key = subscriptions[i].key
+           if key not in counts:
+               counts[key] = sum(1 for _, item in entries if matches(key, item))
+           expected[i] += counts[key]
+       behind = sum(1 for i in fast if received[i] < expected[i])
+       done.clear()
+       start = time.perf_counter()
+       if grouped:
+           hub.publish(entries)
+       else:
+           publish_per_subscriber(subscriptions, entries)
+       publish_times.append(time.perf_counter() - start)
+       if behind:
+           await done.wait()
+       delivery_times.append(time.perf_counter() - start)
+
+   for task in tasks:
+       task.cancel()
+   await asyncio.gather(*tasks, return_exceptions=True)
+   return {"publish": publish_times, "delivery": delivery_times, "dropped": hub.dropped, "slow": len(slow)}
+
+
+def serve(log_dir: str, port: int):
+   dashboard.feed_hub = FeedHub(FeedLog(log_dir), poll_interval=0.05, max_subscribers=100_000)
+
+   @contextlib.asynccontextmanager
+   async def lifespan(app: FastAPI):
+       dashboard.feed_hub.start()
+       yield
+       await dashboard.feed_hub.stop()
+
+   app = FastAPI(lifespan=lifespan)
+   app.include_router(dashboard.router, prefix="/api/dashboard")
+   uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def end_to_end(clients: int, runs: int, batch: int) -> list:
+   with tempfile.TemporaryDirectory() as tmp_dir:
+       log = FeedLog(Path(tmp_dir) / "feed_log")
+       log.append(new_items(1, random.Random(0)))
+       with socket.socket() as sock:
+           sock.bind(("127.0.0.1", 0))
+           port = sock.getsockname()[1]
+       process = multiprocessing.Process(target=serve, args=(str(log.directory), port), daemon=True)
+       process.start()
+       base_url = f"http://127.0.0.1:{port}"
+       while True:
+           try:
+               httpx.get(base_url + "/docs")
+               break
+           except httpx.TransportError:
+               time.sleep(0.05)
+
+       appended_at = {}
+       latencies = []
+       connected = 0
+
+       async def client(http: httpx.AsyncClient):
+           nonlocal connected
+           async with http.stream("GET", "/api/dashboard/feed/stream") as response:
+               connected += 1
+               async for line in response.aiter_lines():
+                   if line.startswith("id: "):
+                       latencies.append(time.perf_counter() - appended_at[int(line[4:])])
+
+       limits = httpx.Limits(max_connections=clients)
+       async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as http:
+           tasks = [asyncio.create_task(client(http)) for _ in range(clients)]
+           while connected < clients:
+               await asyncio.sleep(0.05)
+           await asyncio.sleep(0.5)
+           rng = random.Random(2)
+           for run in range(1, runs + 1):
+               first = log.next_seq()
+               stamp = time.perf_counter()
+               log.append(new_items(batch, rng))
+               appended_at.update({seq: stamp for seq in range(first, first + batch)})
+               while len(latencies) < clients * batch * run and time.perf_counter() - stamp < 30:
+                   await asyncio.sleep(0.01)
+           for task in tasks:
+               task.cancel()
+           await asyncio.gather(*tasks, return_exceptions=True)
+       process.terminate()
+       process.join()
+   return latencies
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Live feed stream fan-out benchmark.")
+   parser.add_argument("--subscribers", type=int, default=5000)
+   parser.add_argument("--slow", type=float, default=0.02, help="Share of subscribers that never read.")
+   parser.add_argument("--runs", type=int, default=5)
+   parser.add_argument("--batch", type=int, default=100, help="Items per job run.")
+   parser.add_argument("--sse-clients", type=int, default=200)
+   parser.add_argument("--sse-batch", type=int, default=10, help="Items per job run, end to end.")
+   args = parser.parse_args()
+
+   print(f"fan-out: {args.subscribers} subscribers ({args.slow:.0%} never read), {args.runs} runs x {args.batch} items")
+   print(f"{'publish':<28} {'publish p50 ms':>15} {'delivered p50 ms':>17} {'dropped':>8}")
+   for name, grouped in (("per subscriber", False), ("hub (grouped, shared frames)", True)):
+       result = asyncio.run(fan_out(args.subscribers, args.slow, args.runs, args.batch, grouped))
+       print(
+           f"{name:<28} {percentile(result['publish'], 50) * 1000:>15.1f} "
+           f"{percentile(result['delivery'], 50) * 1000:>17.1f} {result['dropped']:>8}"
+       )
+
+   print(f"\nend to end: {args.sse_clients} SSE clients, {args.runs} job runs x {args.sse_batch} items")
+   latencies = asyncio.run(end_to_end(args.sse_clients, args.runs, args.sse_batch))
+   print(
+       f"{len(latencies)} events, append -> client p50 {percentile(latencies, 50) * 1000:.0f} ms, "
+       f"p99 {percentile(latencies, 99) * 1000:.0f} ms"
+   )
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,82 @@
+# --- nlp_batching.py ---
+# Throughput vs. tail latency of the NLP micro-batcher under several batch size / deadline settings.
+# The NLP model is simulated with a fixed per-call overhead plus a per-text cost, run on a single
+# worker thread (a transformer on CPU already uses every core, so calls don't run in parallel).
+# Requests arrive open-loop (Poisson) at a fixed rate, as independent /verify calls would.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.nlp_batching --rate 400 --seconds 5
+
+
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+from app.services.micro_batcher import MicroBatcher
+from benchmarks.common import percentile
+
+
+SETTINGS = [(1, 0), (4, 2), (8, 5), (16, 5), (32, 10), (64, 20)]
+
+
+def simulated_model(call_ms: float, per_text_ms: float):
+   def process_batch(texts):
+       time.sleep((call_ms + per_text_ms * len(texts)) / 1000)
+       return [{"sentiment": "Neutral"} for _ in texts]
+
+   return process_batch
+
+
+async def run_setting(batch_size: int, delay_ms: float, rate: float, seconds: float, model) -> dict:
+   executor = ThreadPoolExecutor(max_workers=1)
+   batcher = MicroBatcher(model, max_batch_size=batch_size, max_delay=delay_ms / 1000, max_in_flight=1, executor=executor)
+   latencies = []
+
+   async def request(text):
+       start = time.perf_counter()
+       await batcher.submit(text)
+       latencies.append(time.perf_counter() - start)
+
+   rng = random.Random(1)
+   tasks = []
+   start = time.perf_counter()
+   next_arrival = start
+   while next_arrival - start < seconds:
+       await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+       tasks.append(asyncio.create_task(request("'Innovate Corp' guaranteed profit of 500%")))
+       next_arrival += rng.expovariate(rate)
+   await asyncio.gather(*tasks)
+   elapsed = time.perf_counter() - start
+   executor.shutdown()
+   return {
+       "throughput": len(latencies) / elapsed,
+       "p50_ms": percentile(latencies, 50) * 1000,
+       "p99_ms": percentile(latencies, 99) * 1000,
+       "mean_batch": batcher.stats()["mean_batch_size"],
+   }
+
+
+def main():
+   parser = argparse.ArgumentParser(description="NLP micro-batching: throughput vs. p99 latency.")
+   parser.add_argument("--rate", type=float, default=400, help="Offered load, requests per second.")
+   parser.add_argument("--seconds", type=float, default=5)
+   parser.add_argument("--call-ms", type=float, default=8.0, help="Simulated fixed cost per model call.")
+   parser.add_argument("--per-text-ms", type=float, default=0.5, help="Simulated cost per text in a batch.")
+   args = parser.parse_args()
+
+   model = simulated_model(args.call_ms, args.per_text_ms)
+   print(f"offered load {args.rate:.0f} req/s, model cost {args.call_ms} ms/call + {args.per_text_ms} ms/text")
+   print(f"{'batch':>6} {'delay ms':>9} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'mean batch':>11}")
+   for batch_size, delay_ms in SETTINGS:
+       result = asyncio.run(run_setting(batch_size, delay_ms, args.rate, args.seconds, model))
+       print(
+           f"{batch_size:>6} {delay_ms:>9} {result['throughput']:>8.0f} {result['p50_ms']:>9.1f} "
+           f"{result['p99_ms']:>9.1f} {result['mean_batch']:>11.1f}"
+       )
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,124 @@
+# --- rate_limit.py ---
+# Benchmark for the per-client admission control (app/core/rate_limit.py).
+# 1. Cost of admitting a request (acquire + release) and of rejecting one, with clients
+#    spread over tables of increasing size.
+# 2. A load test of the API, in-process, with many API keys: one noisy client floods the
+#    media pipeline with uploads while well-behaved clients send text and the odd upload.
+#    Run once with the limiter off and once with it on, to compare what the well-behaved
+#    clients see.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.rate_limit --keys 1000 --noisy-uploads 16
+
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+
+import httpx
+
+
+from app.core import security
+from app.core.rate_limit import RateLimiter, RateLimitExceeded, Limit, rate_limiter
+from app.main import app
+from app.services.model_registry import model_registry
+from benchmarks.common import percentile
+
+
+def admission_ns(clients: int, calls: int, rng: random.Random) -> tuple:
+   """
+   Per-call cost of acquire + release for random clients among `clients`, and of a rejection.
+   """
+   limiter = RateLimiter({"text": Limit(1e9, 1e9, 1_000_000), "media": Limit(1e-9, 1, 1)}, max_clients=clients)
+   keys = [f"key-{i:08d}" for i in range(clients)]
+   for key in keys:
+       limiter.acquire(key, "text")
+       limiter.release(key, "text")
+       limiter.acquire(key, "media")
+   order = [rng.choice(keys) for _ in range(calls)]
+
+   start = time.perf_counter()
+   for key in order:
+       limiter.acquire(key, "text")
+       limiter.release(key, "text")
+   admitted = (time.perf_counter() - start) / calls * 1e9
+
+   start = time.perf_counter()
+   for key in order:
+       try:
+           limiter.acquire(key, "media")
+       except RateLimitExceeded:
+           pass
+   rejected = (time.perf_counter() - start) / calls * 1e9
+   return admitted, rejected
+
+
+async def run_load(keys: list, noisy_uploads: int, clients: int, uploads_every: int, run: str) -> dict:
+   """
+   Starts `noisy_uploads` concurrent uploads from keys[0], then `clients` well-behaved clients,
+   each sending one text and, every `uploads_every`-th client, one upload.
+   Texts are tagged with `run`, so no run is served from the result cache of another.
+   Returns latencies and status codes per group.
+   """
+   results = {}
+
+   async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+
+       async def send(group: str, key: str, kwargs: dict):
+           start = time.perf_counter()
+           response = await client.post("/api/verification/verify", headers={"Authorization": f"Bearer {key}"}, **kwargs)
+           entry = results.setdefault(group, {"latencies": [], "statuses": {}})
+           entry["statuses"][response.status_code] = entry["statuses"].get(response.status_code, 0) + 1
+           if response.status_code == 200:
+               entry["latencies"].append(time.perf_counter() - start)
+
+       def upload() -> dict:
+           # Distinct bytes, so no upload is a result cache hit.
+           return {"files": {"file": ("clip.mp4", os.urandom(16 * 1024), "video/mp4")}}
+
+       tasks = [asyncio.create_task(send("noisy media", keys[0], upload())) for _ in range(noisy_uploads)]
+       await asyncio.sleep(0.05)
+       for i in range(clients):
+           key = keys[1 + i % (len(keys) - 1)]
+           tasks.append(asyncio.create_task(send("client text", key, {"data": {"text": f"Quarterly results of company {i} ({run})"}})))
+           if i % uploads_every == 0:
+               tasks.append(asyncio.create_task(send("client media", key, upload())))
+       await asyncio.gather(*tasks)
+   return results
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Cost and effect of per-client rate limiting.")
+   parser.add_argument("--calls", type=int, default=200_000)
+   parser.add_argument("--keys", type=int, default=1000, help="API keys in the load test.")
+   parser.add_argument("--noisy-uploads", type=int, default=16, help="Concurrent uploads from the noisy client.")
+   parser.add_argument("--clients", type=int, default=500, help="Well-behaved requests in the load test.")
+   parser.add_argument("--uploads-every", type=int, default=100, help="One upload per this many well-behaved clients.")
+   args = parser.parse_args()
+   rng = random.Random(7)
+
+   print(f"{'tracked clients':>16} {'admit ns':>9} {'reject ns':>10}")
+   for clients in (1, 10_000, 1_000_000):
+       admitted, rejected = admission_ns(clients, args.calls, rng)
+       print(f"{clients:>16,} {admitted:>9.0f} {rejected:>10.0f}")
+
+   keys = [f"bench-key-{i}" for i in range(args.keys)]
+   security.allowed_api_keys = frozenset(keys)
+   model_registry.warm_up()
+   print(f"\n{'limiter':<8} {'group':<14} {'ok':>5} {'429':>5} {'p50 ms':>9} {'p99 ms':>9}")
+   for enabled in (False, True):
+       rate_limiter.enabled = enabled
+       results = asyncio.run(run_load(keys, args.noisy_uploads, args.clients, args.uploads_every, f"limiter {enabled}"))
+       for group, entry in sorted(results.items()):
+           latencies = entry["latencies"]
+           print(
+               f"{'on' if enabled else 'off':<8} {group:<14} {entry['statuses'].get(200, 0):>5} {entry['statuses'].get(429, 0):>5} "
+               f"{percentile(latencies, 50) * 1000:>9.1f} {percentile(latencies, 99) * 1000:>9.1f}"
+           )
+
+
+if __name__ == "__main__":
+   main()
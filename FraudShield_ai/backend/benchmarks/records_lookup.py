@@ -0,0 +1,94 @@
+# --- records_lookup.py ---
+# Lookup-latency benchmark for the official-records store behind CrossVerifier.
+# Builds synthetic company universes of increasing size in temporary SQLite files and
+# times `lookup_many` for request-sized batches of exact, alias, normalized and unknown names.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.records_lookup --sizes 10000 100000
+
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+
+from app.services.official_records import OfficialRecordsStore
+from benchmarks.common import percentile
+
+
+SUFFIXES = ["Ltd", "Limited", "Corp", "Corporation", "Industries Ltd", "Finance Ltd"]
+
+
+def synthetic_companies(count: int, rng: random.Random) -> list[dict]:
+   companies = []
+   for i in range(count):
+       stem = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 10))).title()
+       name = f"{stem} {i} {rng.choice(SUFFIXES)}"
+       companies.append({
+           "name": name,
+           "ticker": f"T{i:06d}",
+           "exchange": rng.choice(["BSE", "NSE"]),
+           "aliases": [f"{stem} {i} Group"],
+           "latest_growth_claim": f"{rng.randint(1, 40)}%",
+           "official_filings": ["Annual Report"]
+       })
+   return companies
+
+
+def mention_for(company: dict, rng: random.Random) -> str:
+   kind = rng.choice(["exact", "alias", "normalized", "ticker", "unknown"])
+   if kind == "exact":
+       return company["name"]
+   if kind == "alias":
+       return company["aliases"][0]
+   if kind == "normalized":
+       return company["name"].upper() + "."
+   if kind == "ticker":
+       return company["ticker"]
+   return f"Unknown {rng.randint(0, 10**9)} Corp"
+
+
+def run(size: int, lookups: int, batch_size: int, seed: int) -> dict:
+   rng = random.Random(seed)
+   companies = synthetic_companies(size, rng)
+
+   with tempfile.TemporaryDirectory() as tmp_dir:
+       start = time.perf_counter()
+       store = OfficialRecordsStore(str(Path(tmp_dir) / "records.db"))
+       store.replace_all(companies)
+       build_time = time.perf_counter() - start
+
+       latencies = []
+       for _ in range(lookups):
+           names = [mention_for(rng.choice(companies), rng) for _ in range(batch_size)]
+           start = time.perf_counter()
+           store.lookup_many(names)
+           latencies.append(time.perf_counter() - start)
+       store.close()
+
+   return {
+       "size": size,
+       "build_seconds": build_time,
+       "p50_us": percentile(latencies, 50) * 1e6,
+       "p99_us": percentile(latencies, 99) * 1e6
+   }
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Official-records lookup latency.")
+   parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+   parser.add_argument("--lookups", type=int, default=5000)
+   parser.add_argument("--batch-size", type=int, default=4, help="Organizations resolved per request.")
+   parser.add_argument("--seed", type=int, default=7)
+   args = parser.parse_args()
+
+   print(f"{'companies':>10} {'build (s)':>10} {'p50 (us)':>10} {'p99 (us)':>10}   (batch of {args.batch_size} names)")
+   for size in args.sizes:
+       result = run(size, args.lookups, args.batch_size, args.seed)
+       print(f"{result['size']:>10} {result['build_seconds']:>10.2f} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+   main()
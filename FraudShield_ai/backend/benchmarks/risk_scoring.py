@@ -0,0 +1,100 @@
+# --- risk_scoring.py ---
+# Throughput benchmark for the aggregation job's risk-scoring stage.
+# Scores a run's worth of synthetic feed items one by one (as separate /verify calls
+# would), in batches in-process, and in batches on a process pool, then re-scores
+# the same items to show the cached path.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.risk_scoring --items 5000 --workers 8
+
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import random
+import sys
+import time
+from pathlib import Path
+
+
+from app.services.verification_orchestrator import VerificationOrchestrator
+from benchmarks.verify_load import SAMPLE_TEXTS
+
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "data_ingestion"))
+from risk_scoring import RiskScorer, item_text  # noqa: E402
+
+
+def synthetic_items(count: int, duplicate_share: float, rng: random.Random) -> list:
+   """
+   Feed items built from the sample texts; `duplicate_share` of them repeat an earlier text,
+   like a post reposted across sources.
+   """
+   items = []
+   for i in range(count):
+       if items and rng.random() < duplicate_share:
+           title = rng.choice(items)["title"]
+       else:
+           title = f"{rng.choice(SAMPLE_TEXTS)} #{i}"
+       items.append({"source": "Telegram Group", "title": title, "content": "", "link": "#", "risk_level": "Low"})
+   return items
+
+
+def score_one_by_one(items: list) -> float:
+   orchestrator = VerificationOrchestrator(max_workers=1, media_max_workers=1, cache=None)
+   start = time.perf_counter()
+   for item in items:
+       orchestrator.process_batch([item_text(item)])
+   return time.perf_counter() - start
+
+
+def score_with(scorer: RiskScorer, items: list) -> tuple:
+   start = time.perf_counter()
+   result = scorer.score(items)
+   return time.perf_counter() - start, result
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Risk scoring of ingested items.")
+   parser.add_argument("--items", type=int, default=5000)
+   parser.add_argument("--duplicates", type=float, default=0.2)
+   parser.add_argument("--workers", type=int, default=max(2, multiprocessing.cpu_count()))
+   args = parser.parse_args()
+
+   rng = random.Random(11)
+   items = synthetic_items(args.items, args.duplicates, rng)
+   print(f"{args.items} items ({args.duplicates:.0%} reposts), {multiprocessing.cpu_count()} CPUs")
+   print(f"{'mode':<32} {'seconds':>8} {'items/s':>9} {'verified':>9}")
+
+   def report(name: str, seconds: float, verified):
+       print(f"{name:<32} {seconds:>8.2f} {args.items / seconds:>9.0f} {verified:>9}")
+
+   # The services print progress lines per call; keep them out of the report.
+   with contextlib.redirect_stdout(io.StringIO()):
+       seconds = score_one_by_one(items)
+   report("one text per call", seconds, args.items)
+
+   scorer = RiskScorer(workers=1, in_process_max=args.items)
+   with contextlib.redirect_stdout(io.StringIO()):
+       seconds, result = score_with(scorer, [dict(item) for item in items])
+   report("batched, in-process", seconds, result["verified"])
+   with contextlib.redirect_stdout(io.StringIO()):
+       seconds, result = score_with(scorer, [dict(item) for item in items])
+   report("batched, cached re-run", seconds, result["verified"])
+
+   scorer = RiskScorer(workers=args.workers, in_process_max=0)
+   try:
+       with contextlib.redirect_stdout(io.StringIO()):
+           seconds, result = score_with(scorer, [dict(item) for item in items])
+       report(f"pool of {args.workers} (incl. start-up)", seconds, result["verified"])
+       scorer.cache.invalidate()
+       with contextlib.redirect_stdout(io.StringIO()):
+           seconds, result = score_with(scorer, [dict(item) for item in items])
+       report(f"pool of {args.workers} (warm)", seconds, result["verified"])
+   finally:
+       scorer.close()
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,136 @@
+# --- serialization.py ---
+# Benchmark for response serialization: how long building the JSON body of a response takes.
+# 1. A 100k-item dashboard feed, and pages of it, serialized:
+#    - as FastAPI does for a returned dict (jsonable_encoder, then JSONResponse),
+#    - through a response model (validation, then Pydantic's JSON serializer; FastAPI's path
+#      when a route declares a response_model),
+#    - with FastJSONResponse (app/core/responses.py),
+#    - from bytes serialized beforehand (the cached feed body, encoded feed items).
+# 2. The same for a single /verify result, which is small but served at high QPS.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.serialization --items 100000
+
+
+import argparse
+import random
+import time
+
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+
+from app.api.schemas import FeedItem, FeedPage, VerificationResult
+from app.core import responses
+from app.core.responses import FastJSONResponse
+from app.services.feed_index import FeedIndex
+from app.services.feed_log import encode_item, lines_to_json_array
+from app.services.verification_orchestrator import verification_orchestrator
+from benchmarks.common import percentile
+from benchmarks.feed_queries import synthetic_feed
+
+
+def timed(function, repeat: int) -> float:
+   """
+   Median seconds per call of `function` over `repeat` calls.
+   """
+   durations = []
+   for _ in range(repeat):
+       start = time.perf_counter()
+       function()
+       durations.append(time.perf_counter() - start)
+   return percentile(durations, 50)
+
+
+def scored_feed(count: int, rng: random.Random) -> list:
+   # Feed items as the ingestion job writes them: scored, and some clustered into campaigns.
+   items = synthetic_feed(count, rng)
+   for item in items:
+       item["risk_score"] = rng.randrange(100)
+       if rng.random() < 0.3:
+           item["campaign_id"] = rng.randrange(count // 10 or 1)
+           item["campaign_size"] = rng.randrange(2, 50)
+   return items
+
+
+def sample_result() -> dict:
+   result = verification_orchestrator.process_batch(["URGENT: 'Innovate Corp' projects 500% growth. Act now, risk-free!"])[0]
+   result["deepfake_analysis"] = {
+       "is_deepfake": True,
+       "confidence": 0.87,
+       "details": "Suspicious artifacts detected in facial regions.",
+       "transcribed_text": "We are projecting a 500% growth next quarter.",
+       "flagged_segments": [{"start": 12.4, "end": 15.9, "text": "This is a risk-free opportunity.", "flags": ["Promissory Language"]}]
+   }
+   return result
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Cost of serializing feed and verification responses.")
+   parser.add_argument("--items", type=int, default=100_000)
+   parser.add_argument("--page-size", type=int, default=50)
+   parser.add_argument("--repeat", type=int, default=5)
+   args = parser.parse_args()
+   rng = random.Random(7)
+
+   items = scored_feed(args.items, rng)
+   body = lines_to_json_array(b"\n".join(encode_item(item) for item in items))
+   feed_adapter = TypeAdapter(list[FeedItem])
+   page_adapter = TypeAdapter(FeedPage)
+   result_adapter = TypeAdapter(VerificationResult)
+   # The models must accept what the services actually return.
+   feed_adapter.validate_python(items)
+   print(f"orjson {'installed' if responses.orjson is not None else 'not installed (Pydantic serializer)'}")
+
+   print(f"\n{args.items:,}-item feed, {len(body) / 2**20:.1f} MB")
+   print(f"{'method':<44} {'ms':>9} {'MB/s':>8}")
+   methods = [
+       ("jsonable_encoder + JSONResponse (before)", lambda: JSONResponse(jsonable_encoder(items))),
+       ("response model (validate + dump_json)", lambda: feed_adapter.dump_json(feed_adapter.validate_python(items))),
+       ("pydantic_core.to_json", lambda: to_json(items)),
+       ("FastJSONResponse", lambda: FastJSONResponse(items)),
+       ("FastJSONResponse, pre-serialized body", lambda: FastJSONResponse(body))
+   ]
+   for name, function in methods:
+       seconds = timed(function, args.repeat)
+       print(f"{name:<44} {seconds * 1000:>9.2f} {len(body) / 2**20 / seconds:>8.0f}")
+
+   index = FeedIndex(items)
+   page = index.query(risk_level="High", limit=args.page_size)
+   cold = FeedIndex(items)
+   start = time.perf_counter()
+   cold.query_json(risk_level="High", limit=args.page_size)
+   first = time.perf_counter() - start
+   repeat = args.repeat * 200
+   print(f"\nfeed page of {args.page_size} items (?risk_level=High)")
+   print(f"{'method':<44} {'us':>9}")
+   methods = [
+       ("query + jsonable_encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(index.query(risk_level="High", limit=args.page_size)))),
+       ("query + response model", lambda: page_adapter.dump_json(page_adapter.validate_python(index.query(risk_level="High", limit=args.page_size)))),
+       ("query + FastJSONResponse", lambda: FastJSONResponse(index.query(risk_level="High", limit=args.page_size))),
+       ("query_json, encoded items kept", lambda: FastJSONResponse(cold.query_json(risk_level="High", limit=args.page_size)))
+   ]
+   for name, function in methods:
+       print(f"{name:<44} {timed(function, repeat) * 1e6:>9.1f}")
+   print(f"{'query_json, first call (items encoded)':<44} {first * 1e6:>9.1f}")
+   assert page_adapter.validate_json(cold.query_json(risk_level="High", limit=args.page_size)) == page_adapter.validate_python(page)
+
+   result = sample_result()
+   result_adapter.validate_python(result)
+   repeat = args.repeat * 2000
+   print(f"\n/verify result ({len(responses.dumps(result))} bytes)")
+   print(f"{'method':<44} {'us':>9}")
+   methods = [
+       ("jsonable_encoder + JSONResponse (before)", lambda: JSONResponse(jsonable_encoder(result))),
+       ("response model (validate + dump_json)", lambda: result_adapter.dump_json(result_adapter.validate_python(result))),
+       ("FastJSONResponse", lambda: FastJSONResponse(result))
+   ]
+   for name, function in methods:
+       print(f"{name:<44} {timed(function, repeat) * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,152 @@
+# --- speech_pipeline.py ---
+# CPU benchmark for chunked speech-to-text (app/services/speech_pipeline.py).
+# Writes a long synthetic recording (44.1 kHz, "speech" as tone bursts, pauses as a low noise
+# floor), then transcribes it with a stand-in model whose cost grows with the audio it is given:
+# 1. In a single pass, the whole file decoded into memory first.
+# 2. In overlapping windows, without and with the voice-activity detector, for several worker counts.
+# Reports the real-time factor (processing time / audio duration, lower is better), the time
+# to the first transcript segment and the peak memory allocated (tracemalloc).
+#
+# The stand-in model does its work in NumPy, which releases the GIL like a native runtime, so
+# workers only help on a machine with more than one core; the number of CPUs is printed.
+# Pass --model to use a faster-whisper model instead (e.g. --model tiny.en).
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.speech_pipeline --minutes 10 --speech-share 0.6
+
+
+import argparse
+import math
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+import av
+import numpy as np
+
+
+from app.services.deepfake_service import deepfake_service
+from app.services.speech_pipeline import SAMPLE_RATE, SpeechConfig, SpeechPipeline, read_audio_windows
+
+
+def write_audio(path: str, minutes: float, speech_share: float, rate: int = 44100, period: float = 90.0):
+   """
+   Writes `minutes` of mono 16-bit audio: in every `period` seconds, a tone for `speech_share`
+   of the time and a -60 dBFS noise floor for the rest.
+   """
+   container = av.open(path, "w")
+   stream = container.add_stream("pcm_s16le", rate=rate)
+   stream.layout = "mono"
+   rng = np.random.default_rng(7)
+   total = int(minutes * 60 * rate)
+   block = rate
+   for begin in range(0, total, block):
+       t = np.arange(begin, min(total, begin + block)) / rate
+       samples = 0.3 * np.sin(2 * np.pi * 220 * t) * ((t % period) < speech_share * period)
+       samples += rng.normal(0, 0.001, len(t))
+       frame = av.AudioFrame.from_ndarray((samples * 32767).astype(np.int16).reshape(1, -1), format="s16", layout="mono")
+       frame.sample_rate = rate
+       for packet in stream.encode(frame):
+           container.mux(packet)
+   for packet in stream.encode(None):
+       container.mux(packet)
+   container.close()
+
+
+def stand_in_model(ms_per_audio_second: float):
+   """
+   A model substitute: burns about `ms_per_audio_second` of CPU per second of audio in NumPy
+   matrix products, and returns one segment per 5 seconds of audio.
+   """
+   work = np.random.default_rng(7).random((128, 128), dtype=np.float32)
+   start = time.perf_counter()
+   for _ in range(200):
+       work @ work
+   products_per_ms = 200 / ((time.perf_counter() - start) * 1000)
+
+   def transcribe(samples):
+       seconds = len(samples) / SAMPLE_RATE
+       for _ in range(math.ceil(seconds * ms_per_audio_second * products_per_ms)):
+           work @ work
+       return [(float(t), min(seconds, t + 4.5), f"words at {t:.0f}s") for t in np.arange(0, seconds, 5.0)]
+
+   return transcribe
+
+
+def single_pass(path: str, model) -> tuple:
+   """
+   Decodes the whole file, then transcribes it in one call. Returns (first_segment_seconds, segments).
+   """
+   start = time.perf_counter()
+   windows = read_audio_windows(path, chunk_seconds=1e9, overlap_seconds=0)
+   samples = np.concatenate([window for _, window, _ in windows])
+   segments = model(samples)
+   return time.perf_counter() - start, len(segments)
+
+
+def chunked(path: str, model, config: SpeechConfig, stats: dict) -> tuple:
+   pipeline = SpeechPipeline(config)
+   start = time.perf_counter()
+   first = None
+   count = 0
+   try:
+       for _ in pipeline.segments(path, model, stats):
+           if first is None:
+               first = time.perf_counter() - start
+           count += 1
+   finally:
+       pipeline.close()
+   return first, count
+
+
+def measure(run) -> tuple:
+   tracemalloc.start()
+   start = time.perf_counter()
+   first, segments = run()
+   elapsed = time.perf_counter() - start
+   _, peak = tracemalloc.get_traced_memory()
+   tracemalloc.stop()
+   return elapsed, first, segments, peak / 2**20
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Real-time factor of chunked speech-to-text on CPU.")
+   parser.add_argument("--minutes", type=float, default=10)
+   parser.add_argument("--speech-share", type=float, default=0.6, help="Share of the recording that is not a pause.")
+   parser.add_argument("--model-ms-per-audio-second", type=float, default=50.0)
+   parser.add_argument("--model", help="faster-whisper model name (the stand-in model is used otherwise).")
+   parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+   args = parser.parse_args()
+
+   if args.model:
+       model = deepfake_service.load_stt_model(args.model)
+       if model is None:
+           raise SystemExit(f"Could not load {args.model}.")
+   else:
+       model = stand_in_model(args.model_ms_per_audio_second)
+
+   with tempfile.TemporaryDirectory() as tmp_dir:
+       path = os.path.join(tmp_dir, "call.wav")
+       write_audio(path, args.minutes, args.speech_share)
+       audio_seconds = args.minutes * 60
+       print(f"{args.minutes:g} min of audio, {args.speech_share:.0%} speech, {os.cpu_count()} CPU(s)")
+       print(f"{'mode':<22} {'workers':>7} {'wall s':>8} {'RTF':>7} {'first seg s':>12} {'segments':>9} {'speech s':>9} {'peak MB':>8}")
+
+       elapsed, first, segments, peak = measure(lambda: single_pass(path, model))
+       print(f"{'single pass':<22} {1:>7} {elapsed:>8.2f} {elapsed / audio_seconds:>7.4f} {first:>12.2f} {segments:>9} {audio_seconds:>9.0f} {peak:>8.1f}")
+
+       runs = [("chunked, no VAD", -math.inf, 1)] + [("chunked + VAD", -40.0, workers) for workers in args.workers]
+       for label, threshold, workers in runs:
+           stats = {}
+           config = SpeechConfig(workers=workers, vad_threshold_db=threshold)
+           elapsed, first, segments, peak = measure(lambda: chunked(path, model, config, stats))
+           print(
+               f"{label:<22} {workers:>7} {elapsed:>8.2f} {elapsed / audio_seconds:>7.4f} {first:>12.2f} "
+               f"{segments:>9} {stats['speech_seconds']:>9.0f} {peak:>8.1f}"
+           )
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,334 @@
+# --- suite.py ---
+# Reproducible benchmark suite for the verification pipeline and the API.
+# 1. Micro-benchmarks of the pipeline's building blocks over synthetic corpora of several
+#    sizes: NLPService.analyze_text_for_anomalies (and analyze_batch), CrossVerifier.verify_claims
+#    against official-records stores of several sizes, and the final risk calculation.
+# 2. A load test of the FastAPI app, in-process (no network), with mixed text, file and
+#    dashboard feed traffic, reporting throughput and latency percentiles per kind of request.
+# Every number is written to a JSON file along with the commit, Python version and CPU count,
+# and `--compare` prints the change against an earlier file.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.suite
+#   python -m benchmarks.suite --quick --only micro
+#   python -m benchmarks.suite --compare benchmarks/results/<earlier run>.json
+
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+
+import httpx
+
+
+from app.api.endpoints import dashboard
+from app.core.rate_limit import rate_limiter
+from app.main import app
+from app.services.cross_verifier import CrossVerifier
+from app.services.feed_cache import FeedCache
+from app.services.feed_log import FeedLog
+from app.services.model_registry import model_registry
+from app.services.nlp_service import nlp_service
+from app.services.official_records import OfficialRecordsStore
+from app.services.verification_orchestrator import verification_orchestrator
+from benchmarks.common import run_metadata, summarize, write_results
+from benchmarks.feed_queries import synthetic_feed
+from benchmarks.records_lookup import synthetic_companies
+
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+SCAM_PHRASES = ["guaranteed profit", "risk-free", "insider tip", "act now", "urgent", "to the moon", "double your money"]
+FILLER = (
+   "the board met on tuesday to review quarterly results and discuss the outlook for the coming "
+   "year including capital expenditure dividend policy and the status of ongoing projects"
+).split()
+
+
+def synthetic_text(chars: int, companies: list, rng: random.Random) -> str:
+   """
+   A post of about `chars` characters: filler words with, now and then, a scam phrase,
+   a quoted company name or a percentage claim, like the posts the pipeline screens.
+   """
+   words = []
+   length = 0
+   while length < chars:
+       roll = rng.random()
+       if roll < 0.04:
+           word = rng.choice(SCAM_PHRASES)
+       elif roll < 0.07:
+           word = f"'{rng.choice(companies)['name']}'"
+       elif roll < 0.09:
+           word = f"{rng.randint(1, 900)}%"
+       else:
+           word = rng.choice(FILLER)
+       words.append(word)
+       length += len(word) + 1
+   return " ".join(words)
+
+
+def time_calls(function, inputs: list) -> tuple:
+   """
+   Calls `function` once per input. Returns the per-call durations and the total time.
+   """
+   durations = []
+   start = time.perf_counter()
+   for value in inputs:
+       call_start = time.perf_counter()
+       function(value)
+       durations.append(time.perf_counter() - call_start)
+   return durations, time.perf_counter() - start
+
+
+def entry(name: str, params: dict, durations: list, total: float, items: int) -> dict:
+   return {"name": name, "params": params, **summarize(durations), "throughput_per_s": round(items / total, 1) if total else None}
+
+
+# --- Micro-benchmarks ---
+
+def bench_nlp(corpus_sizes: list, text_lengths: list, rng: random.Random) -> list:
+   companies = synthetic_companies(200, rng)
+   nlp_service.analyze_text_for_anomalies("warm up the lexicon")
+   results = []
+   for chars in text_lengths:
+       for size in corpus_sizes:
+           texts = [synthetic_text(chars, companies, rng) for _ in range(size)]
+           params = {"texts": size, "chars": chars}
+           durations, total = time_calls(nlp_service.analyze_text_for_anomalies, texts)
+           results.append(entry("nlp.analyze_text_for_anomalies", params, durations, total, size))
+           # The micro-batched path: batches of the size /verify requests are grouped into.
+           batches = [texts[start:start + 32] for start in range(0, size, 32)]
+           durations, total = time_calls(nlp_service.analyze_batch, batches)
+           results.append(entry("nlp.analyze_batch[32]", params, durations, total, size))
+   return results
+
+
+def bench_cross_verifier(store_sizes: list, calls: int, rng: random.Random) -> list:
+   results = []
+   for size in store_sizes:
+       companies = synthetic_companies(size, rng)
+       store = OfficialRecordsStore()
+       store.replace_all(companies)
+       verifier = CrossVerifier(store)
+       for organizations in (1, 5):
+           requests = []
+           for _ in range(calls):
+               mentions = []
+               for company in rng.sample(companies, organizations):
+                   kind = rng.random()
+                   if kind < 0.5:
+                       mentions.append(company["name"])
+                   elif kind < 0.8:
+                       mentions.append(company["name"].upper().replace(" LTD", " LIMITED"))
+                   else:
+                       mentions.append(f"Unknown {rng.randrange(10**9)} Corp")
+               requests.append({"organizations": mentions, "percentages": [f"{rng.randint(1, 900)}%"]})
+           # The first call per store builds the fuzzy name index; it is timed separately.
+           start = time.perf_counter()
+           verifier.verify_claims(requests[0])
+           first_call = time.perf_counter() - start
+           durations, total = time_calls(verifier.verify_claims, requests[1:])
+           result = entry("cross_verifier.verify_claims", {"companies": size, "organizations": organizations}, durations, total, len(durations))
+           result["first_call_ms"] = round(first_call * 1000, 3)
+           results.append(result)
+       store.close()
+   return results
+
+
+def bench_final_risk(corpus_sizes: list, rng: random.Random) -> list:
+   results = []
+   for size in corpus_sizes:
+       cases = []
+       for _ in range(size):
+           flagged = rng.random() < 0.5
+           cases.append({
+               "risk_score": 0,
+               "risk_level": "Low",
+               "summary": "",
+               "deepfake_analysis": {"is_deepfake": flagged, "confidence": rng.random()} if rng.random() < 0.2 else None,
+               "text_analysis": {"flags": rng.sample(SCAM_PHRASES, rng.randint(0, 3))},
+               "cross_verification": {"is_verified": not flagged, "flags": ["Claim Mismatch"] * rng.randint(0, 2)}
+           })
+       durations, total = time_calls(verification_orchestrator._calculate_final_risk, copy.deepcopy(cases))
+       results.append(entry("orchestrator._calculate_final_risk", {"results": size}, durations, total, size))
+   return results
+
+
+# --- Load test ---
+
+def use_synthetic_feed(items: int, rng: random.Random) -> tempfile.TemporaryDirectory:
+   """
+   Points the dashboard endpoints at a feed log of `items` synthetic items.
+   """
+   tmp_dir = tempfile.TemporaryDirectory()
+   log_dir = Path(tmp_dir.name) / "feed_log"
+   FeedLog(log_dir).append(synthetic_feed(items, rng))
+   dashboard.feed_cache = FeedCache(Path(tmp_dir.name) / "aggregated_feed.json", 1.0, log_dir)
+   return tmp_dir
+
+
+async def run_load(total_requests: int, concurrency: int, mix: dict, repeat_share: float, rng: random.Random) -> dict:
+   """
+   Sends `total_requests` requests, at most `concurrency` at a time, through an in-process
+   ASGI transport. Returns the latencies per kind of request and the wall time.
+   """
+   companies = synthetic_companies(200, rng)
+   kinds = rng.choices(list(mix), weights=list(mix.values()), k=total_requests)
+   feed_requests = {
+       "feed_full": ("/api/dashboard/feed", {}),
+       "feed_page": ("/api/dashboard/feed", {"risk_level": "High", "limit": 50}),
+       "feed_latest": ("/api/dashboard/feed/latest", {"n": 50})
+   }
+   seen_texts = []
+   latencies = {}
+   errors = {}
+   semaphore = asyncio.Semaphore(concurrency)
+
+   def build(kind: str) -> tuple:
+       if kind == "text":
+           # Some posts are reposts, answered from the result cache.
+           if seen_texts and rng.random() < repeat_share:
+               text = rng.choice(seen_texts)
+           else:
+               text = synthetic_text(rng.choice([140, 600]), companies, rng)
+               seen_texts.append(text)
+           return "text", ("POST", "/api/verification/verify", {"data": {"text": text}})
+       if kind == "file":
+           # Distinct bytes per upload, so none of them is a cache hit.
+           return "file", ("POST", "/api/verification/verify", {"files": {"file": ("clip.mp4", os.urandom(64 * 1024), "video/mp4")}})
+       name = rng.choice(list(feed_requests))
+       path, params = feed_requests[name]
+       return name, ("GET", path, {"params": params})
+
+   async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+
+       async def one_request(kind: str):
+           name, (method, path, kwargs) = build(kind)
+           async with semaphore:
+               start = time.perf_counter()
+               response = await client.request(method, path, **kwargs)
+               elapsed = time.perf_counter() - start
+           if response.status_code >= 400:
+               errors[name] = errors.get(name, 0) + 1
+           else:
+               latencies.setdefault(name, []).append(elapsed)
+
+       start = time.perf_counter()
+       await asyncio.gather(*(one_request(kind) for kind in kinds))
+       wall_time = time.perf_counter() - start
+
+   return {"latencies": latencies, "errors": errors, "wall_time": wall_time}
+
+
+def load_results(load: dict, params: dict) -> list:
+   results = []
+   for name, durations in sorted(load["latencies"].items()):
+       result = {"name": f"load.{name}", "params": params, **summarize(durations)}
+       result["errors"] = load["errors"].get(name, 0)
+       results.append(result)
+   total = sum(len(durations) for durations in load["latencies"].values())
+   results.append({
+       "name": "load.all",
+       "params": params,
+       "count": total,
+       "errors": sum(load["errors"].values()),
+       "wall_time_s": round(load["wall_time"], 3),
+       "throughput_per_s": round(total / load["wall_time"], 1)
+   })
+   return results
+
+
+# --- Reporting ---
+
+def key(result: dict) -> str:
+   return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def print_results(results: list, previous: dict = None):
+   print(f"{'benchmark':<38} {'params':<34} {'p50 ms':>9} {'p99 ms':>9} {'per s':>10} {'vs. before':>11}")
+   for result in results:
+       params = ",".join(f"{name}={value}" for name, value in result["params"].items())
+       change = ""
+       before = (previous or {}).get(key(result))
+       if before:
+           metric = "p50_ms" if "p50_ms" in result else "throughput_per_s"
+           if before.get(metric):
+               change = f"{(result[metric] / before[metric] - 1) * 100:+.1f}%"
+       print(
+           f"{result['name']:<38} {params:<34} {result.get('p50_ms', ''):>9} {result.get('p99_ms', ''):>9} "
+           f"{result.get('throughput_per_s') or '':>10} {change:>11}"
+       )
+
+
+def parse_mix(value: str) -> dict:
+   mix = {}
+   for part in value.split(","):
+       name, _, weight = part.partition("=")
+       if name not in ("text", "file", "feed"):
+           raise argparse.ArgumentTypeError(f"Unknown traffic kind '{name}'.")
+       mix[name] = float(weight)
+   return mix
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Benchmark suite: pipeline micro-benchmarks and an API load test.")
+   parser.add_argument("--only", choices=["micro", "load"], help="Run only one part.")
+   parser.add_argument("--quick", action="store_true", help="Smaller corpora and fewer requests, for a smoke run.")
+   parser.add_argument("--requests", type=int, default=2000)
+   parser.add_argument("--concurrency", type=int, default=32)
+   parser.add_argument("--mix", type=parse_mix, default="text=0.6,file=0.02,feed=0.38",
+                       help="Relative share of text, file and feed requests.")
+   parser.add_argument("--repeat-share", type=float, default=0.3, help="Share of text requests that repeat an earlier text.")
+   parser.add_argument("--feed-items", type=int, default=20_000)
+   parser.add_argument("--seed", type=int, default=7)
+   parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/<time>-<commit>.json).")
+   parser.add_argument("--compare", type=Path, help="An earlier result file to compare against.")
+   args = parser.parse_args()
+
+   scale = 10 if args.quick else 1
+   corpus_sizes = [100 // scale, 1000 // scale, 10_000 // scale]
+   store_sizes = [1000 // scale, 10_000 // scale, 100_000 // scale]
+   requests = args.requests // scale
+   rng = random.Random(args.seed)
+   meta = run_metadata()
+   results = []
+
+   if args.only != "load":
+       print("Running micro-benchmarks...")
+       results += bench_nlp(corpus_sizes, [140, 2000], rng)
+       results += bench_cross_verifier(store_sizes, 2000 // scale, rng)
+       results += bench_final_risk(corpus_sizes, rng)
+
+   if args.only != "micro":
+       print(f"Running the load test ({requests} requests, {args.concurrency} concurrent)...")
+       model_registry.warm_up()
+       # All traffic comes from one client; the load test measures the pipeline, not the limits.
+       rate_limiter.enabled = False
+       tmp_dir = use_synthetic_feed(args.feed_items // scale, rng)
+       try:
+           load = asyncio.run(run_load(requests, args.concurrency, args.mix, args.repeat_share, rng))
+       finally:
+           tmp_dir.cleanup()
+       params = {"requests": requests, "concurrency": args.concurrency, "feed_items": args.feed_items // scale}
+       results += load_results(load, params)
+
+   previous = None
+   if args.compare:
+       with open(args.compare, "r", encoding="utf-8") as f:
+           previous = {key(result): result for result in json.load(f)["results"]}
+   print_results(results, previous)
+
+   output = args.output or RESULTS_DIR / f"{meta['timestamp'].replace(':', '')}-{meta['commit'] or 'unknown'}.json"
+   write_results(output, {"meta": meta, "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()}, "results": results})
+   print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,89 @@
+# --- upload_memory.py ---
+# Memory benchmark for streaming uploads to /api/verification/verify.
+# Uploads generated files of increasing size and samples the process RSS while each
+# request is in flight, to check that peak memory does not grow with file size.
+# RSS is read from /proc, so this benchmark runs on Linux only.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.upload_memory --sizes-mb 10 100 500
+
+
+import argparse
+import io
+import threading
+import time
+
+
+import httpx
+
+
+from app.main import app
+from benchmarks.common import start_server
+
+
+class GeneratedFile(io.RawIOBase):
+   """
+   A read-only file of `size` bytes produced on the fly, so the client never holds it in memory.
+   """
+
+   def __init__(self, size: int):
+       self.remaining = size
+
+   def readable(self) -> bool:
+       return True
+
+   def readinto(self, buffer) -> int:
+       count = min(len(buffer), self.remaining)
+       buffer[:count] = b"\x00" * count
+       self.remaining -= count
+       return count
+
+
+def current_rss_mb() -> float:
+   with open("/proc/self/status") as f:
+       for line in f:
+           if line.startswith("VmRSS:"):
+               return int(line.split()[1]) / 1024
+   return 0.0
+
+
+def upload_peak_rss(base_url: str, size: int) -> tuple:
+   samples = []
+   done = threading.Event()
+
+   def sample():
+       while not done.is_set():
+           samples.append(current_rss_mb())
+           time.sleep(0.01)
+
+   baseline = current_rss_mb()
+   sampler = threading.Thread(target=sample, daemon=True)
+   sampler.start()
+   start = time.perf_counter()
+   with httpx.Client(base_url=base_url, timeout=None) as client:
+       response = client.post("/api/verification/verify", files={"file": ("clip.mp4", GeneratedFile(size), "video/mp4")})
+       response.raise_for_status()
+   elapsed = time.perf_counter() - start
+   done.set()
+   sampler.join()
+   return max(samples, default=baseline) - baseline, elapsed
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Peak RSS while streaming uploads of increasing size.")
+   parser.add_argument("--sizes-mb", type=int, nargs="+", default=[10, 100, 500])
+   args = parser.parse_args()
+
+   server, thread, base_url = start_server(app)
+   try:
+       print(f"{'upload (MB)':>12} {'peak RSS delta (MB)':>20} {'seconds':>8}")
+       for size_mb in args.sizes_mb:
+           delta, elapsed = upload_peak_rss(base_url, size_mb * 1024 * 1024)
+           print(f"{size_mb:>12} {delta:>20.1f} {elapsed:>8.2f}")
+   finally:
+       server.should_exit = True
+       thread.join()
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,152 @@
+# --- verify_load.py ---
+# Load benchmark for the /api/verification/verify endpoint.
+# It serves the app with uvicorn in a background thread, fires a mix of text-only,
+# file-upload and text-plus-file requests at it and reports, for each kind of traffic,
+# p50/p99 latency to the first result and to the complete response.
+#
+# Run from the `backend/` directory:
+#   python -m benchmarks.verify_load --requests 40 --concurrency 20 --file-ratio 0.25 --mixed-ratio 0.25
+#
+# `--mode blocking` serves the requests through the old synchronous pipeline
+# (the handler calls the orchestrator directly on the event loop), `--mode async`
+# through the real router and `--mode stream` through the router with `?stream=true`,
+# where the first result is the first NDJSON event. `--mode both` runs blocking and
+# async one after the other for comparison, `--mode all` all three.
+
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+
+import httpx
+from fastapi import FastAPI, File, Form, UploadFile
+from typing import Optional
+
+
+from app.main import app as async_app
+from app.services.verification_orchestrator import verification_orchestrator
+from benchmarks.common import percentile, start_server
+
+
+SAMPLE_TEXTS = [
+   "URGENT: 'Innovate Corp' is projecting 500% growth. Act now, this is risk-free!",
+   "Quarterly results for 'FutureTech Ltd' are in line with guidance.",
+   "Insider tip: buy before Friday for a guaranteed profit.",
+   "The board has scheduled the AGM for next month.",
+]
+
+
+def build_blocking_app() -> FastAPI:
+   """
+   Builds an app that serves /verify the way it worked before the async pipeline:
+   the synchronous orchestrator is called directly inside the async handler.
+   """
+   blocking_app = FastAPI()
+
+   @blocking_app.post("/api/verification/verify")
+   async def verify_content(text: Optional[str] = Form(None), file: Optional[UploadFile] = File(None)):
+       return verification_orchestrator.process_verification_request(text=text, file=file)
+
+   return blocking_app
+
+
+def pick_kind(rng: random.Random, file_ratio: float, mixed_ratio: float) -> str:
+   draw = rng.random()
+   if draw < file_ratio:
+       return "file"
+   if draw < file_ratio + mixed_ratio:
+       return "text+file"
+   return "text"
+
+
+async def run_load(base_url: str, total_requests: int, concurrency: int, file_ratio: float, seed: int,
+                   mixed_ratio: float = 0.0, stream: bool = False) -> dict:
+   """
+   Sends `total_requests` requests with at most `concurrency` in flight and returns the
+   latencies (in seconds) to the first result and to the complete response, grouped by
+   request kind. Without `stream` the first result is the complete response.
+   """
+   rng = random.Random(seed)
+   kinds = [pick_kind(rng, file_ratio, mixed_ratio) for _ in range(total_requests)]
+   latencies = {kind: [] for kind in ("text", "file", "text+file")}
+   first_results = {kind: [] for kind in latencies}
+   semaphore = asyncio.Semaphore(concurrency)
+   url = "/api/verification/verify?stream=true" if stream else "/api/verification/verify"
+
+   limits = httpx.Limits(max_connections=concurrency)
+   async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+
+       async def one_request(kind: str):
+           async with semaphore:
+               kwargs = {}
+               if kind != "text":
+                   # Distinct bytes, so no upload is a result cache hit.
+                   kwargs["files"] = {"file": ("clip.mp4", os.urandom(1024), "video/mp4")}
+               if kind != "file":
+                   kwargs["data"] = {"text": rng.choice(SAMPLE_TEXTS)}
+               start = time.perf_counter()
+               first = None
+               async with client.stream("POST", url, **kwargs) as response:
+                   response.raise_for_status()
+                   async for line in response.aiter_lines():
+                       if first is None:
+                           first = time.perf_counter() - start
+                       if stream and json.loads(line)["event"] == "error":
+                           raise RuntimeError("The verification failed.")
+               latencies[kind].append(time.perf_counter() - start)
+               first_results[kind].append(first if stream else latencies[kind][-1])
+
+       start = time.perf_counter()
+       await asyncio.gather(*(one_request(kind) for kind in kinds))
+       wall_time = time.perf_counter() - start
+
+   return {"latencies": latencies, "first_results": first_results, "wall_time": wall_time}
+
+
+def report(mode: str, results: dict):
+   print(f"\n=== mode: {mode} (wall time {results['wall_time']:.2f}s) ===")
+   print(
+       f"{'kind':<10} {'count':>6} {'first p50':>10} {'first p99':>10} "
+       f"{'p50 (ms)':>10} {'p99 (ms)':>10} {'mean (ms)':>10}"
+   )
+   for kind, values in results["latencies"].items():
+       if not values:
+           continue
+       first = results["first_results"][kind]
+       print(
+           f"{kind:<10} {len(values):>6} {percentile(first, 50) * 1000:>10.1f} {percentile(first, 99) * 1000:>10.1f} "
+           f"{percentile(values, 50) * 1000:>10.1f} {percentile(values, 99) * 1000:>10.1f} {statistics.mean(values) * 1000:>10.1f}"
+       )
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Load benchmark for /api/verification/verify.")
+   parser.add_argument("--mode", choices=["blocking", "async", "stream", "both", "all"], default="both")
+   parser.add_argument("--requests", type=int, default=40)
+   parser.add_argument("--concurrency", type=int, default=20)
+   parser.add_argument("--file-ratio", type=float, default=0.25)
+   parser.add_argument("--mixed-ratio", type=float, default=0.0, help="Share of requests with both text and a file.")
+   parser.add_argument("--seed", type=int, default=7)
+   args = parser.parse_args()
+
+   modes = {"both": ["blocking", "async"], "all": ["blocking", "async", "stream"]}.get(args.mode, [args.mode])
+   for mode in modes:
+       app = build_blocking_app() if mode == "blocking" else async_app
+       server, thread, base_url = start_server(app)
+       try:
+           results = asyncio.run(run_load(
+               base_url, args.requests, args.concurrency, args.file_ratio, args.seed, args.mixed_ratio, stream=mode == "stream"
+           ))
+       finally:
+           server.should_exit = True
+           thread.join()
+       report(mode, results)
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,105 @@
+# --- build_official_records.py ---
+# This script builds the indexed official-records store used by the CrossVerifier.
+# It loads the listed-company universe (a JSON export of BSE/NSE listings), attaches
+# the exchange filings collected by the aggregation job, and publishes the result as
+# a SQLite file the backend opens at startup, together with the fuzzy company-name
+# index the backend loads lazily on first use.
+#
+# Usage (from the `data_ingestion/` directory):
+#   python build_official_records.py --companies path/to/listed_companies.json
+
+
+import argparse
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+
+# Make the backend's `app` package importable when this script is run directly.
+sys.path.append(str(Path(__file__).parent.parent))
+from app.core.log import configure_logging
+from app.services.official_records import OfficialRecordsStore
+from app.services.entity_resolver import CompanyNameIndex
+from app.services.feed_log import FeedLog
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION ---
+DATA_DIR = Path(__file__).parent.parent / "app" / "data"
+DEFAULT_COMPANIES_FILE = DATA_DIR / "official_companies.json"
+FEED_LOG_DIR = DATA_DIR / "feed_log"
+LEGACY_FEED_FILE = DATA_DIR / "aggregated_feed.json"
+OUTPUT_FILE = DATA_DIR / "official_records.db"
+INDEX_FILE = DATA_DIR / "company_name_index.pkl"
+
+# Feed sources whose items are official filings.
+FILING_SOURCES = {"BSE India", "SEBI"}
+
+
+def load_feed_filings(feed_path: Path) -> list[tuple]:
+   """
+   Extracts (company_name, title, filed_at) tuples from exchange items in the aggregated feed,
+   read from the feed log directory or a legacy JSON feed file.
+   BSE announcement titles look like "COMPANY NAME LTD - 500325 - Subject".
+   """
+   if feed_path.is_dir():
+       try:
+           items = FeedLog(feed_path).read_all()
+       except FileNotFoundError:
+           return []
+   elif feed_path.is_file() and feed_path.stat().st_size > 0:
+       with open(feed_path, "r", encoding="utf-8") as f:
+           items = json.load(f)
+   else:
+       return []
+
+   filings = []
+   for item in items:
+       if item.get("source") in FILING_SOURCES and " - " in item.get("title", ""):
+           company_name = item["title"].split(" - ")[0].strip()
+           filings.append((company_name, item["title"], item.get("timestamp")))
+   return filings
+
+
+def build_store(companies_path: Path, output_path: Path, index_path: Path = INDEX_FILE, feed_path: Path = None):
+   """
+   Builds the store and name index in temporary files and atomically moves them into
+   place, so a running server never opens a half-written file.
+   """
+   logger.info("Building official records store from %s...", companies_path)
+   tmp_path = output_path.with_suffix(".db.tmp")
+   if tmp_path.exists():
+       tmp_path.unlink()
+
+   with open(companies_path, "r", encoding="utf-8") as f:
+       companies = json.load(f)
+
+   store = OfficialRecordsStore(str(tmp_path))
+   store.replace_all(companies)
+   if feed_path is None:
+       feed_path = FEED_LOG_DIR if (FEED_LOG_DIR / "manifest.json").exists() else LEGACY_FEED_FILE
+   matched = store.add_filings(load_feed_filings(feed_path))
+   index = CompanyNameIndex.from_store(store)
+   store.close()
+
+   tmp_index_path = index_path.with_suffix(".pkl.tmp")
+   index.save(tmp_index_path)
+
+   os.replace(tmp_path, output_path)
+   os.replace(tmp_index_path, index_path)
+   logger.info("Wrote %d companies and %d feed filings to %s", len(companies), matched, output_path)
+   logger.info("Wrote company name index (%d names) to %s", len(index.names), index_path)
+
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description="Build the official-records SQLite store.")
+   parser.add_argument("--companies", type=Path, default=DEFAULT_COMPANIES_FILE)
+   parser.add_argument("--output", type=Path, default=OUTPUT_FILE)
+   parser.add_argument("--index-output", type=Path, default=INDEX_FILE)
+   args = parser.parse_args()
+   configure_logging()
+   build_store(args.companies, args.output, args.index_output)
@@ -0,0 +1,292 @@
+# --- campaign_index.py ---
+# Groups feed items into campaigns of near-duplicate posts. Pump-and-dump campaigns post
+# slightly reworded copies of the same message across many channels; each new item is
+# matched against the campaigns seen so far with MinHash signatures and locality-sensitive
+# hashing (LSH), so assigning it costs a few indexed lookups whatever the number of items.
+
+
+import json
+import re
+import sqlite3
+import time
+
+
+# NumPy computes the signatures; without it, items are not clustered.
+try:
+   import numpy as np
+except ImportError:
+   np = None
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+   id INTEGER PRIMARY KEY,
+   signature BLOB NOT NULL,
+   size INTEGER NOT NULL,
+   first_seen REAL,
+   last_seen REAL,
+   verdict TEXT,
+   verdict_version TEXT
+);
+CREATE TABLE IF NOT EXISTS buckets (
+   key INTEGER NOT NULL,
+   campaign_id INTEGER NOT NULL,
+   PRIMARY KEY (key, campaign_id)
+) WITHOUT ROWID;
+"""
+
+# Indexes created before a bucket could hold several campaigns kept only the first one per key.
+MIGRATE_BUCKETS = """
+CREATE TABLE buckets_by_campaign (
+   key INTEGER NOT NULL,
+   campaign_id INTEGER NOT NULL,
+   PRIMARY KEY (key, campaign_id)
+) WITHOUT ROWID;
+INSERT INTO buckets_by_campaign (key, campaign_id) SELECT key, campaign_id FROM buckets;
+DROP TABLE buckets;
+ALTER TABLE buckets_by_campaign RENAME TO buckets;
+"""
+
+# Shingle hashes are mapped to each of the random permutations by multiply-shift hashing:
+# the top 32 bits of (a * x + b) mod 2**64, with a odd.
+HASH_SHIFT = 32
+NON_WORD_PATTERN = re.compile(r"\W+")
+
+
+def clustering_available() -> bool:
+   return np is not None
+
+
+def campaign_text(item: dict) -> str:
+   """
+   The text items are compared on: title and content, case-folded, with punctuation,
+   emoji and repeated whitespace collapsed to single spaces.
+   """
+   text = " ".join(part for part in (item.get("title"), item.get("content")) if part)
+   return NON_WORD_PATTERN.sub(" ", text.casefold()).strip()
+
+
+class CampaignIndex:
+   """
+   SQLite-backed near-duplicate index of feed items.
+
+
+   Each item's text is cut into overlapping `shingle_size`-byte shingles, summarized by a
+   MinHash signature of `num_perm` values, and the signature split into `bands`. Two texts
+   share a band with a probability that rises steeply with their Jaccard similarity, so each
+   campaign is stored under one bucket per band, keyed by a hash of the band, and a new item
+   only has to look up its own bands. The campaigns found there are checked against the
+   similarity estimated from the signatures; the item joins the most similar one at or above
+   `threshold` or starts a new campaign. Items are compared with the first member of a
+   campaign, so a campaign cannot drift away from its original message one rewording at a time.
+
+
+   Like `IngestionStateStore`, changes are only saved by `commit()`, which the job calls once
+   the items are published; `rollback()` forgets them.
+
+
+   Args:
+       db_path (str): SQLite file; in-memory if ":memory:".
+       num_perm (int): Signature length.
+       bands (int): Number of LSH bands; must divide `num_perm`. With 64 values in 16 bands,
+                    items at 0.6 similarity share a band 90% of the time, at 0.3 only 12%.
+       threshold (float): Minimum estimated similarity to join a campaign.
+       shingle_size (int): Bytes per shingle.
+       seed (int): Seed of the permutations. Signatures are only comparable with the same seed,
+                   so it must not change for an existing index.
+   """
+
+   def __init__(self, db_path: str = ":memory:", num_perm: int = 64, bands: int = 16, threshold: float = 0.6,
+                shingle_size: int = 5, seed: int = 1):
+       if np is None:
+           raise RuntimeError("NumPy is required for campaign clustering.")
+       if num_perm % bands:
+           raise ValueError("bands must divide num_perm.")
+       self.db_path = str(db_path)
+       self.num_perm = num_perm
+       self.bands = bands
+       self.threshold = threshold
+       self.shingle_size = shingle_size
+       rng = np.random.default_rng(seed)
+       self._a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+       self._b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+       # Odd multipliers combine a band's values into one 64-bit bucket key, salted per band.
+       self._row_multipliers = rng.integers(0, 1 << 63, num_perm // bands, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+       self._band_salts = rng.integers(0, 1 << 63, bands, dtype=np.uint64)
+       self._conn = sqlite3.connect(self.db_path)
+       self._conn.execute("PRAGMA journal_mode=WAL")
+       self._conn.execute("PRAGMA synchronous=NORMAL")
+       # The bucket lookups are random reads; a larger page cache keeps more of the index in memory.
+       self._conn.execute("PRAGMA cache_size=-65536")
+       self._conn.executescript(SCHEMA)
+       if sum(row[5] > 0 for row in self._conn.execute("PRAGMA table_info(buckets)")) == 1:
+           with self._conn:
+               self._conn.executescript(MIGRATE_BUCKETS)
+
+
+   def signature(self, text: str):
+       """
+       MinHash signature of a normalized text (see `campaign_text`), as `num_perm` uint32 values.
+       """
+       data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+       count = max(1, len(data) - self.shingle_size + 1)
+       # Polynomial hash of every shingle at once, mixed so that all 64 bits vary.
+       hashes = np.zeros(count, dtype=np.uint64)
+       for offset in range(min(self.shingle_size, len(data))):
+           hashes = hashes * np.uint64(257) + data[offset:offset + count]
+       hashes ^= hashes >> np.uint64(31)
+       hashes *= np.uint64(0xBF58476D1CE4E5B9)
+       # One row per permutation, all computed in place; uint64 arithmetic wraps mod 2**64.
+       permuted = np.outer(self._a, hashes)
+       permuted += self._b[:, None]
+       permuted >>= np.uint64(HASH_SHIFT)
+       return permuted.min(axis=1).astype(np.uint32)
+
+
+   def band_keys(self, signature) -> list:
+       """
+       One bucket key per band, as signed 64-bit integers (SQLite's INTEGER).
+       """
+       rows = signature.reshape(self.bands, -1).astype(np.uint64)
+       keys = (rows * self._row_multipliers).sum(axis=1, dtype=np.uint64) ^ self._band_salts
+       return keys.view(np.int64).tolist()
+
+
+   def assign(self, items: list, now: float = None) -> dict:
+       """
+       Assigns every item to a campaign and writes its `campaign_id` and `campaign_size`
+       (the number of items in the campaign, this batch included) into it.
+       Items without text get neither.
+
+
+       Returns:
+           dict: {"items", "new_campaigns", "joined"}
+       """
+       now = now or time.time()
+       assigned = []
+       added = {}
+       new_campaigns = 0
+       for item in items:
+           text = campaign_text(item)
+           if not text:
+               continue
+           signature = self.signature(text)
+           keys = self.band_keys(signature)
+           campaign_id = self._best_match(signature, keys)[0]
+           if campaign_id is None:
+               campaign_id = self._conn.execute(
+                   "INSERT INTO campaigns (signature, size, first_seen, last_seen) VALUES (?, 0, ?, ?)",
+                   (signature.tobytes(), now, now)
+               ).lastrowid
+               # A bucket key may hold several campaigns, so pruning one leaves the others findable.
+               self._conn.executemany(
+                   "INSERT OR IGNORE INTO buckets (key, campaign_id) VALUES (?, ?)",
+                   [(key, campaign_id) for key in keys]
+               )
+               new_campaigns += 1
+           added[campaign_id] = added.get(campaign_id, 0) + 1
+           assigned.append((item, campaign_id))
+
+       self._conn.executemany(
+           "UPDATE campaigns SET size = size + ?, last_seen = ? WHERE id = ?",
+           [(count, now, campaign_id) for campaign_id, count in added.items()]
+       )
+       sizes = dict(self._select("SELECT id, size FROM campaigns WHERE id IN ({})", list(added)))
+       for item, campaign_id in assigned:
+           item["campaign_id"] = campaign_id
+           item["campaign_size"] = sizes[campaign_id]
+       return {"items": len(assigned), "new_campaigns": new_campaigns, "joined": len(assigned) - new_campaigns}
+
+
+   def match(self, item: dict) -> tuple:
+       """
+       Finds the campaign an item would join, without adding it.
+
+
+       Returns:
+           tuple: (campaign_id, estimated similarity), or (None, 0.0) if it would start a new campaign.
+       """
+       text = campaign_text(item)
+       if not text:
+           return None, 0.0
+       signature = self.signature(text)
+       return self._best_match(signature, self.band_keys(signature))
+
+
+   def verdicts(self, campaign_ids: list, version: str) -> dict:
+       """
+       The stored verification results of the given campaigns, if computed against the
+       reference data `version`.
+       """
+       rows = self._select("SELECT id, verdict, verdict_version FROM campaigns WHERE id IN ({})", list(campaign_ids))
+       return {campaign_id: json.loads(verdict) for campaign_id, verdict, verdict_version in rows
+               if verdict is not None and verdict_version == version}
+
+
+   def set_verdicts(self, verdicts: dict, version: str):
+       """
+       Stores verification results by campaign ID, for later members of the campaigns to reuse.
+       """
+       self._conn.executemany(
+           "UPDATE campaigns SET verdict = ?, verdict_version = ? WHERE id = ?",
+           [(json.dumps(result), version, campaign_id) for campaign_id, result in verdicts.items()]
+       )
+
+
+   def prune(self, max_age: float, now: float = None) -> int:
+       """
+       Drops campaigns that have not grown for `max_age` seconds.
+
+
+       Returns:
+           int: The number of campaigns dropped.
+       """
+       cutoff = (now or time.time()) - max_age
+       expired = self._conn.execute("SELECT id, signature FROM campaigns WHERE last_seen < ?", (cutoff,)).fetchall()
+       # Buckets are found again from the stored signatures, which saves indexing them by campaign.
+       self._conn.executemany(
+           "DELETE FROM buckets WHERE key = ? AND campaign_id = ?",
+           [(key, campaign_id) for campaign_id, signature in expired
+            for key in self.band_keys(np.frombuffer(signature, dtype=np.uint32))]
+       )
+       self._conn.executemany("DELETE FROM campaigns WHERE id = ?", [(campaign_id,) for campaign_id, _ in expired])
+       return len(expired)
+
+
+   def commit(self):
+       self._conn.commit()
+
+
+   def rollback(self):
+       self._conn.rollback()
+
+
+   def count(self) -> int:
+       return self._conn.execute("SELECT COUNT(*) FROM campaigns").fetchone()[0]
+
+
+   def close(self):
+       self._conn.close()
+
+
+   def _best_match(self, signature, keys: list) -> tuple:
+       """
+       The most similar campaign among those sharing a bucket, as (campaign_id, similarity),
+       or (None, 0.0) if no campaign reaches the threshold.
+       """
+       candidates = [row[0] for row in self._select("SELECT DISTINCT campaign_id FROM buckets WHERE key IN ({})", keys)]
+       best_id, best_similarity = None, 0.0
+       for campaign_id, stored in self._select("SELECT id, signature FROM campaigns WHERE id IN ({})", candidates):
+           similarity = np.count_nonzero(np.frombuffer(stored, dtype=np.uint32) == signature) / self.num_perm
+           if similarity >= self.threshold and similarity > best_similarity:
+               best_id, best_similarity = campaign_id, similarity
+       return best_id, best_similarity
+
+
+   def _select(self, query: str, values: list) -> list:
+       rows = []
+       # Chunked to stay under SQLite's bound-parameter limit.
+       for start in range(0, len(values), 500):
+           chunk = values[start:start + 500]
+           rows.extend(self._conn.execute(query.format(",".join("?" * len(chunk))), chunk))
+       return rows
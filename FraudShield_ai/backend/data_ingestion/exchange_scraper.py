@@ -3,23 +3,57 @@
 # like official exchange websites or RSS feeds.
 
 
+import logging
 import feedparser
 from datetime import datetime
 
 
-def fetch_bse_announcements():
+from http_session import DEFAULT_TIMEOUT, default_session
+from ingestion_state import fetch_if_changed
+
+
+logger = logging.getLogger(__name__)
+
+
+# The official URL for BSE's corporate announcement RSS feed
+BSE_RSS_URL = "https://www.bseindia.com/corporates/ann.xml"
+SEBI_RSS_URL = "https://www.sebi.gov.in/sebirss.xml"
+
+
+def fetch_feed(url: str, session=None, timeout=DEFAULT_TIMEOUT, state=None, source: str = None):
+   """
+   Downloads an RSS feed through the shared, pooled session and parses it.
+   feedparser only parses here; letting it fetch the URL itself would open a new
+   connection every time, with no timeout or retries.
+
+
+   With an ingestion `state`, the request is conditional on the feed's last ETag /
+   Last-Modified, and None is returned if the feed has not changed since.
+   """
+   response = fetch_if_changed(session or default_session(), url, source or url, state, timeout=timeout)
+   if response is None:
+       return None
+   return feedparser.parse(response.content)
+
+
+def fetch_bse_announcements(session=None, timeout=DEFAULT_TIMEOUT, url: str = BSE_RSS_URL, state=None):
    """
    Fetches the latest corporate announcements from the BSE India's public RSS feed.
    This is the REAL implementation.
+
+
+   Errors are logged and give an empty list, except with an ingestion `state`: then they
+   are raised, so the caller discards the validators staged for the failed fetch.
    """
-   print("Fetching real-time data from BSE India RSS feed...")
-   # The official URL for BSE's corporate announcement RSS feed
-   bse_rss_url = "https://www.bseindia.com/corporates/ann.xml"
+   logger.info("Fetching real-time data from BSE India RSS feed...")
   
    items = []
    try:
-       # Use feedparser to fetch and parse the XML feed
-       feed = feedparser.parse(bse_rss_url)
+       # Fetch and parse the XML feed, unless it is unchanged since the last run
+       feed = fetch_feed(url, session, timeout, state, "BSE India")
+       if feed is None:
+           logger.info("BSE feed unchanged since the last run.")
+           return []
       
        # Loop through the first 10 entries to get the latest announcements
        for entry in feed.entries[:10]:
@@ -33,25 +67,30 @@ def fetch_bse_announcements():
                "reason": "Standard Filing"
            })
    except Exception as e:
-       print(f"Error fetching BSE RSS feed: {e}")
+       if state is not None:
+           raise
+       logger.error("Error fetching BSE RSS feed: %s", e)
        # Return an empty list if there's an error to prevent the job from crashing
        return []
 
 
-   print(f"Fetched {len(items)} items from BSE.")
+   logger.info("Fetched %d items from BSE.", len(items))
    return items
 
 
-def fetch_sebi_rss():
+def fetch_sebi_rss(session=None, timeout=DEFAULT_TIMEOUT, url: str = SEBI_RSS_URL, state=None):
    """
    Fetches the latest press releases from SEBI's public RSS feed.
+   Errors are handled as in `fetch_bse_announcements`.
    """
-   print("Fetching data from SEBI RSS feed...")
-   sebi_rss_url = "https://www.sebi.gov.in/sebirss.xml"
+   logger.info("Fetching data from SEBI RSS feed...")
   
    items = []
    try:
-       feed = feedparser.parse(sebi_rss_url)
+       feed = fetch_feed(url, session, timeout, state, "SEBI")
+       if feed is None:
+           logger.info("SEBI feed unchanged since the last run.")
+           return []
        for entry in feed.entries[:5]: # Get latest 5 entries
            items.append({
                "source": "SEBI",
@@ -63,15 +102,18 @@ def fetch_sebi_rss():
                "reason": "Official Advisory"
            })
    except Exception as e:
-       print(f"Error fetching SEBI RSS feed: {e}")
+       if state is not None:
+           raise
+       logger.error("Error fetching SEBI RSS feed: %s", e)
 
 
-   print(f"Fetched {len(items)} items from SEBI.")
+   logger.info("Fetched %d items from SEBI.", len(items))
    return items
 
 
 if __name__ == '__main__':
    # This allows you to test this script individually
+   logging.basicConfig(level=logging.INFO)
    print("--- Testing BSE Scraper ---")
    bse_data = fetch_bse_announcements()
    # Print the title of the first item if data was fetched
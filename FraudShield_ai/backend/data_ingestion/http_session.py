@@ -0,0 +1,71 @@
+# --- http_session.py ---
+# Shared HTTP plumbing for the ingestion fetchers.
+# All sources go through one requests.Session, so connections are pooled and kept alive,
+# and every request gets a timeout and retries with exponential backoff.
+
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# (connect, read) timeout in seconds, used when a fetcher is not given its own.
+DEFAULT_TIMEOUT = (3.05, 10)
+
+USER_AGENT = "MarketGuardAI-Ingestion/1.0"
+
+
+def build_session(pool_size: int = 10, retries: int = 2, backoff_factor: float = 0.5) -> requests.Session:
+   """
+   Creates a session with a keep-alive connection pool and retry policy.
+
+
+   Connection errors and 429/5xx responses are retried `retries` times, sleeping
+   backoff_factor * 2**attempt seconds in between (or as long as a Retry-After header asks).
+
+
+   Args:
+       pool_size (int): Connections kept per host; should be at least the number of concurrent fetchers.
+       retries (int): Retries after the first attempt.
+       backoff_factor (float): Base of the exponential backoff, in seconds.
+   """
+   retry = Retry(
+       total=retries,
+       connect=retries,
+       read=retries,
+       status=retries,
+       backoff_factor=backoff_factor,
+       status_forcelist=(429, 500, 502, 503, 504),
+       allowed_methods=frozenset({"GET", "HEAD"}),
+       respect_retry_after_header=True,
+       raise_on_status=False
+   )
+   adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+   session = requests.Session()
+   session.mount("http://", adapter)
+   session.mount("https://", adapter)
+   session.headers["User-Agent"] = USER_AGENT
+   return session
+
+
+def fetch(session: requests.Session, url: str, timeout=DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+   """
+   GETs `url` through the shared session and raises for error statuses
+   (after the retries have been used up).
+   """
+   response = session.get(url, timeout=timeout, **kwargs)
+   response.raise_for_status()
+   return response
+
+
+_default_session = None
+
+
+def default_session() -> requests.Session:
+   """
+   Session used by fetchers that are called without one (e.g. when run on their own).
+   """
+   global _default_session
+   if _default_session is None:
+       _default_session = build_session()
+   return _default_session
@@ -0,0 +1,210 @@
+# --- ingestion_state.py ---
+# Persistent state that makes the aggregation job incremental.
+# For each source it remembers the HTTP validators (ETag / Last-Modified) of the last
+# response, so unchanged feeds are answered with a 304, and it remembers the ID of every
+# item already published, so each filing is only processed once.
+
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+from http_session import fetch
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+   name TEXT PRIMARY KEY,
+   etag TEXT,
+   last_modified TEXT,
+   cursor TEXT,
+   updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS seen_items (
+   item_id TEXT PRIMARY KEY,
+   source TEXT,
+   first_seen REAL
+) WITHOUT ROWID;
+"""
+
+
+def item_id(item: dict) -> str:
+   """
+   Stable ID of a feed item: a hash of its link, or of its source and title when it has no
+   real link (e.g. the synthetic social posts, whose timestamps change on every run).
+   """
+   link = item.get("link") or ""
+   if link and link != "#":
+       key = "link:" + link
+   else:
+       key = f"title:{item.get('source', '')}:{item.get('title', '')}"
+   return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class IngestionStateStore:
+   """
+   SQLite-backed ingestion state, safe to use from the concurrent fetcher threads.
+
+
+   Fetchers read the stored validators and stage the ones from fresh responses; nothing is
+   persisted until `commit()` is called after the new items were published. If the job fails
+   before that, the next run fetches and offers the same items again instead of losing them.
+   """
+
+   def __init__(self, db_path: str = ":memory:"):
+       self.db_path = str(db_path)
+       self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+       self._lock = threading.Lock()
+       self._conn.executescript(SCHEMA)
+       self._staged = {}
+
+
+   def request_headers(self, source: str) -> dict:
+       """
+       Conditional request headers for the source, from its last successful response.
+       """
+       with self._lock:
+           row = self._conn.execute("SELECT etag, last_modified FROM sources WHERE name = ?", (source,)).fetchone()
+       headers = {}
+       if row and row[0]:
+           headers["If-None-Match"] = row[0]
+       if row and row[1]:
+           headers["If-Modified-Since"] = row[1]
+       return headers
+
+
+   def cursor(self, source: str):
+       """
+       Source-specific position saved by `stage()`, e.g. the newest publish time seen from an API.
+       """
+       with self._lock:
+           row = self._conn.execute("SELECT cursor FROM sources WHERE name = ?", (source,)).fetchone()
+       return row[0] if row else None
+
+
+   def stage(self, source: str, **fields):
+       """
+       Records fields of a fresh response to be saved on `commit()`: `etag`, `last_modified`
+       (None clears them) and `cursor`.
+       """
+       with self._lock:
+           self._staged.setdefault(source, {}).update(fields)
+
+
+   def scoped(self) -> "ScopedState":
+       """
+       A view for one fetch whose staged fields are only kept if `adopt()` is called with it.
+       """
+       return ScopedState(self)
+
+
+   def adopt(self, scoped: "ScopedState"):
+       """
+       Stages what a fetch recorded in its scoped view. Used for fetches that finished in time,
+       so a late fetch cannot stage validators for items that were never published.
+       """
+       for source, fields in scoped.staged.items():
+           self.stage(source, **fields)
+
+
+   def new_items(self, items: list) -> list:
+       """
+       Returns the items that have not been committed before, dropping duplicates within `items`.
+       """
+       ids = [item_id(item) for item in items]
+       seen = set()
+       with self._lock:
+           # Chunked to stay under SQLite's bound-parameter limit.
+           for start in range(0, len(ids), 500):
+               chunk = ids[start:start + 500]
+               placeholders = ",".join("?" * len(chunk))
+               seen.update(row[0] for row in self._conn.execute(
+                   f"SELECT item_id FROM seen_items WHERE item_id IN ({placeholders})", chunk
+               ))
+       fresh = []
+       for identifier, item in zip(ids, items):
+           if identifier not in seen:
+               seen.add(identifier)
+               fresh.append(item)
+       return fresh
+
+
+   def commit(self, published_items: list):
+       """
+       Marks the items as seen and saves the staged validators, in one transaction.
+       """
+       now = time.time()
+       with self._lock, self._conn:
+           self._conn.executemany(
+               "INSERT OR IGNORE INTO seen_items (item_id, source, first_seen) VALUES (?, ?, ?)",
+               [(item_id(item), item.get("source", ""), now) for item in published_items]
+           )
+           for source, fields in self._staged.items():
+               row = self._conn.execute(
+                   "SELECT etag, last_modified, cursor FROM sources WHERE name = ?", (source,)
+               ).fetchone() or (None, None, None)
+               current = {"etag": row[0], "last_modified": row[1], "cursor": row[2], **fields}
+               self._conn.execute(
+                   "INSERT OR REPLACE INTO sources (name, etag, last_modified, cursor, updated_at) VALUES (?, ?, ?, ?, ?)",
+                   (source, current["etag"], current["last_modified"], current["cursor"], now)
+               )
+           self._staged = {}
+
+
+   def seen_count(self) -> int:
+       with self._lock:
+           return self._conn.execute("SELECT COUNT(*) FROM seen_items").fetchone()[0]
+
+
+   def close(self):
+       with self._lock:
+           self._conn.close()
+
+
+class ScopedState:
+   """
+   Reads through to the store; stages into its own buffer (see `IngestionStateStore.scoped`).
+   """
+
+   def __init__(self, store: IngestionStateStore):
+       self.store = store
+       self.staged = {}
+
+
+   def request_headers(self, source: str) -> dict:
+       return self.store.request_headers(source)
+
+
+   def cursor(self, source: str):
+       return self.store.cursor(source)
+
+
+   def stage(self, source: str, **fields):
+       self.staged.setdefault(source, {}).update(fields)
+
+
+def fetch_if_changed(session, url: str, source: str, state: IngestionStateStore = None, **kwargs):
+   """
+   GETs `url` with the source's conditional headers and stages the new validators.
+
+
+   The validators are staged before the caller has parsed the body, so a fetcher that then
+   fails must raise rather than return no items: `fetch_all_sources` only adopts the scoped
+   state of fetches that returned, and saving the validators of a body that was never
+   parsed would make the next run skip the source with a 304.
+
+
+   Returns:
+       requests.Response or None: None if the server answered 304 Not Modified.
+   """
+   headers = dict(kwargs.pop("headers", None) or {})
+   if state is not None:
+       headers.update(state.request_headers(source))
+   response = fetch(session, url, headers=headers, **kwargs)
+   if response.status_code == 304:
+       return None
+   if state is not None:
+       state.stage(source, etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"))
+   return response
@@ -3,11 +3,19 @@
 # like NewsAPI.org to fetch general financial news.
 
 
+import logging
 import requests
 import os
 from datetime import datetime
 
 
+from http_session import DEFAULT_TIMEOUT, default_session
+from ingestion_state import fetch_if_changed
+
+
+logger = logging.getLogger(__name__)
+
+
 # --- CONFIGURATION ---
 # IMPORTANT: It is highly recommended to set your API key as an environment variable
 # for security. The code will fall back to the hardcoded key if the variable is not found.
@@ -16,17 +24,23 @@ NEWS_API_KEY = os.getenv("NEWS_API_KEY", "7fa48aac1cd84790a63ebb86e8b9cd19")
 NEWS_API_ENDPOINT = "https://newsapi.org/v2/everything"
 
 
-def fetch_general_news():
+def fetch_general_news(session=None, timeout=DEFAULT_TIMEOUT, url: str = NEWS_API_ENDPOINT, state=None):
    """
    Fetches the latest general financial news from the NewsAPI.org service.
+
+
+   With an ingestion `state`, only articles published since the newest one seen in the
+   previous run are requested, and the request is conditional on its ETag / Last-Modified.
+   Errors are then raised rather than logged, so the caller discards the validators and
+   cursor staged for the failed fetch.
    """
    # Safety check: Prevents running the function if the default placeholder key is still present.
    if NEWS_API_KEY == "YOUR_NEWS_API_KEY_HERE":
-       print("Warning: NEWS_API_KEY is not set. Skipping general news fetch.")
+       logger.warning("NEWS_API_KEY is not set. Skipping general news fetch.")
        return []
 
 
-   print("Fetching general financial news from NewsAPI.org...")
+   logger.info("Fetching general financial news from NewsAPI.org...")
   
    # Define search parameters for the API call
    params = {
@@ -38,12 +52,23 @@ def fetch_general_news():
    }
 
 
+   last_published = state.cursor("NewsAPI") if state is not None else None
+   if last_published:
+       params['from'] = last_published
+
    items = []
    try:
-       response = requests.get(NEWS_API_ENDPOINT, params=params)
-       response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+       # Raises for bad status codes (4xx or 5xx) once retries are exhausted
+       response = fetch_if_changed(session or default_session(), url, "NewsAPI", state, timeout=timeout, params=params)
+       if response is None:
+           logger.info("No new articles from NewsAPI.org since the last run.")
+           return []
       
        articles = response.json().get("articles", [])
+       published = [article["publishedAt"] for article in articles if article.get("publishedAt")]
+       if state is not None and published:
+           # ISO 8601 UTC timestamps sort chronologically as strings.
+           state.stage("NewsAPI", cursor=max(published + ([last_published] if last_published else [])))
       
        for article in articles:
            items.append({
@@ -57,17 +82,20 @@ def fetch_general_news():
            })
           
    except requests.exceptions.RequestException as e:
-       print(f"Error fetching data from NewsAPI: {e}")
+       if state is not None:
+           raise
+       logger.error("Error fetching data from NewsAPI: %s", e)
        # Return an empty list if there's a network or API error
        return []
 
 
-   print(f"Fetched {len(items)} items from NewsAPI.org.")
+   logger.info("Fetched %d items from NewsAPI.org.", len(items))
    return items
 
 
 if __name__ == '__main__':
    # This allows you to test this script individually
+   logging.basicConfig(level=logging.INFO)
    print("--- Testing News API Client ---")
    news_data = fetch_general_news()
    if news_data:
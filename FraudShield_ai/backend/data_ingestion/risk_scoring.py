@@ -0,0 +1,180 @@
+# --- risk_scoring.py ---
+# Scores ingested feed items with the same text-verification path as /verify:
+# NLP analysis (keywords, entities, sentiment) followed by cross-verification of the
+# extracted entities against the official records. The computed risk replaces the
+# fixed labels the fetchers assign by source.
+
+
+import math
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+# Make the backend's `app` package importable when this script is run directly.
+sys.path.append(str(Path(__file__).parent.parent))
+from app.core.config import settings
+from app.services.result_cache import VerificationResultCache
+from app.services.verification_orchestrator import VerificationOrchestrator, verification_orchestrator
+
+
+def item_text(item: dict) -> str:
+   """
+   The text of a feed item that gets verified: its title and content.
+   """
+   return "\n".join(part for part in (item.get("title"), item.get("content")) if part)
+
+
+def apply_result(item: dict, result: dict):
+   """
+   Writes a verification result into a feed item as risk_score, risk_level and reason.
+   """
+   flags = list((result.get("text_analysis") or {}).get("flags") or [])
+   flags += (result.get("cross_verification") or {}).get("flags") or []
+   item["risk_score"] = result["risk_score"]
+   item["risk_level"] = result["risk_level"]
+   item["reason"] = ", ".join(flags) if flags else result["summary"]
+
+
+# Orchestrator of a pool worker process, created on its first chunk.
+_worker_orchestrator = None
+
+
+def _verify_chunk(texts: list) -> list:
+   """
+   Runs in a pool worker: verifies a chunk of texts with one batched NLP call. Caching is
+   left to the parent process, which sends only texts it has no result for.
+   """
+   global _worker_orchestrator
+   if _worker_orchestrator is None:
+       _worker_orchestrator = VerificationOrchestrator(max_workers=1, media_max_workers=1, cache=None)
+   return _worker_orchestrator.process_batch(texts)
+
+
+class RiskScorer:
+   """
+   Scores batches of feed items.
+
+
+   Identical texts (the same post reposted across sources) are verified once per batch, and
+   results are cached by content hash in `cache_path` across runs, so only unseen texts are
+   analyzed. Those are verified in-process when there are few of them, and otherwise split
+   into chunks verified in parallel by a pool of `workers` processes.
+
+
+   Args:
+       workers (int): Size of the process pool; defaults to the number of CPUs.
+       cache_path (str): SQLite file for cached results; in-memory only if empty.
+       chunk_size (int): Texts per batched call in a worker.
+       in_process_max (int): Up to this many texts are verified without starting the pool,
+                             which costs more than it saves on small runs.
+   """
+
+   def __init__(self, workers: int = None, cache_path: str = "", chunk_size: int = 256, in_process_max: int = 500):
+       self.workers = workers or multiprocessing.cpu_count()
+       self.chunk_size = chunk_size
+       self.in_process_max = in_process_max
+       self.cache = VerificationResultCache(
+           max_entries=settings.RESULT_CACHE_SIZE,
+           ttl_seconds=settings.RESULT_CACHE_TTL,
+           db_path=str(cache_path) if cache_path else None
+       )
+       self._pool = None
+
+
+   def score(self, items: list, campaigns=None) -> dict:
+       """
+       Verifies the text of every item and writes risk_score, risk_level and reason into it.
+
+
+       With a `CampaignIndex` whose campaigns the items were assigned to (see campaign_index.py),
+       near-duplicates share a verdict: only the first new item of each campaign is verified, and
+       the others, like later members of campaigns scored in earlier runs, reuse its result.
+
+
+       Returns:
+           dict: {"items", "verified", "cache_hits", "campaign_reuses"}; `verified` counts distinct
+                 texts analyzed.
+       """
+       version = verification_orchestrator.reference_version()
+       self.cache.ensure_version(version)
+
+       direct = []
+       members = {}
+       for item in items:
+           campaign_id = item.get("campaign_id") if campaigns is not None else None
+           if campaign_id is None:
+               direct.append(item)
+           else:
+               members.setdefault(campaign_id, []).append(item)
+       verdicts = campaigns.verdicts(list(members), version) if members else {}
+       representatives = {}
+       for campaign_id, group in members.items():
+           if campaign_id not in verdicts:
+               representatives[campaign_id] = len(direct)
+               direct.append(group[0])
+
+       results, stats = self._results(direct)
+       for item, result in zip(direct, results):
+           apply_result(item, result)
+
+       fresh = {campaign_id: results[position] for campaign_id, position in representatives.items()}
+       if fresh:
+           campaigns.set_verdicts(fresh, version)
+       verdicts.update(fresh)
+       reuses = 0
+       for campaign_id, group in members.items():
+           for item in group if campaign_id not in fresh else group[1:]:
+               apply_result(item, verdicts[campaign_id])
+               reuses += 1
+       return {"items": len(items), **stats, "campaign_reuses": reuses}
+
+
+   def _results(self, items: list) -> tuple:
+       """
+       The verification result for each item's text, from the cache or freshly verified.
+       """
+       keys = []
+       texts = {}
+       for item in items:
+           text = item_text(item)
+           keys.append(VerificationResultCache.make_key(text))
+           texts.setdefault(keys[-1], text)
+
+       results = {key: self.cache.get(key) for key in texts}
+       pending = [key for key, result in results.items() if result is None]
+
+       fresh = dict(zip(pending, self._verify([texts[key] for key in pending])))
+       if fresh:
+           self.cache.put_many(fresh)
+       results.update(fresh)
+       return [results[key] for key in keys], {"verified": len(pending), "cache_hits": len(texts) - len(pending)}
+
+
+   def close(self):
+       if self._pool is not None:
+           self._pool.shutdown()
+           self._pool = None
+
+
+   def _verify(self, texts: list) -> list:
+       if len(texts) <= self.in_process_max or self.workers < 2:
+           return _verify_chunk(texts) if texts else []
+
+       # Even chunks, at most chunk_size texts each, and at least one per worker.
+       chunk_count = max(self.workers, math.ceil(len(texts) / self.chunk_size))
+       size = math.ceil(len(texts) / chunk_count)
+       chunks = [texts[start:start + size] for start in range(0, len(texts), size)]
+       results = []
+       for chunk_results in self._get_pool().map(_verify_chunk, chunks):
+           results.extend(chunk_results)
+       return results
+
+
+   def _get_pool(self) -> ProcessPoolExecutor:
+       if self._pool is None:
+           # Spawned, not forked: the parent holds open SQLite connections (official records,
+           # result cache) that must not be shared with children.
+           self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+       return self._pool
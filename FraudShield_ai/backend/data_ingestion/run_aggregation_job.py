@@ -1,10 +1,15 @@
 # --- run_aggregation_job.py ---
 # This is the master script to orchestrate the entire data ingestion process.
 # It fetches data from all sources (real and synthetic), consolidates it,
-# and saves it to a file that the backend API can serve.
+# and appends it to the feed log that the backend API serves.
 
 
 import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from pathlib import Path
 from datetime import datetime
 
@@ -12,14 +17,83 @@ from datetime import datetime
 # Import the data fetching functions from other scripts in this directory
 from exchange_scraper import fetch_bse_announcements, fetch_sebi_rss
 from news_api_client import fetch_general_news
+from http_session import build_session
+from ingestion_state import IngestionStateStore
+from campaign_index import CampaignIndex, clustering_available
+
+# Make the backend's `app` package importable when this script is run directly.
+sys.path.append(str(Path(__file__).parent.parent))
+from app.core.config import settings
+from app.core.log import configure_logging
+from app.core.metrics import MetricsRegistry
+from app.services.feed_log import FeedLog
+from risk_scoring import RiskScorer
+
+
+logger = logging.getLogger(__name__)
 
 
 # --- CONFIGURATION ---
 # Define the output path for the consolidated data feed.
 # This path points to the 'data' directory inside the 'app' folder,
-# ensuring the FastAPI server can easily find the file.
+# ensuring the FastAPI server can easily find the feed.
 OUTPUT_DIR = Path(__file__).parent.parent / "app" / "data"
-OUTPUT_FILE = OUTPUT_DIR / "aggregated_feed.json"
+# Append-only feed log (see app/services/feed_log.py): each run only writes its new items.
+FEED_LOG_DIR = OUTPUT_DIR / "feed_log"
+SEGMENT_MAX_ITEMS = 50_000
+# The single JSON file earlier versions rewrote on every run; imported into an empty log once.
+LEGACY_FEED_FILE = OUTPUT_DIR / "aggregated_feed.json"
+# Per-source HTTP validators and the IDs of every item already published (see ingestion_state.py).
+STATE_FILE = OUTPUT_DIR / "ingestion_state.db"
+# Verification results for item texts, reused when the same text shows up again (see risk_scoring.py).
+SCORE_CACHE_FILE = OUTPUT_DIR / "score_cache.db"
+# Campaigns of near-duplicate posts and their verdicts (see campaign_index.py); a campaign
+# that has not grown for CAMPAIGN_TTL seconds is forgotten.
+CAMPAIGN_INDEX_FILE = OUTPUT_DIR / "campaigns.db"
+CAMPAIGN_TTL = 30 * 24 * 3600
+# Processes used to score large runs; small runs are scored in-process.
+SCORING_WORKERS = None  # number of CPUs
+# The feed keeps history across runs; once it holds a segment more than this many items,
+# the oldest segment is dropped.
+MAX_FEED_ITEMS = 100_000
+
+# Real sources, fetched concurrently: (name, fetcher, (connect, read) timeout, overall deadline in seconds).
+# The deadline bounds the whole fetch including retries; a source that misses it is skipped for this run.
+SOURCES = [
+   ("BSE India", fetch_bse_announcements, (3.05, 10), 30),
+   ("SEBI", fetch_sebi_rss, (3.05, 10), 30),
+   ("NewsAPI", fetch_general_news, (3.05, 10), 30),
+]
+
+# Metrics of the run, written to settings.INGESTION_METRICS_PATH for the API's /metrics.
+# They get their own registry: the API server already reports the pipeline metrics itself.
+job_metrics = MetricsRegistry()
+FETCH_SECONDS = job_metrics.histogram(
+   "marketguard_ingestion_fetch_duration_seconds",
+   "Time taken by each source's fetcher, retries included.",
+   ("source",)
+)
+FETCH_ITEMS = job_metrics.counter("marketguard_ingestion_fetched_items", "Items returned by each source.", ("source",))
+FETCH_SKIPPED = job_metrics.counter(
+   "marketguard_ingestion_fetch_skipped",
+   "Sources skipped because they failed or missed their deadline.",
+   ("source", "reason")
+)
+JOB_STAGE_SECONDS = job_metrics.histogram(
+   "marketguard_ingestion_stage_duration_seconds",
+   "Time taken by each step of the aggregation job.",
+   ("stage",)
+)
+PUBLISHED_ITEMS = job_metrics.counter("marketguard_ingestion_published_items", "New items appended to the feed log.")
+CAMPAIGN_ITEMS = job_metrics.counter(
+   "marketguard_ingestion_campaign_items",
+   "New items that started a campaign or joined an existing one.",
+   ("outcome",)
+)
+VERDICT_REUSES = job_metrics.counter(
+   "marketguard_ingestion_verdict_reuses",
+   "New items scored with the verdict of another member of their campaign."
+)
 
 
 
@@ -30,7 +104,7 @@ def generate_synthetic_social_posts():
    This is crucial for demonstrating the system's ability to detect high-risk,
    unregulated information.
    """
-   print("Generating synthetic social media posts...")
+   logger.info("Generating synthetic social media posts...")
    # In a real app, this could be more dynamic, but for a hackathon,
    # hardcoded examples are clear and effective.
    posts = [
@@ -65,36 +139,190 @@ def generate_synthetic_social_posts():
    return posts
 
 
-def run_job():
+def fetch_all_sources(sources: list = SOURCES, session=None, state: IngestionStateStore = None) -> list:
+   """
+   Runs every fetcher at the same time, sharing one pooled HTTP session, and returns
+   their items in source order. The job takes as long as the slowest source rather than
+   the sum of all of them, and a source that fails or misses its deadline contributes no
+   items without holding up the others.
+
+
+   With an ingestion `state`, fetchers make conditional requests and skip unchanged sources.
+   """
+   session = session or build_session(pool_size=max(10, len(sources)))
+   executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="fetch")
+   started = time.monotonic()
+   futures = []
+   for name, fetcher, timeout, deadline in sources:
+       scoped = state.scoped() if state is not None else None
+       futures.append((name, deadline, scoped, executor.submit(_timed_fetch, name, fetcher, session=session, timeout=timeout, state=scoped)))
+
+   all_items = []
+   try:
+       for name, deadline, scoped, future in futures:
+           try:
+               items = future.result(timeout=max(0.0, started + deadline - time.monotonic()))
+               FETCH_ITEMS.inc(name, amount=len(items))
+               all_items.extend(items)
+               if scoped is not None:
+                   state.adopt(scoped)
+           except TimeoutError:
+               FETCH_SKIPPED.inc(name, "deadline")
+               logger.warning("Skipping %s: no response within %ss.", name, deadline)
+           except Exception as e:
+               FETCH_SKIPPED.inc(name, "error")
+               logger.warning("Skipping %s: %s", name, e)
+   finally:
+       # Don't wait for sources that missed their deadline; their own timeouts end them.
+       executor.shutdown(wait=False, cancel_futures=True)
+   return all_items
+
+
+def _timed_fetch(name: str, fetcher, **kwargs) -> list:
+   with FETCH_SECONDS.time(name):
+       return fetcher(**kwargs)
+
+
+def migrate_legacy_feed(feed_log: FeedLog, state: IngestionStateStore = None, legacy_file: Path = LEGACY_FEED_FILE) -> int:
+   """
+   Imports the items of the old single-file feed into the log if the log is still empty,
+   and marks them as seen so they are not appended a second time.
+
+
+   Returns:
+       int: The number of imported items.
+   """
+   if feed_log.manifest_path.exists() or not legacy_file.is_file() or legacy_file.stat().st_size == 0:
+       return 0
+   try:
+       with open(legacy_file, 'r', encoding='utf-8') as f:
+           items = json.load(f)
+   except (OSError, ValueError) as e:
+       logger.error("Could not import the legacy feed %s: %s", legacy_file, e)
+       return 0
+   if not isinstance(items, list):
+       return 0
+   feed_log.append(items)
+   if state is not None:
+       state.commit(items)
+   logger.info("Imported %d items from %s into %s", len(items), legacy_file, feed_log.directory)
+   return len(items)
+
+
+def run_job(state: IngestionStateStore = None, sources: list = SOURCES, feed_log: FeedLog = None,
+           scorer: RiskScorer = None, campaigns: CampaignIndex = None) -> list:
    """
    Main function to run the entire data aggregation and processing job.
+
+
+   The job is incremental: unchanged sources are skipped via conditional requests, and only
+   items that were never published before are appended to the feed log. Running it every minute
+   only costs the sources' 304 responses when nothing changed, and writing a few new items costs
+   the same whatever the size of the feed. New items are grouped into campaigns of near-duplicate
+   posts and risk-scored before they are published; members of an already-scored campaign reuse
+   its verdict.
+
+
+   Returns:
+       list: The newly published items.
    """
-   print(f"--- Starting data aggregation job at {datetime.now()} ---")
+   logger.info("--- Starting data aggregation job at %s ---", datetime.now())
+   state = state or IngestionStateStore(STATE_FILE)
+   if feed_log is None:
+       feed_log = FeedLog(FEED_LOG_DIR, SEGMENT_MAX_ITEMS)
+       migrate_legacy_feed(feed_log, state)
   
    all_items = []
   
    # --- STEP 1: Fetch from real sources ---
-   # NOTE: fetch_bse_announcements() currently returns mock data for development. See exchange_scraper.py.
-   all_items.extend(fetch_bse_announcements())
-   all_items.extend(fetch_sebi_rss())
-   # This function uses the NewsAPI key to fetch general financial news
-   all_items.extend(fetch_general_news())
+   # BSE and SEBI RSS feeds, plus general financial news via the NewsAPI key, all fetched concurrently.
+   with JOB_STAGE_SECONDS.time("fetch"):
+       all_items.extend(fetch_all_sources(sources, state=state))
   
    # --- STEP 2: Generate synthetic data ---
    all_items.extend(generate_synthetic_social_posts())
+
+   # --- STEP 3: Keep only items that were never published ---
+   new_items = state.new_items(all_items)
+   if not new_items:
+       # Nothing to publish, but validators from changed-yet-already-seen feeds are still worth keeping.
+       state.commit([])
+       logger.info("No new items. --- Data aggregation job finished at %s ---", datetime.now())
+       return []
   
-   # --- STEP 3: Ensure output directory exists ---
-   OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-  
-   # --- STEP 4: Write consolidated data to JSON file ---
+   # --- STEP 4: Group the new items into campaigns of near-duplicate posts ---
+   if campaigns is None and clustering_available():
+       campaigns = CampaignIndex(CAMPAIGN_INDEX_FILE)
+   if campaigns is not None:
+       try:
+           with JOB_STAGE_SECONDS.time("cluster"):
+               result = campaigns.assign(new_items)
+           CAMPAIGN_ITEMS.inc("new", amount=result["new_campaigns"])
+           CAMPAIGN_ITEMS.inc("joined", amount=result["joined"])
+           logger.info("Clustered %d items: %d new campaigns, %d joined existing ones.", result["items"], result["new_campaigns"], result["joined"])
+       except Exception as e:
+           # Items are published without campaign fields and scored one by one.
+           logger.error("Error clustering new items: %s", e)
+           campaigns.rollback()
+           for item in new_items:
+               item.pop("campaign_id", None)
+               item.pop("campaign_size", None)
+           campaigns = None
+
+   # --- STEP 5: Score the new items through the text-verification pipeline ---
+   own_scorer = scorer is None
+   scorer = scorer or RiskScorer(workers=SCORING_WORKERS, cache_path=SCORE_CACHE_FILE)
+   try:
+       started = time.monotonic()
+       with JOB_STAGE_SECONDS.time("score"):
+           result = scorer.score(new_items, campaigns)
+       VERDICT_REUSES.inc(amount=result["campaign_reuses"])
+       logger.info(
+           "Scored %d items in %.2fs (%d texts verified, %d from cache, %d campaign verdicts reused).",
+           result["items"], time.monotonic() - started, result["verified"], result["cache_hits"], result["campaign_reuses"]
+       )
+   except Exception as e:
+       # The fetchers' source-based labels are kept; the dashboard is not held up.
+       logger.error("Error scoring new items, publishing them with their source labels: %s", e)
+   finally:
+       if own_scorer:
+           scorer.close()
+
+   # --- STEP 6: Append the new items to the feed log ---
    try:
-       with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-           json.dump(all_items, f, indent=4, ensure_ascii=False)
-       print(f"Successfully wrote {len(all_items)} items to {OUTPUT_FILE}")
+       with JOB_STAGE_SECONDS.time("append"):
+           feed_log.append(new_items)
+       state.commit(new_items)
+       if campaigns is not None:
+           campaigns.commit()
+       PUBLISHED_ITEMS.inc(amount=len(new_items))
+       logger.info("Successfully appended %d new items to %s", len(new_items), feed_log.directory)
    except Exception as e:
-       print(f"Error writing to JSON file: {e}")
+       # The state is not committed, so the same items are offered again on the next run.
+       logger.error("Error appending to the feed log: %s", e)
+       if campaigns is not None:
+           campaigns.rollback()
+       new_items = []
+
+   # --- STEP 7: Retention ---
+   if feed_log.count() > MAX_FEED_ITEMS + feed_log.segment_max_items:
+       try:
+           with JOB_STAGE_SECONDS.time("compact"):
+               result = feed_log.compact(MAX_FEED_ITEMS)
+           logger.info("Compacted the feed log: dropped %d old items.", result["items_dropped"])
+       except Exception as e:
+           logger.error("Error compacting the feed log: %s", e)
+   if campaigns is not None:
+       try:
+           dropped = campaigns.prune(CAMPAIGN_TTL)
+           campaigns.commit()
+           if dropped:
+               logger.info("Dropped %d campaigns inactive for %d days.", dropped, CAMPAIGN_TTL // 86400)
+       except Exception as e:
+           logger.error("Error pruning campaigns: %s", e)
       
-   print(f"--- Data aggregation job finished at {datetime.now()} ---")
+   logger.info("--- Data aggregation job finished at %s ---", datetime.now())
+   return new_items
 
 
 
@@ -102,6 +330,13 @@ def run_job():
 if __name__ == "__main__":
    # This allows the script to be run directly from the command line
    # for testing or manual data refreshes.
-   run_job()
+   # The backend's settings (lexicon, official records) use paths relative to `backend/`.
+   os.chdir(Path(__file__).resolve().parent.parent)
+   configure_logging()
+   try:
+       run_job()
+   finally:
+       if settings.INGESTION_METRICS_PATH:
+           job_metrics.write_textfile(settings.INGESTION_METRICS_PATH)
 
 